@@ -1,13 +1,57 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+astrospice is imported lazily: importing the package is cheap, and the
+submodules (along with astropy, SPICE etc.) are only imported when one of the
+names below is first used. The generic kernels (see
+`astrospice.set_solar_system_ephem`) are only downloaded and furnished the
+first time SPICE is used.
+"""
+import importlib
 
-import astrospice.time
-from astrospice.net.generic import *
-from astrospice.net.generic import _setup_generic_files
 from ._version import __version__
-from .body import *
-from .config import *
-from .coords import *
-from .kernel import *
-from .net import registry
 
-_setup_generic_files()
+# Mapping from public name to the module it is defined in
+_LAZY_NAMES = {
+    'Body': 'astrospice.body',
+    'body_ids': 'astrospice.body',
+    'export_bundle': 'astrospice.bundle',
+    'get_cache_dir': 'astrospice.config',
+    'agenerate_coords': 'astrospice.coords',
+    'generate_coords': 'astrospice.coords',
+    'generate_coords_multi': 'astrospice.coords',
+    'iter_coords': 'astrospice.coords',
+    'KernelBase': 'astrospice.kernel',
+    'Kernel': 'astrospice.kernel',
+    'SPKKernel': 'astrospice.kernel',
+    'MetaKernel': 'astrospice.kernel',
+    'furnished_kernels': 'astrospice.kernel',
+    'KernelPool': 'astrospice.pool',
+    'kernel_pool': 'astrospice.pool',
+    'spice_lock': 'astrospice.pool',
+    'ChebyshevEphemeris': 'astrospice.surrogate',
+    'set_solar_system_ephem': 'astrospice.net.generic',
+    'get_solar_system_ephem': 'astrospice.net.generic',
+    'registry': 'astrospice.net',
+}
+
+_SUBMODULES = ['body', 'bundle', 'cache', 'config', 'coords', 'daf', 'kernel',
+               'net', 'parallel', 'pool', 'spk', 'surrogate', 'textkernel',
+               'time']
+
+__all__ = [name for name in _LAZY_NAMES if name != 'registry']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'astrospice.{name}')
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module 'astrospice' has no attribute '{name}'")
+    # Register the 'et' time format before anything that uses it
+    importlib.import_module('astrospice.time')
+    value = getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_NAMES) + _SUBMODULES)
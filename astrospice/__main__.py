@@ -0,0 +1,128 @@
+"""
+The astrospice command line interface.
+
+Run ``python -m astrospice --help`` for usage.
+"""
+import argparse
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m astrospice',
+        description='Tools for managing SPICE kernels.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prefetch = subparsers.add_parser(
+        'prefetch',
+        help='download kernels into the astrospice cache directory',
+        description='Download kernels from the astrospice registry into the '
+                    'astrospice cache directory, without furnishing them.')
+    prefetch.add_argument(
+        'bodies', nargs='*',
+        help='bodies to download kernels for (default: all bodies in the '
+             'registry)')
+    prefetch.add_argument(
+        '--type', action='append', dest='types',
+        choices=['predict', 'recon'],
+        help='kernel type to download; can be given more than once '
+             '(default: all types)')
+    prefetch.add_argument(
+        '--start', help='only download kernels that cover times after this')
+    prefetch.add_argument(
+        '--end', help='only download kernels that cover times before this')
+    prefetch.add_argument(
+        '--version', type=int, help='only download this kernel version')
+    prefetch.add_argument(
+        '--max-concurrent', type=int, default=4,
+        help='maximum number of simultaneous downloads (default: 4)')
+
+    cache = subparsers.add_parser(
+        'cache',
+        help='list or evict the kernels in the astrospice cache directory',
+        description='List the kernels in the astrospice cache directory, '
+                    'optionally deleting kernels to keep within size or age '
+                    'limits. Kernels that are furnished are never deleted.')
+    cache.add_argument(
+        '--scan', action='store_true',
+        help='add kernels that are not in the cache index to it')
+    cache.add_argument(
+        '--max-bytes', type=int,
+        help='delete the least recently used kernels until the cache is no '
+             'larger than this')
+    cache.add_argument(
+        '--max-age', type=float,
+        help='delete kernels that have not been used for this many days')
+
+    bundle = subparsers.add_parser(
+        'bundle',
+        help='export kernels as a metakernel that loads them in one step',
+        description='Furnish the generic kernels and the given kernels, and '
+                    'write a metakernel that loads all of them.')
+    bundle.add_argument(
+        'directory', help='directory to write the bundle to')
+    bundle.add_argument(
+        'kernels', nargs='*', help='kernels (or metakernels) to include')
+    bundle.add_argument(
+        '--name', default='astrospice',
+        help='name of the bundle files (default: astrospice)')
+    bundle.add_argument(
+        '--consolidate', action='store_true',
+        help='merge the SPK files into a single SPK file')
+
+    args = parser.parse_args(argv)
+    if args.command == 'prefetch':
+        return _prefetch(parser, args)
+    elif args.command == 'cache':
+        return _cache(args)
+    elif args.command == 'bundle':
+        return _bundle(args)
+
+
+def _prefetch(parser, args):
+    from astropy.time import Time
+
+    from astrospice.net import registry
+
+    trange = None
+    if args.start is not None or args.end is not None:
+        if args.start is None or args.end is None:
+            parser.error('--start and --end must be given together')
+        trange = (Time(args.start), Time(args.end))
+
+    paths = registry.prefetch(args.bodies or None, args.types,
+                              version=args.version, trange=trange,
+                              max_concurrent=args.max_concurrent)
+    for path in paths:
+        print(path)
+    return 0
+
+
+def _cache(args):
+    from astrospice.net.cache import kernel_cache
+
+    if args.scan:
+        kernel_cache.scan()
+    if args.max_bytes is not None or args.max_age is not None:
+        max_age = None if args.max_age is None else args.max_age * 86400
+        for path in kernel_cache.evict(max_bytes=args.max_bytes,
+                                       max_age=max_age):
+            print(f'Deleted {path}')
+    kernel_cache.table().pprint_all()
+    return 0
+
+
+def _bundle(args):
+    from astrospice.bundle import export_bundle
+    from astrospice.kernel import Kernel
+
+    for kernel in args.kernels:
+        Kernel(kernel)
+    metakernel = export_bundle(args.directory, name=args.name,
+                               consolidate=args.consolidate)
+    print(metakernel.fname)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,54 +1,122 @@
+import numpy as np
 import spiceypy
 from spiceypy.utils.exceptions import SpiceyError
 
-__all__ = ['Body']
+__all__ = ['Body', 'body_ids']
+
+# Mapping from body ID to interned Body instances
+_BODIES = {}
+# Mapping from body names to IDs
+_IDS = {}
 
 
 class Body:
     """
     An individual body.
 
+    Bodies are interned, so creating a `Body` with the same ID (or a name
+    for the same ID) more than once returns the same object. Names and IDs
+    are resolved by SPICE once, and then cached.
+
     Parameters
     ----------
-    body : `int`, `str`
+    body : `int`, `str`, `Body`
         Either the body ID code (integer) or the body name (string).
     """
-    def __init__(self, body):
-        if isinstance(body, int):
-            self.id = body
+    __slots__ = ('_id', '_name')
+
+    def __new__(cls, body):
+        if isinstance(body, Body):
+            return body
+        elif isinstance(body, (int, np.integer)):
+            id = int(body)
         elif isinstance(body, str):
-            self.name = body
+            id = _name_to_id(body)
         else:
             raise ValueError('body must be an int or str')
 
+        if id not in _BODIES:
+            # pool imports this module, so import the lock here
+            from astrospice.pool import spice_lock
+
+            self = super().__new__(cls)
+            self._id = id
+            with spice_lock:
+                try:
+                    self._name = spiceypy.bodc2n(id)
+                except SpiceyError as e:
+                    raise ValueError(f'id "{id}" not known by SPICE') from e
+                _BODIES.setdefault(id, self)
+        return _BODIES[id]
+
     def __repr__(self):
         return f'Body("{self.name}")'
 
     def __eq__(self, other):
         return isinstance(other, Body) and other.id == self.id
 
+    def __hash__(self):
+        return hash(self._id)
+
+    def __reduce__(self):
+        return (Body, (self._id,))
+
     @property
     def id(self):
         """Body ID code."""
         return self._id
 
-    @id.setter
-    def id(self, id):
-        self._id = id
-        try:
-            self._name = spiceypy.bodc2n(id)
-        except SpiceyError as e:
-            raise ValueError(f'id "{id}" not known by SPICE') from e
-
     @property
     def name(self):
         """Body name."""
         return self._name
 
-    @name.setter
-    def name(self, name):
-        self._name = name
-        try:
-            self._id = spiceypy.bodn2c(name)
-        except SpiceyError as e:
-            raise ValueError(f'Body name "{name}" not known by SPICE') from e
+
+def _name_to_id(name):
+    if name not in _IDS:
+        from astrospice.pool import spice_lock
+
+        with spice_lock:
+            try:
+                _IDS[name] = spiceypy.bodn2c(name)
+            except SpiceyError as e:
+                raise ValueError(
+                    f'Body name "{name}" not known by SPICE') from e
+    return _IDS[name]
+
+
+def _clear_body_cache():
+    """
+    Clear the cached body names and IDs.
+
+    This is called when kernels are furnished, as text kernels can define new
+    body names or change existing ones.
+    """
+    _BODIES.clear()
+    _IDS.clear()
+
+
+def body_ids(bodies):
+    """
+    Resolve an array of body names and/or IDs to body IDs.
+
+    Each distinct name or ID is only resolved once.
+
+    Parameters
+    ----------
+    bodies : array_like
+        Body names (`str`), IDs (`int`), or `Body` objects.
+
+    Returns
+    -------
+    numpy.ndarray
+        Integer array of body IDs, with the same shape as ``bodies``.
+    """
+    bodies = np.asarray(bodies, dtype=object)
+    flat = bodies.reshape(-1)
+    # Resolve the first occurrence of each unique value, to keep its original
+    # type (e.g. int or str)
+    _, first, inverse = np.unique(flat.astype(str), return_index=True,
+                                  return_inverse=True)
+    ids = np.array([Body(flat[i]).id for i in first], dtype=int)
+    return ids[inverse.reshape(-1)].reshape(bodies.shape)
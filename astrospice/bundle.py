@@ -0,0 +1,88 @@
+"""
+Exporting the furnished kernels as a bundle that can be loaded in one step.
+"""
+from pathlib import Path
+
+import spiceypy
+
+from astrospice.kernel import _write_metakernel
+from astrospice.pool import _furnish_generic_kernels, _locked
+from astrospice.spk import _furnished_spk_files, _loaded_index, _write_spk
+
+__all__ = ['export_bundle']
+
+
+@_locked
+def export_bundle(directory, *, name='astrospice', consolidate=False):
+    """
+    Snapshot the kernels furnished with SPICE into a metakernel.
+
+    The metakernel lists every furnished kernel (including kernels furnished
+    by other metakernels, and kernels not furnished by astrospice) in the
+    order they were loaded, so furnishing it, e.g. with
+    ``Kernel(path)``, recreates the current set of kernels in a single
+    step. This is useful for starting worker processes.
+
+    If ``consolidate`` is `True`, the furnished SPK files are replaced by a
+    single SPK file, which contains only the data that SPICE would use for
+    each body at each time (i.e. the highest priority segment), copied from
+    the original files. Loading one file, with no overlapping segments, is
+    faster than loading many files, and SPICE has fewer segments to search
+    through to find data.
+
+    Parameters
+    ----------
+    directory : str, pathlib.Path
+        Directory to write the bundle to.
+    name : str, optional
+        Name of the bundle. The metakernel is written to ``{name}.tm``, and
+        the consolidated SPK file to ``{name}.bsp``. Existing files are
+        replaced.
+    consolidate : bool, optional
+        If `True`, consolidate the furnished SPK files into a single file.
+
+    Returns
+    -------
+    astrospice.MetaKernel
+        The metakernel, which is not furnished.
+    """
+    _furnish_generic_kernels()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    kernels = _furnished_files()
+    if consolidate:
+        spk_files = set(_furnished_spk_files())
+        if spk_files:
+            spk = directory / f'{name}.bsp'
+            _write_spk(spk, _consolidated_pieces())
+            kernels = [k for k in kernels if k not in spk_files] + [str(spk)]
+    return _write_metakernel(directory / f'{name}.tm', kernels)
+
+
+def _furnished_files():
+    """
+    Get all of the files furnished with SPICE, apart from metakernels, in
+    the order they were loaded.
+    """
+    files = []
+    for i in range(spiceypy.ktotal('ALL')):
+        fname, kind = spiceypy.kdata(i, 'ALL')[:2]
+        if kind != 'META':
+            files.append(fname)
+    return files
+
+
+def _consolidated_pieces():
+    """
+    Get the parts of the furnished segments that SPICE uses for each body.
+
+    Returns
+    -------
+    list[tuple]
+        ``(segment, start, stop)`` tuples, see `astrospice.spk._write_spk`.
+    """
+    index = _loaded_index()
+    return [(index.segments[seg_id], start, stop)
+            for body in index.bodies
+            for seg_id, start, stop in index._runs(body)]
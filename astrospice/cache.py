@@ -0,0 +1,196 @@
+"""
+Caching of generated ephemerides.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import spiceypy
+
+from astrospice.config import _atomic_write, _CacheDirectory
+from astrospice.pool import _locked
+
+__all__ = ['CoordsCache', 'coords_cache']
+
+
+class CoordsCache(_CacheDirectory):
+    """
+    A cache of ephemeris results, with an in-memory and an on-disk tier.
+
+    Results are keyed on the body, the times, the frame and observer, and a
+    fingerprint of all the kernels furnished with SPICE (their paths,
+    modification times and sizes). Loading, unloading or modifying a kernel
+    changes the fingerprint, so stale results are never returned.
+
+    Parameters
+    ----------
+    max_memory_items : int, optional
+        Maximum number of results to keep in memory. The least recently used
+        results are discarded first.
+    max_disk_bytes : int, optional
+        Maximum total size of the results saved on disk. The least recently
+        used files are deleted first. Set to 0 to disable the on-disk tier.
+    directory : str, pathlib.Path, optional
+        Directory to save results in. Defaults to a ``coords`` directory
+        within the astrospice cache directory.
+    """
+    _default_subdirectory = 'coords'
+
+    def __init__(self, *, max_memory_items=32, max_disk_bytes=2**30,
+                 directory=None):
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._directory = directory
+        self._memory = OrderedDict()
+        self._fingerprint = None
+
+    def __repr__(self):
+        return (f'CoordsCache(max_memory_items={self.max_memory_items}, '
+                f'max_disk_bytes={self.max_disk_bytes}, '
+                f"directory='{self.directory}')")
+
+    def key(self, body_id, times_et, frame, observer_id):
+        """
+        Get the cache key for an ephemeris request.
+
+        Parameters
+        ----------
+        body_id : int
+        times_et : numpy.ndarray
+            Ephemeris times.
+        frame : str
+        observer_id : int
+
+        Returns
+        -------
+        str
+        """
+        fingerprint = _kernel_fingerprint()
+        if fingerprint != self._fingerprint:
+            # The furnished kernels have changed, so all the results held in
+            # memory are stale
+            self._memory.clear()
+            self._fingerprint = fingerprint
+
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f'{body_id}|{frame}|{observer_id}|{fingerprint}|'.encode())
+        h.update(np.ascontiguousarray(times_et, dtype=float).tobytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Get a cached result.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The cached result, or `None` if it is not in the cache.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                result = f['states']
+        except (OSError, ValueError, KeyError):
+            return None
+        _touch(path)
+        self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """
+        Add a result to the cache.
+
+        Parameters
+        ----------
+        key : str
+        result : numpy.ndarray
+        """
+        result = np.array(result)
+        self._remember(key, result)
+        if self.max_disk_bytes <= 0:
+            return
+
+        with _atomic_write(self._path(key), 'wb') as f:
+            np.savez_compressed(f, states=result)
+        _touch(self._path(key))
+        self._evict()
+
+    def clear(self):
+        """
+        Remove all results from the cache, in memory and on disk.
+        """
+        self._memory.clear()
+        for path in self.directory.glob('*.npz'):
+            path.unlink(missing_ok=True)
+
+    def _path(self, key):
+        return self.directory / f'{key}.npz'
+
+    def _remember(self, key, result):
+        result.flags.writeable = False
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """
+        Delete the least recently used files until the total size is below
+        ``max_disk_bytes``.
+        """
+        files = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _touch(path):
+    """
+    Record an access to a file, for least recently used eviction.
+    """
+    # Set the time explicitly, as file system timestamps can be coarser than
+    # the time between accesses
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+@_locked
+def _kernel_fingerprint():
+    """
+    Get a fingerprint of the kernels currently furnished with SPICE.
+
+    Returns
+    -------
+    str
+        A hash of the path, modification time and size of every furnished
+        kernel, in load order.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for i in range(spiceypy.ktotal('ALL')):
+        fname = spiceypy.kdata(i, 'ALL')[0]
+        try:
+            stat = os.stat(fname)
+            h.update(f'{fname}|{stat.st_mtime_ns}|{stat.st_size}\n'.encode())
+        except OSError:
+            h.update(f'{fname}\n'.encode())
+    return h.hexdigest()
+
+
+#: The cache used by `astrospice.generate_coords`.
+coords_cache = CoordsCache()
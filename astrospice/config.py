@@ -1,3 +1,6 @@
+import contextlib
+import os
+import tempfile
 from pathlib import Path
 
 import astropy.config.paths
@@ -15,3 +18,54 @@ def get_cache_dir():
         The absolute path to the cache directory.
     """
     return Path(astropy.config.paths.get_cache_dir(rootname='astrospice'))
+
+
+@contextlib.contextmanager
+def _atomic_write(fname, mode='w'):
+    """
+    Open a file to replace ``fname`` with, creating its directory if needed.
+
+    The file is written to a temporary file and renamed when the context
+    exits, so other processes never see a partially written file. If an
+    error is raised, the temporary file is deleted and ``fname`` is left
+    unchanged.
+    """
+    fname = Path(fname)
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=fname.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp, fname)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+class _CacheDirectory:
+    """
+    Base class for objects that save files in a directory, which defaults to
+    a directory within the astrospice cache directory.
+
+    Subclasses set ``_directory`` in their ``__init__``, and can override
+    `_clear` to discard anything read from the previous directory when it is
+    changed.
+    """
+    #: Name of the default directory within the astrospice cache directory.
+    _default_subdirectory = '.'
+
+    @property
+    def directory(self):
+        """Directory that files are saved in."""
+        if self._directory is None:
+            return get_cache_dir() / self._default_subdirectory
+        return Path(self._directory)
+
+    @directory.setter
+    def directory(self, directory):
+        self._directory = directory
+        self._clear()
+
+    def _clear(self):
+        pass
@@ -1,41 +1,765 @@
+import asyncio
+import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import astropy.units as u
 import numpy as np
 import spiceypy
-from astropy.coordinates import SkyCoord
-from astropy.time import Time
+from astropy.coordinates import (
+    CartesianDifferential,
+    CartesianRepresentation,
+    SkyCoord,
+)
+from astropy.time import Time, TimeDelta
 
 from astrospice.body import Body
+from astrospice.cache import coords_cache
+from astrospice.parallel import _parallel_states
+from astrospice.pool import _furnish_generic_kernels, _locked, spice_lock
+from astrospice.spk import coverage_index, get_states, get_states_multi
+# This also registers the 'et' time format
+from astrospice.time import to_et
 
-__all__ = ['generate_coords']
+__all__ = ['agenerate_coords', 'generate_coords', 'generate_coords_multi',
+           'iter_coords']
 
+# _spkgeo_states calls CSPICE through these private parts of spiceypy, which
+# are not a stable API. If they move, fall back to the (slower) public API.
+try:
+    from spiceypy.spiceypy import check_for_spice_error
+    from spiceypy.utils.libspicehelper import libspice
+except ImportError:
+    libspice = None
 
-def generate_coords(body, times):
+_SUN = 10
+# Mapping from supported frame names to the body ID of their origin
+_FRAME_ORIGINS = {'icrs': 0, 'hcrs': _SUN, 'heliocentricinertial': _SUN}
+# Spacing of the times used to calculate the HCI rotation, in seconds
+_HCI_GRID_STEP = 30 * 86400
+# The thread that agenerate_coords evaluates ephemerides in
+_EXECUTOR = None
+# Mapping from (body, frame, observer, engine, event loop), as passed to
+# agenerate_coords, to the batch of requests that is waiting to be evaluated,
+# guarded by _BATCH_LOCK
+_PENDING = {}
+_BATCH_LOCK = threading.Lock()
+
+
+@_locked
+def generate_coords(body, times, *, frame=None, observer=None,
+                    output='skycoord', out=None, engine='spice', workers=None,
+                    cache=False, gaps='raise'):
     """
     Generate coordinates.
 
+    Parameters
+    ----------
+    body : `int`, `str`
+        Body ID code or name.
+    times : `~astropy.time.Time`, numpy.ndarray, tuple
+        Times at which to generate coordinates. Can be one of:
+
+        - A `~astropy.time.Time`.
+        - An array of floats, which are taken to be ephemeris times (see
+          `astrospice.time.ETEpoch`).
+        - An array of `numpy.datetime64`, which are taken to be UTC.
+        - A ``(start, stop, step)`` tuple, where ``start`` and ``stop`` are
+          `~astropy.time.Time` and ``step`` is a time
+          `~astropy.units.Quantity` or `~astropy.time.TimeDelta`. Times are
+          evenly spaced in ephemeris time from ``start`` (inclusive) to
+          ``stop`` (exclusive).
+
+        Only `~astropy.time.Time` objects need converting to ephemeris times
+        by astropy, which is slow for large numbers of times. For other
+        inputs the ``obstime`` of the returned
+        `~astropy.coordinates.SkyCoord` is created in the ``'et'`` format,
+        and no `~astropy.time.Time` is created at all if
+        ``output='array'``.
+    frame : str, optional
+        Name of the coordinate frame to return coordinates in. The state of
+        the body relative to the origin of the frame is computed directly
+        by SPICE, so no astropy frame transformations are needed. Can be one
+        of:
+
+        - ``'icrs'``: centred on the solar system barycentre.
+        - ``'hcrs'``: centred on the Sun, with ICRS axes.
+        - ``'heliocentricinertial'``: centred on the Sun, with the Z axis
+          along the solar rotation axis (requires sunpy, see
+          `sunpy.coordinates.HeliocentricInertial`).
+
+        Defaults to ``'icrs'``, or ``'hcrs'`` if ``observer`` is the Sun.
+    observer : `int`, `str`, optional
+        Body that coordinates are relative to. This must be the origin of
+        ``frame``, so only needs to be given if ``frame`` is not.
+    output : {'skycoord', 'array'}, optional
+        If ``'skycoord'``, return a `~astropy.coordinates.SkyCoord` with
+        positions and velocities. If ``'array'``, return a plain
+        ``(len(times), 6)`` array of positions (km) and velocities (km/s) in
+        ``frame``, which avoids the cost of creating a
+        `~astropy.coordinates.SkyCoord`.
+    out : numpy.ndarray, optional
+        A C-contiguous ``(len(times), 6)`` float64 array to write the
+        positions and velocities into. This avoids allocating a new array on
+        every call when generating coordinates repeatedly. If
+        ``output='array'`` this array is returned.
+    engine : {'spice', 'numpy'}, optional
+        How to evaluate the ephemeris. ``'spice'`` calls SPICE once for each
+        time. ``'numpy'`` reads the furnished SPK files and evaluates all the
+        times at once with NumPy (see `astrospice.spk`), which is much faster
+        for large numbers of times.
+    workers : int, optional
+        If given, split the times across this many worker processes and
+        evaluate them in parallel. Each worker is furnished with the kernels
+        loaded by astrospice (see `astrospice.furnished_kernels`), and the pool
+        of workers is re-used between calls. This is worthwhile for large
+        numbers of times.
+    cache : bool, optional
+        If `True`, look up the result in `astrospice.cache.coords_cache`
+        before computing it, and store it there afterwards. The cache is
+        automatically invalidated when kernels are loaded or unloaded.
+    gaps : {'raise', 'mask'}, optional
+        What to do if the loaded kernels don't cover some of the times. If
+        ``'raise'``, raise an error. If ``'mask'``, evaluate the covered
+        times only, and return a ``(coords, reasons)`` tuple. Uncovered
+        coordinates are NaN if ``output='skycoord'``, and masked if
+        ``output='array'`` (in which case a `numpy.ma.MaskedArray` is
+        returned). ``reasons`` is an array of strings, giving the reason
+        that each time is not covered, or an empty string if it is. Coverage
+        is checked with `astrospice.spk.coverage_index`.
+
     Returns
     -------
-    `~astropy.coordinates.SkyCoord`
+    `~astropy.coordinates.SkyCoord` or `numpy.ndarray` or tuple
+
+    See Also
+    --------
+    iter_coords : Generate coordinates in chunks, for long time series.
     """
+    _check_output(output)
+    if gaps not in ('raise', 'mask'):
+        raise ValueError(f'gaps must be "raise" or "mask", not "{gaps}"')
+    _furnish_generic_kernels()
     body = Body(body)
-    times = Time(times)
-    times_et = np.atleast_1d(times.et)
-    # Spice needs a funny set of times
-    abcorr = str(None)
-    frame = 'J2000'
-
-    # Do the calculation
-    pos_vel, lightTimes = spiceypy.spkezr(
-        body.name, times_et, frame, abcorr,
-        'SOLAR SYSTEM BARYCENTER')
-
-    positions = np.array(pos_vel)[:, :3] * u.km
-    velocities = np.array(pos_vel)[:, 3:] * u.km / u.s
-
-    return SkyCoord(x=positions[:, 0],
-                    y=positions[:, 1],
-                    z=positions[:, 2],
-                    obstime=times,
-                    frame='icrs',
-                    representation_type='cartesian')
+    frame, observer = _frame_observer(frame, observer)
+    times_et = _times_et(times)
+    _check_out(out, times_et.size)
+
+    pos_vel = None
+    if cache:
+        key = coords_cache.key(body.id, times_et, frame, observer.id)
+        pos_vel = coords_cache.get(key)
+        if pos_vel is not None and out is not None:
+            out[...] = pos_vel
+            pos_vel = out
+    covered = None
+    if gaps == 'mask':
+        missing = coverage_index()._missing(body.id, times_et, observer.id)
+        covered = missing == 0
+    if pos_vel is None:
+        if covered is None or covered.all():
+            pos_vel = _frame_states(body, times_et, frame, observer, engine,
+                                    workers, out=out)
+        else:
+            pos_vel = np.empty((times_et.size, 6)) if out is None else out
+            pos_vel[~covered] = np.nan
+            if covered.any():
+                pos_vel[covered] = _frame_states(body, times_et[covered],
+                                                 frame, observer, engine,
+                                                 workers)
+        # Don't cache NaNs for uncovered times, as the same key is used when
+        # gaps='raise'
+        if cache and (covered is None or covered.all()):
+            coords_cache.put(key, pos_vel)
+
+    if output == 'array':
+        # Cached results are read-only, so return a copy
+        result = pos_vel if pos_vel.flags.writeable else pos_vel.copy()
+        if covered is not None:
+            result = np.ma.MaskedArray(result, mask=np.repeat(
+                ~covered[:, None], 6, axis=1))
+    else:
+        result = _to_skycoord(pos_vel, _obstime(times, times_et), frame)
+    if covered is None:
+        return result
+    return result, _gap_reasons(missing)
+
+
+@_locked
+def generate_coords_multi(bodies, times, *, frame=None, observer=None,
+                          output='skycoord', engine='spice', workers=None):
+    """
+    Generate coordinates for several bodies at the same times.
+
+    This is faster than calling `generate_coords` for each body, as the
+    times are only converted once, and the coordinates share a single
+    ``obstime``. With ``engine='numpy'`` the states of the centres shared by
+    the bodies' ephemerides (e.g. the Sun) are also only evaluated once.
+
+    Parameters
+    ----------
+    bodies : list
+        Body ID codes or names.
+    times : `~astropy.time.Time`, numpy.ndarray, tuple
+        Times at which to generate coordinates. See `generate_coords`.
+    frame : str, optional
+        Coordinate frame. See `generate_coords`.
+    observer : `int`, `str`, optional
+        Body that coordinates are relative to. See `generate_coords`.
+    output : {'skycoord', 'array'}, optional
+        If ``'skycoord'``, return a dict mapping each of ``bodies`` to a
+        `~astropy.coordinates.SkyCoord`. If ``'array'``, return a
+        ``(len(bodies), len(times), 6)`` array of positions (km) and
+        velocities (km/s), in the same order as ``bodies``.
+    engine : {'spice', 'numpy'}, optional
+        How to evaluate the ephemeris. See `generate_coords`.
+    workers : int, optional
+        If given, evaluate the ephemeris in parallel using this many worker
+        processes. See `generate_coords`.
+
+    Returns
+    -------
+    dict or `numpy.ndarray`
+    """
+    _check_output(output)
+    _furnish_generic_kernels()
+    bodies = list(bodies)
+    body_objs = [Body(body) for body in bodies]
+    frame, observer = _frame_observer(frame, observer)
+    times_et = _times_et(times)
+
+    pos_vel = np.empty((len(bodies), times_et.size, 6))
+    if engine == 'numpy' and workers is None:
+        get_states_multi([body.id for body in body_objs], times_et,
+                         observer.id, out=pos_vel)
+    else:
+        for body, body_pos_vel in zip(body_objs, pos_vel):
+            _states(body, times_et, engine, workers, observer.id,
+                    out=body_pos_vel)
+    _rotate_to_frame(pos_vel, times_et, frame)
+
+    if output == 'array':
+        return pos_vel
+    obstime = _obstime(times, times_et)
+    return {body: _to_skycoord(body_pos_vel, obstime, frame)
+            for body, body_pos_vel in zip(bodies, pos_vel)}
+
+
+def iter_coords(body, times, *, chunk_size=100_000, output='skycoord',
+                frame=None, observer=None, engine='spice', workers=None):
+    """
+    Generate coordinates in chunks.
+
+    This is a generator version of `generate_coords`. Only one chunk of times
+    and coordinates is held in memory at once, so it can be used for time
+    series that are too long to fit in memory.
+
+    Parameters
+    ----------
+    body : `int`, `str`
+        Body ID code or name.
+    times : `~astropy.time.Time`, tuple, iterable
+        Times at which to generate coordinates. Can be one of:
+
+        - A `~astropy.time.Time` array.
+        - An array of floats (ephemeris times) or `numpy.datetime64` (UTC).
+          See `generate_coords`.
+        - A ``(start, stop, step)`` tuple, where ``start`` and ``stop`` are
+          `~astropy.time.Time` and ``step`` is a time
+          `~astropy.units.Quantity` or `~astropy.time.TimeDelta`. Times are
+          evenly spaced in ephemeris time from ``start`` (inclusive) to
+          ``stop`` (exclusive), and are only created one chunk at a time.
+        - Any other iterable of `~astropy.time.Time` (scalar or array), for
+          example a generator.
+    chunk_size : int, optional
+        Maximum number of times in each chunk.
+    output : {'skycoord', 'array'}, optional
+        If ``'skycoord'``, yield a `~astropy.coordinates.SkyCoord` for each
+        chunk. If ``'array'``, yield ``(et, states)`` tuples for each chunk,
+        where ``et`` is an array of ephemeris times and ``states`` is an
+        ``(len(et), 6)`` array of positions (km) and velocities (km/s).
+    frame : str, optional
+        Coordinate frame. See `generate_coords`.
+    observer : `int`, `str`, optional
+        Body that coordinates are relative to. See `generate_coords`.
+    engine : {'spice', 'numpy'}, optional
+        How to evaluate the ephemeris. See `generate_coords`.
+    workers : int, optional
+        If given, evaluate each chunk in parallel using this many worker
+        processes. See `generate_coords`.
+
+    Yields
+    ------
+    `~astropy.coordinates.SkyCoord` or tuple
+    """
+    _check_output(output)
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    _furnish_generic_kernels()
+    with spice_lock:
+        body = Body(body)
+        frame, observer = _frame_observer(frame, observer)
+    for times_et, obstime in _et_chunks(times, chunk_size):
+        # Only hold the lock while evaluating, not while the caller has the
+        # chunk
+        with spice_lock:
+            pos_vel = _frame_states(body, times_et, frame, observer, engine,
+                                    workers)
+        if output == 'array':
+            yield times_et, pos_vel
+        else:
+            if obstime is None:
+                obstime = _et_to_time(times_et)
+            yield _to_skycoord(pos_vel, obstime, frame)
+
+
+async def agenerate_coords(body, times, *, frame=None, observer=None,
+                           output='skycoord', engine='spice'):
+    """
+    Generate coordinates without blocking the running event loop.
+
+    SPICE is not thread safe, so ephemerides are evaluated one batch at a
+    time in a single background thread. Requests for the same body, frame,
+    observer and engine that are made while that thread is busy are
+    coalesced into one batch, which is evaluated with a single call. This
+    keeps an event loop responsive, and is much faster than evaluating
+    many small requests separately. If a coalesced batch fails (e.g.
+    because some times aren't covered by the loaded kernels) the requests
+    in it are evaluated separately, so only the requests that fail raise an
+    error.
+
+    Parameters
+    ----------
+    body : `int`, `str`
+        Body ID code or name.
+    times : `~astropy.time.Time`, numpy.ndarray, tuple
+        Times at which to generate coordinates. See `generate_coords`.
+    frame : str, optional
+        Coordinate frame. See `generate_coords`.
+    observer : `int`, `str`, optional
+        Body that coordinates are relative to. See `generate_coords`.
+    output : {'skycoord', 'array'}, optional
+        Type of output. See `generate_coords`.
+    engine : {'spice', 'numpy'}, optional
+        How to evaluate the ephemeris. See `generate_coords`.
+
+    Returns
+    -------
+    `~astropy.coordinates.SkyCoord` or `numpy.ndarray`
+    """
+    _check_output(output)
+    if engine not in ('spice', 'numpy'):
+        raise ValueError(f'engine must be "spice" or "numpy", not "{engine}"')
+    loop = asyncio.get_running_loop()
+    times_et = _times_et(times)
+
+    future = loop.create_future()
+    key = (body, frame, observer, engine, loop)
+    with _BATCH_LOCK:
+        batch = _PENDING.get(key)
+        is_new = batch is None
+        if is_new:
+            batch = _PENDING[key] = []
+        batch.append((times_et, future))
+    if is_new:
+        loop.run_in_executor(_get_executor(), _run_batch, key, batch)
+    # The body, frame and observer are resolved in the background thread,
+    # so that the event loop never waits for the SPICE lock
+    pos_vel, frame = await future
+
+    if output == 'array':
+        return pos_vel
+    return _to_skycoord(pos_vel, _obstime(times, times_et), frame)
+
+
+def _get_executor():
+    """
+    Get the single thread executor that `agenerate_coords` uses.
+    """
+    global _EXECUTOR
+    with _BATCH_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='astrospice')
+    return _EXECUTOR
+
+
+def _run_batch(key, batch):
+    """
+    Evaluate a batch of `agenerate_coords` requests, and set the result of
+    each request's future.
+
+    If anything goes wrong, every request in the batch that doesn't have a
+    result yet fails with the error, so no caller is left waiting.
+    """
+    loop = key[-1]
+    try:
+        _evaluate_batch(key, batch)
+    except Exception as e:
+        for _, future in batch:
+            loop.call_soon_threadsafe(_set_future, future, None, e)
+
+
+def _evaluate_batch(key, batch):
+    body, frame, observer, engine, loop = key
+    with spice_lock:
+        # Stop any more requests joining the batch
+        with _BATCH_LOCK:
+            if _PENDING.get(key) is batch:
+                del _PENDING[key]
+        _furnish_generic_kernels()
+        body = Body(body)
+        frame, observer = _frame_observer(frame, observer)
+        try:
+            pos_vel = _frame_states(
+                body, np.concatenate([times_et for times_et, _ in batch]),
+                frame, observer, engine)
+        except Exception:
+            if len(batch) == 1:
+                raise
+            # Only fail the requests that cause an error
+            for request in batch:
+                _run_batch(key, [request])
+            return
+
+    sizes = [times_et.size for times_et, _ in batch]
+    for (_, future), result in zip(batch,
+                                   np.split(pos_vel, np.cumsum(sizes)[:-1])):
+        loop.call_soon_threadsafe(_set_future, future, (result, frame), None)
+
+
+def _set_future(future, result, exception):
+    # The request may have been cancelled while it was being evaluated
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def _et_chunks(times, chunk_size):
+    """
+    Split times into chunks.
+
+    Yields
+    ------
+    times_et : numpy.ndarray
+        Ephemeris times.
+    obstime : `~astropy.time.Time` or None
+        The original times, if they were given as a `~astropy.time.Time`.
+    """
+    if isinstance(times, Time):
+        times = times.reshape(-1)
+        for i in range(0, times.size, chunk_size):
+            chunk = times[i:i + chunk_size]
+            yield chunk.et, chunk
+
+    elif _time_range(times) is not None:
+        start_et, step, n = _time_range(times)
+        for i in range(0, n, chunk_size):
+            yield start_et + step * np.arange(i, min(i + chunk_size, n)), None
+
+    elif isinstance(times, np.ndarray):
+        times = np.atleast_1d(to_et(times)).reshape(-1)
+        for i in range(0, times.size, chunk_size):
+            yield times[i:i + chunk_size], None
+
+    else:
+        buffer, size = [], 0
+        for t in times:
+            buffer.append(np.atleast_1d(to_et(t)))
+            size += buffer[-1].size
+            if size >= chunk_size:
+                times_et = np.concatenate(buffer)
+                n_full = size - size % chunk_size
+                for i in range(0, n_full, chunk_size):
+                    yield times_et[i:i + chunk_size], None
+                buffer, size = [times_et[n_full:]], size - n_full
+        if size:
+            yield np.concatenate(buffer), None
+
+
+def _time_range(times):
+    """
+    Parse a ``(start, stop, step)`` time range.
+
+    Returns
+    -------
+    start_et : float
+        First ephemeris time.
+    step : float
+        Step in seconds.
+    n : int
+        Number of times.
+
+    Returns `None` if ``times`` is not a time range.
+
+    Raises
+    ------
+    ValueError
+        If ``times`` is a 3-tuple, but the step is not a time.
+    """
+    if not (isinstance(times, tuple) and len(times) == 3):
+        return None
+    start, stop, step = times
+    if not isinstance(step, (u.Quantity, TimeDelta)):
+        raise ValueError('The step of a (start, stop, step) time range must '
+                         'be a Quantity or TimeDelta, not '
+                         f'{type(step).__name__}. To give three separate '
+                         'times, use a list or array.')
+    start_et = float(to_et(start))
+    stop_et = float(to_et(stop))
+    step = step.to_value(u.s)
+    if step <= 0:
+        raise ValueError('step must be positive')
+    n = max(int(np.ceil((stop_et - start_et) / step)), 0)
+    return start_et, step, n
+
+
+def _times_et(times):
+    """
+    Convert times given to `generate_coords` to an array of ephemeris times.
+    """
+    time_range = _time_range(times)
+    if time_range is not None:
+        start_et, step, n = time_range
+        return start_et + step * np.arange(n)
+    return np.atleast_1d(to_et(times))
+
+
+def _obstime(times, times_et):
+    """
+    Get the ``obstime`` for coordinates, re-using ``times`` if it is already
+    a `~astropy.time.Time`.
+    """
+    if isinstance(times, Time):
+        return times
+    return _et_to_time(times_et)
+
+
+def _et_to_time(times_et):
+    """
+    Create a `~astropy.time.Time` from ephemeris times, without any time
+    scale conversions.
+    """
+    time = Time(times_et, format='et')
+    time.format = 'isot'
+    return time
+
+
+def _frame_observer(frame, observer):
+    """
+    Validate and fill in the defaults for the frame and observer.
+
+    Returns
+    -------
+    frame : str
+    observer : astrospice.Body
+    """
+    if observer is not None:
+        observer = Body(observer)
+    if frame is None:
+        if observer is not None and observer.id == _SUN:
+            frame = 'hcrs'
+        else:
+            frame = 'icrs'
+    frame = frame.lower()
+    if frame not in _FRAME_ORIGINS:
+        raise ValueError(f'frame must be one of {list(_FRAME_ORIGINS)}, '
+                         f'not "{frame}"')
+
+    origin = Body(_FRAME_ORIGINS[frame])
+    if observer is None:
+        observer = origin
+    elif observer != origin:
+        raise ValueError(f'observer must be {origin} for frame "{frame}", '
+                         f'not {observer}')
+    return frame, observer
+
+
+def _gap_reasons(missing):
+    """
+    Get the reason that each time is not covered, from the ID of the first
+    body without ephemeris data at each time (0 where there is none).
+    """
+    ids, inverse = np.unique(missing, return_inverse=True)
+    reasons = np.array(['' if i == 0 else
+                        f'Insufficient ephemeris data loaded for body {i}'
+                        for i in ids])
+    return reasons[inverse.reshape(-1)]
+
+
+def _check_output(output):
+    if output not in ('skycoord', 'array'):
+        raise ValueError(
+            f'output must be "skycoord" or "array", not "{output}"')
+
+
+def _check_out(out, n):
+    """
+    Check that ``out`` can hold ``n`` states.
+    """
+    if out is None:
+        return
+    if (not isinstance(out, np.ndarray) or out.dtype != np.float64 or
+            out.shape != (n, 6) or not out.flags.c_contiguous or
+            not out.flags.writeable):
+        raise ValueError('out must be a writeable, C-contiguous float64 array '
+                         f'with shape ({n}, 6)')
+
+
+def _frame_states(body, times_et, frame, observer, engine, workers=None,
+                  out=None):
+    """
+    Get the state of ``body`` relative to ``observer``, in ``frame``.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(times_et), 6)`` array of positions (km) and velocities (km/s).
+        This is ``out`` if it is given.
+    """
+    pos_vel = _states(body, times_et, engine, workers, observer.id, out=out)
+    _rotate_to_frame(pos_vel, times_et, frame)
+    return pos_vel
+
+
+def _rotate_to_frame(pos_vel, times_et, frame):
+    """
+    Rotate ``(..., len(times_et), 6)`` states from J2000 axes to the axes of
+    ``frame``, in place.
+    """
+    if frame == 'heliocentricinertial':
+        rotation = _hci_rotation(times_et)
+        # Rotate positions and velocities at once
+        vectors = pos_vel.reshape(pos_vel.shape[:-1] + (2, 3))
+        vectors[...] = np.einsum('nij,...nkj->...nki', rotation, vectors)
+
+
+def _hci_rotation(times_et):
+    """
+    Rotation matrices from HCRS to sunpy's HeliocentricInertial frame.
+
+    The rotation changes very slowly with time, so it is calculated with
+    sunpy on a coarse grid of times and linearly interpolated.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(times_et), 3, 3)`` array of rotation matrices.
+    """
+    try:
+        from sunpy.coordinates import HeliocentricInertial
+    except ImportError as e:
+        raise ImportError('sunpy is required for the heliocentricinertial '
+                          'frame') from e
+    from astropy.coordinates import HCRS
+
+    start, stop = np.min(times_et), np.max(times_et)
+    n = max(int(np.ceil((stop - start) / _HCI_GRID_STEP)) + 1, 2)
+    grid = np.linspace(start, stop, n)
+    obstime = Time(grid, format='et')
+    ones, zeros = np.ones(n), np.zeros(n)
+    columns = []
+    for axis in np.eye(3):
+        vector = CartesianRepresentation(
+            *[(ones if x else zeros) * u.km for x in axis])
+        rotated = SkyCoord(vector, frame=HCRS(obstime=obstime)).transform_to(
+            HeliocentricInertial(obstime=obstime))
+        columns.append(rotated.cartesian.xyz.to_value(u.km).T)
+    # (n, 3, 3) array of matrices
+    matrices = np.stack(columns, axis=-1).reshape(n, 9)
+    rotation = np.stack([np.interp(times_et, grid, matrices[:, i])
+                         for i in range(9)], axis=-1)
+    return rotation.reshape(-1, 3, 3)
+
+
+def _states(body, times_et, engine, workers=None, observer=0, out=None):
+    """
+    Get the state of ``body`` relative to ``observer`` (by default the solar
+    system barycentre), in the J2000 frame.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(times_et), 6)`` array of positions (km) and velocities (km/s).
+        This is ``out`` if it is given.
+    """
+    if workers is not None:
+        pos_vel = _parallel_states(body, times_et, engine, workers, observer)
+        if out is None:
+            return pos_vel
+        out[...] = pos_vel
+        return out
+    if engine == 'spice':
+        return _spkgeo_states(body.id, times_et, 'J2000', observer, out=out)
+    elif engine == 'numpy':
+        return get_states(body.id, times_et, observer, out=out)
+    else:
+        raise ValueError(f'engine must be "spice" or "numpy", not "{engine}"')
+
+
+def _spkgeo_states(target, times_et, frame, observer, out=None):
+    """
+    Get geometric states from SPICE, using integer body IDs.
+
+    This calls the CSPICE ``spkgeo_c`` routine directly with ctypes, writing
+    each state straight into the output array. This avoids converting body
+    names to IDs and allocating intermediate Python objects for every time.
+    It relies on the private ``spiceypy.utils.libspicehelper.libspice`` and
+    ``spiceypy.spiceypy.check_for_spice_error``; if they are not available
+    `spiceypy.spkgeo` is called for each time instead.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(times_et), 6)`` array of positions (km) and velocities (km/s).
+        This is ``out`` if it is given, which must be C-contiguous.
+    """
+    times_et = np.ascontiguousarray(times_et, dtype=float).reshape(-1)
+    if out is None:
+        out = np.empty((times_et.size, 6))
+    if libspice is None:
+        for i, et in enumerate(times_et.tolist()):
+            out[i] = spiceypy.spkgeo(target, et, frame, observer)[0]
+        return out
+    state_type = ctypes.c_double * 6
+    address = out.ctypes.data
+    stride = out.strides[0]
+    target = ctypes.c_int(target)
+    frame = frame.encode()
+    observer = ctypes.c_int(observer)
+    lt = ctypes.c_double()
+    spkgeo = libspice.spkgeo_c
+    for i, et in enumerate(times_et.tolist()):
+        spkgeo(target, et, frame, observer,
+               state_type.from_address(address + i * stride),
+               ctypes.byref(lt))
+    # SPICE is in 'RETURN' error mode, so once an error has been signalled
+    # all further calls return immediately, and it is enough to check once
+    check_for_spice_error(None)
+    return out
+
+
+def _to_skycoord(pos_vel, times, frame='icrs'):
+    if frame == 'heliocentricinertial':
+        # Register the sunpy frames with astropy
+        import sunpy.coordinates  # noqa: F401
+    positions = CartesianRepresentation(pos_vel[:, :3].T, unit=u.km,
+                                        xyz_axis=0, copy=False)
+    velocities = CartesianDifferential(pos_vel[:, 3:].T, unit=u.km / u.s,
+                                       xyz_axis=0, copy=False)
+    coords = SkyCoord(positions.with_differentials(velocities),
+                      obstime=times,
+                      frame=frame,
+                      representation_type='cartesian',
+                      differential_type='cartesian')
+    if frame != 'icrs':
+        # Heliocentric frames are shown in their default (spherical)
+        # representation, so e.g. lon and distance can be accessed directly.
+        # This is set after creating the coordinates, so the data is only
+        # converted when it is accessed.
+        coords.representation_type = coords.frame.default_representation
+    return coords
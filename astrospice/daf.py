@@ -0,0 +1,109 @@
+"""
+Reading binary Double precision Array Files (DAF).
+
+SPK files are DAF files. This module reads them with a memory map, so the
+file record and segment summaries can be inspected without furnishing the file
+with SPICE, and segment data is only read from disk when it is used.
+
+References
+----------
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/daf.html
+"""
+import struct
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+__all__ = ['DAFFile']
+
+# DAF record length in bytes
+_RECORD_BYTES = 1024
+# Number of double precision words in a record
+_RECORD_WORDS = _RECORD_BYTES // 8
+_BYTEORDERS = {'BIG-IEEE': '>', 'LTL-IEEE': '<'}
+
+
+class DAFFile:
+    """
+    A binary DAF file.
+
+    Parameters
+    ----------
+    fname : str, pathlib.Path
+        Path to the file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a binary DAF file in a supported format.
+    """
+    def __init__(self, fname):
+        self._fname = fname
+        with open(fname, 'rb') as f:
+            record = f.read(_RECORD_BYTES)
+
+        locfmt = record[88:96].decode('ascii', errors='replace')
+        idword = record[:8].decode('ascii', errors='replace')
+        if (len(record) < _RECORD_BYTES or
+                not (idword.startswith('DAF/') or idword == 'NAIF/DAF') or
+                locfmt not in _BYTEORDERS):
+            raise ValueError(f'{fname} is not a binary DAF file in a '
+                             'supported format')
+
+        self._byteorder = _BYTEORDERS[locfmt]
+        #: File type, e.g. ``'SPK'``. Empty for files in the old
+        #: ``'NAIF/DAF'`` format, which do not record their type.
+        self.type = idword[4:].strip() if idword.startswith('DAF/') else ''
+        #: Number of double precision and integer components in each array
+        #: summary
+        self.nd, self.ni = struct.unpack(f'{self._byteorder}2i', record[8:16])
+        #: Internal file name
+        self.internal_name = record[16:76].decode('ascii').strip()
+        self._fward, = struct.unpack(f'{self._byteorder}i', record[76:80])
+
+    def __repr__(self):
+        return f"DAFFile('{self._fname}')"
+
+    @property
+    def fname(self):
+        """Path to the file."""
+        return Path(self._fname)
+
+    @cached_property
+    def data(self):
+        """
+        Memory mapped view of the file, as double precision words.
+
+        DAF addresses are 1-indexed, so the word at DAF address ``i`` is
+        ``data[i - 1]``.
+        """
+        return np.memmap(self._fname, dtype=f'{self._byteorder}f8', mode='r')
+
+    @cached_property
+    def summaries(self):
+        """
+        Array summaries.
+
+        Returns
+        -------
+        doubles : numpy.ndarray
+            ``(n_arrays, nd)`` array of the double precision components.
+        ints : numpy.ndarray
+            ``(n_arrays, ni)`` array of the integer components.
+        """
+        summary_size = self.nd + (self.ni + 1) // 2
+        records = []
+        next_record = self._fward
+        while next_record > 0:
+            start = (next_record - 1) * _RECORD_WORDS
+            next_record, _, nsum = self.data[start:start + 3].astype(int)
+            records.append(self.data[start + 3:
+                                     start + 3 + nsum * summary_size])
+
+        words = np.concatenate(records).reshape(-1, summary_size)
+        doubles = np.array(words[:, :self.nd], dtype=float)
+        ints = (np.ascontiguousarray(words[:, self.nd:])
+                .view(f'{self._byteorder}i4')[:, :self.ni]
+                .astype(int))
+        return doubles, ints
@@ -1,35 +1,122 @@
+import hashlib
 import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
 
+import numpy as np
 import spiceypy
 from astropy.time import Time
 
 from astrospice.body import Body
-
-__all__ = ['KernelBase', 'Kernel', 'SPKKernel', 'MetaKernel']
+from astrospice.config import _atomic_write, get_cache_dir
+from astrospice.pool import _is_loaded, _locked, kernel_pool, spice_lock
+from astrospice.spk import (
+    CoverageIndex,
+    _file_segments,
+    _write_spk,
+    read_summary,
+)
+from astrospice.textkernel import read_text_kernel
+# This also registers the 'et' time format
+from astrospice.time import to_et
+
+__all__ = ['KernelBase', 'Kernel', 'SPKKernel', 'MetaKernel',
+           'furnished_kernels']
 
 
 log = logging.getLogger(__name__)
 # Mapping from filename extension to Kernel class
 _REGISTRY = {}
+# Maximum number of threads used to check that files exist
+_MAX_CHECK_THREADS = 32
+# Maximum length of a string in a text kernel
+_MAX_STRING_LENGTH = 80
+
+
+def _furnish(fname, *, pinned=False):
+    """
+    Furnish SPICE with a kernel, using the astrospice kernel pool.
+
+    If the kernel is in the directory of `astrospice.net.cache.kernel_cache`
+    and wasn't already loaded, it is also marked as used in the cache.
+    """
+    from astrospice.net.cache import kernel_cache
+
+    with spice_lock:
+        loaded = fname in kernel_pool
+        kernel_pool.furnish(fname, pinned=pinned)
+    # Only update the index on disk when the kernel is loaded, not every time
+    # it is furnished again
+    if (not loaded and
+            Path(fname).parent.resolve() == kernel_cache.directory.resolve()):
+        kernel_cache.touch(fname)
+
+
+def furnished_kernels():
+    """
+    Get the kernels that have been furnished by astrospice.
+
+    Kernels that have since been unloaded from SPICE are not included.
+
+    Returns
+    -------
+    list[pathlib.Path]
+        Paths to the kernels, in the order they were furnished.
+
+    See Also
+    --------
+    astrospice.kernel_pool
+    """
+    return kernel_pool.kernels
 
 
 class KernelBase:
     """
     Class for a single kernel.
 
+    Parameters
+    ----------
+    fname : str, pathlib.Path
+        Path to the kernel file.
+    furnish : bool, optional
+        If `True` (the default), furnish SPICE with the kernel.
+
     Notes
     -----
-    When creating instances of this class, SPICE is automatically furnished
-    with the kernel.
+    By default when creating instances of this class, SPICE is automatically
+    furnished with the kernel. Kernels can also be used as context managers,
+    in which case they are unloaded at the end of the ``with`` block.
     """
-    def __init__(self, fname):
+    def __init__(self, fname, *, furnish=True):
         self._fname = fname
-        spiceypy.furnsh(self._fname_str)
+        if furnish:
+            _furnish(self._fname_str)
 
     def __init_subclass__(cls):
         _REGISTRY[cls._file_extension] = cls
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if self.is_furnished:
+            self.unload()
+
+    @property
+    @_locked
+    def is_furnished(self):
+        """`True` if the kernel is currently furnished with SPICE."""
+        return self.fname in kernel_pool
+
+    def unload(self):
+        """
+        Unload the kernel from SPICE.
+        """
+        kernel_pool.unload(self.fname)
+
     @property
     def fname(self):
         """Path to kernel file."""
@@ -40,7 +127,7 @@ class KernelBase:
         return str(self.fname)
 
 
-def Kernel(fname):
+def Kernel(fname, *, furnish=True):
     """
     Load a SPICE kernel.
 
@@ -48,6 +135,8 @@ def Kernel(fname):
     ----------
     fname : str, pathlib.Path
         Path to the kernel file.
+    furnish : bool, optional
+        If `True` (the default), furnish SPICE with the kernel.
 
     Returns
     -------
@@ -57,26 +146,29 @@ def Kernel(fname):
     """
     extension = Path(fname).suffix
     if extension in _REGISTRY:
-        return _REGISTRY[extension](fname)
+        return _REGISTRY[extension](fname, furnish=furnish)
     else:
         log.debug(f'Filename extension "{extension}" not in '
                   f'known extensions: {list(_REGISTRY.keys())}, '
                   'but furnishing with SPICE anyway.')
-        return KernelBase(fname)
+        return KernelBase(fname, furnish=furnish)
 
 
 class SPKKernel(KernelBase):
     """
     A class for a single .spk kernel.
 
+    Metadata about the kernel (e.g. `bodies`, `coverage`) is read directly
+    from the file, so is available without furnishing the kernel.
+
     References
     ----------
     https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/spk.html
     """
     _file_extension = '.bsp'
 
-    def __init__(self, fname):
-        super().__init__(fname)
+    def __init__(self, fname, *, furnish=True):
+        super().__init__(fname, furnish=furnish)
         # Run bodies() to validate the spice kernel
         self.bodies
 
@@ -87,11 +179,21 @@ class SPKKernel(KernelBase):
         body_strs = ', '.join(body_strs)
         return f'SPK Kernel for {body_strs}'
 
+    @cached_property
+    def summary(self):
+        """
+        Summaries of the segments in the kernel.
+
+        See `astrospice.spk.read_summary` for the fields of the returned
+        structured array.
+        """
+        return read_summary(self.fname)
+
     @property
     def bodies(self):
         """List of the bodies stored within the kernel."""
-        ids = [int(i) for i in spiceypy.spkobj(self._fname_str)]
-        return [Body(i) for i in ids]
+        ids = np.unique(self.summary['target'])
+        return [Body(int(i)) for i in ids]
 
     def coverage(self, body):
         """
@@ -104,23 +206,97 @@ class SPKKernel(KernelBase):
         Returns
         -------
         astropy.time.Time
+            Start and end times of each interval covered by the kernel.
         """
         body = Body(body)
-        coverage = [t for t in spiceypy.spkcov(self._fname_str, body.id)]
+        segments = self.summary[self.summary['target'] == body.id]
+        segments = np.sort(segments, order='start')
+        # Merge overlapping segment windows
+        intervals = []
+        for start, stop in zip(segments['start'], segments['stop']):
+            if intervals and start <= intervals[-1][1]:
+                intervals[-1][1] = max(intervals[-1][1], stop)
+            else:
+                intervals.append([start, stop])
+        coverage = np.array(intervals).ravel()
         return Time(coverage, format='et').utc
 
+    def subset(self, fname, bodies, start=None, stop=None):
+        """
+        Write a new SPK file containing a subset of this kernel.
+
+        The new file contains the data for ``bodies``, and for the chain of
+        segment centers they are defined relative to (as far as they are in
+        this kernel), between ``start`` and ``stop``. Only the data SPICE
+        would use is copied, so overlapping segments in this kernel are not
+        duplicated. This kernel does not need to be furnished.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+            Path to write the new file to. Any existing file is replaced.
+        bodies : list
+            Body ID codes or names.
+        start, stop : `~astropy.time.Time`, float, optional
+            Time range to include, as `~astropy.time.Time` or ephemeris
+            times. Defaults to the whole time range of the kernel.
+
+        Returns
+        -------
+        SPKKernel
+            The new kernel, which is not furnished.
+
+        Raises
+        ------
+        ValueError
+            If this kernel has no data for one of ``bodies`` between
+            ``start`` and ``stop``.
+        """
+        start = -np.inf if start is None else float(to_et(start))
+        stop = np.inf if stop is None else float(to_et(stop))
+        if stop <= start:
+            raise ValueError('start must be before stop')
+
+        index = CoverageIndex(_file_segments(str(self.fname)))
+        pieces = {}
+        todo = [Body(body).id for body in bodies]
+        required = set(todo)
+        while todo:
+            body = todo.pop()
+            if body in pieces or body not in index.bodies:
+                continue
+            pieces[body] = [
+                (index.segments[seg_id], max(lower, start), min(upper, stop))
+                for seg_id, lower, upper in index._runs(body)
+                if lower < stop and upper > start]
+            todo += [segment.center for segment, _, _ in pieces[body]]
+
+        for body in required:
+            if not pieces.get(body):
+                raise ValueError(f'{self.fname} has no data for body {body} '
+                                 f'between ET {start} and {stop}')
+        _write_spk(fname, [piece for body in sorted(pieces)
+                           for piece in pieces[body]])
+        return SPKKernel(fname, furnish=False)
+
 
 class MetaKernel(KernelBase):
     """
     A class for a single .tm kernel.
 
+    The meta-kernel is parsed with `astrospice.textkernel.read_text_kernel`,
+    so the listed kernels are known without furnishing it. Path symbols in
+    ``KERNELS_TO_LOAD`` are replaced with their ``PATH_VALUES``, and strings
+    continued with ``+`` are joined. Relative paths (including relative path
+    values) are taken relative to the directory containing the meta-kernel.
+
     References
     ----------
     https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/kernel.html#Additional%20Meta-kernel%20Specifications
     """
     _file_extension = '.tm'
 
-    def __init__(self, fname):
+    def __init__(self, fname, *, furnish=True):
         """
         Loading the metakernel will load all the kernels specified, if they exist.
 
@@ -128,9 +304,11 @@ class MetaKernel(KernelBase):
         ----------
         fname : str, pathlib.Path
             Path to the metakernel file.
+        furnish : bool, optional
+            If `False`, do not load the kernels specified.
         """
         self._fname = fname
-        if self.all_kernels_exist:
+        if furnish and self.all_kernels_exist:
             self.load_kernels()
 
     def __repr__(self):
@@ -147,44 +325,155 @@ class MetaKernel(KernelBase):
         Returns
         -------
         kernels : list of kernel Paths
+
+        Raises
+        ------
+        ValueError
+            If a path uses a symbol that is not defined in ``PATH_SYMBOLS``.
         """
+        variables = read_text_kernel(self.fname)
+        values = _join_continued(variables.get('PATH_VALUES', []))
+        symbols = dict(zip(variables.get('PATH_SYMBOLS', []), values))
+        symbol_re = re.compile(r'\$(\w+)')
+
+        def replace(match):
+            if match[1] not in symbols:
+                raise ValueError(f'Path symbol "{match[1]}" in {self.fname} '
+                                 'is not defined in PATH_SYMBOLS')
+            return symbols[match[1]]
+
         kernels = []
-        with open(self.fname, "r") as file:
-            look_for_kernels = False
-            for line in file:
-                # split by whitespace
-                line_split = line.split()
-
-                # now find the ) bracket by itself, this is the end of kernels to load
-                if len(line_split) >= 1 and line_split[0] == ')':
-                    look_for_kernels = False
-                    break
-
-                if look_for_kernels and len(line_split) > 0:
-                    # find the filename for the kernel.
-                    # The slicing removes the $KERNEL and the final '
-                    kernel_fname = line_split[0][9:-1]
-                    # do not add empty lines
-                    if kernel_fname != '':
-                        # slice removes the first \
-                        kernels.append(self.fname.parent / kernel_fname[1:])
-                if len(line_split) > 1 and line_split[0] == 'KERNELS_TO_LOAD':
-                    look_for_kernels = True
+        for kernel in _join_continued(variables.get('KERNELS_TO_LOAD', [])):
+            kernels.append(self.fname.parent / symbol_re.sub(replace, kernel))
         return kernels
 
     def load_kernels(self):
         """
-        Loads the kernels specified by the metakernel
+        Loads the kernels specified by the metakernel.
+
+        All the kernels are loaded with a single call to SPICE, using a copy
+        of the metakernel with absolute paths that is written to the
+        ``metakernels`` directory within the astrospice cache directory.
+
+        The copy is a single entry in `astrospice.kernel_pool`, and the
+        kernels it lists are not added to the pool separately. The segments
+        in all the listed kernels count towards the pool's ``max_segments``,
+        but if the pool is over its limits the listed kernels are all
+        unloaded together, and not individually.
+        """
+        fname = self._resolved_fname()
+        with spice_lock:
+            try:
+                kernel_pool.furnish(fname)
+            except Exception:
+                # Unload any kernels that were loaded before the error
+                if _is_loaded(str(fname)):
+                    spiceypy.unload(str(fname))
+                raise
+
+    def _resolved_fname(self):
+        """
+        Write a copy of the metakernel that lists the absolute path of each
+        kernel, and return its path.
+        """
+        text = _metakernel_text(self.kernels)
+        digest = hashlib.sha256(text.encode()).hexdigest()[:16]
+        fname = (get_cache_dir() / 'metakernels' /
+                 f'{self.fname.stem}_{digest}.tm')
+        if not fname.exists():
+            with _atomic_write(fname) as f:
+                f.write(text)
+        return fname
+
+    @property
+    @_locked
+    def is_furnished(self):
+        """
+        `True` if all the kernels specified by the metakernel are currently
+        furnished with SPICE.
+        """
+        return all(_is_loaded(os.path.abspath(kernel))
+                   for kernel in self.kernels)
+
+    def unload(self):
         """
+        Unload the kernels specified by the metakernel from SPICE.
+        """
+        fname = self._resolved_fname()
+        if fname in kernel_pool:
+            kernel_pool.unload(fname)
         for kernel in self.kernels:
-            KernelBase(kernel)
+            if kernel in kernel_pool:
+                kernel_pool.unload(kernel)
+
+    @property
+    def missing_kernels(self):
+        """
+        The kernels specified by the metakernel that do not exist.
+
+        The files are checked in parallel, which is much faster for large
+        metakernels on network file systems.
+        """
+        kernels = self.kernels
+        if not kernels:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(kernels),
+                                                _MAX_CHECK_THREADS)) as pool:
+            exists = list(pool.map(os.path.exists, kernels))
+        return [kernel for kernel, e in zip(kernels, exists) if not e]
 
     @property
     def all_kernels_exist(self):
         """
         Return `True` if all kernels in the metakernel exist.
         """
-        for kernel in self.kernels:
-            if not kernel.exists():
-                return False
-        return True
+        return not self.missing_kernels
+
+
+def _write_metakernel(fname, kernels):
+    """
+    Write a metakernel that loads ``kernels`` (with absolute paths), and
+    return it without furnishing it.
+    """
+    with _atomic_write(fname) as f:
+        f.write(_metakernel_text(kernels))
+    return MetaKernel(fname, furnish=False)
+
+
+def _metakernel_text(kernels):
+    """
+    Get the text of a metakernel that loads ``kernels``.
+    """
+    lines = ['KPL/MK', '', '\\begindata', '', 'KERNELS_TO_LOAD = (']
+    for kernel in kernels:
+        lines += [f"    '{part}'" for part in
+                  _split_continued(os.path.abspath(kernel))]
+    lines += ')', '', '\\begintext', ''
+    return '\n'.join(lines)
+
+
+def _join_continued(strings):
+    """
+    Join strings that are continued with a trailing ``+``.
+    """
+    joined, current = [], ''
+    for string in strings:
+        if string.endswith('+'):
+            current += string[:-1]
+        else:
+            joined.append(current + string)
+            current = ''
+    if current:
+        joined.append(current)
+    return joined
+
+
+def _split_continued(string):
+    """
+    Split a string into parts short enough for a text kernel, continued with
+    a trailing ``+``, with quotes escaped.
+    """
+    length = _MAX_STRING_LENGTH - 1
+    parts = [string[i:i + length] for i in range(0, len(string), length)]
+    parts = [part + '+' for part in parts[:-1]] + parts[-1:]
+    return [part.replace("'", "''") for part in parts]
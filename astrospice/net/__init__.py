@@ -1,2 +1,24 @@
-import astrospice.net.sources
-from astrospice.net.reg import *
+import importlib
+
+# The registry and its sources import several networking libraries, so are
+# only imported when first used
+__all__ = ['KernelRegistry', 'RemoteKernel', 'RemoteKernelsBase', 'registry']
+_SUBMODULES = ['cache', 'download', 'generic', 'listing', 'reg',
+               'sources']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'astrospice.net.{name}')
+    if name not in __all__:
+        raise AttributeError(
+            f"module 'astrospice.net' has no attribute '{name}'")
+    # Importing the sources adds them to the registry
+    importlib.import_module('astrospice.net.sources')
+    value = getattr(importlib.import_module('astrospice.net.reg'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__ + _SUBMODULES)
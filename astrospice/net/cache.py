@@ -0,0 +1,361 @@
+"""
+Management of the kernels downloaded to the astrospice cache directory.
+"""
+import json
+import time
+from pathlib import Path
+
+from astropy.table import Table
+from astropy.time import Time
+
+from astrospice.config import _atomic_write, _CacheDirectory
+
+__all__ = ['KernelCache', 'kernel_cache']
+
+# Name of the index file within the cache directory
+_INDEX_NAME = 'kernels.json'
+
+
+class KernelCache(_CacheDirectory):
+    """
+    An index of the kernels in the astrospice cache directory.
+
+    The index records the source URL, size, version, last access time and
+    (for SPK files) segment coverage of each kernel, so questions about what
+    is available locally can be answered without fetching remote listings
+    or opening any kernels.
+
+    The cache can be limited to a maximum total size and/or a maximum time
+    since each kernel was last used. Kernels that break these limits are
+    deleted by `evict`, which is also run automatically whenever a kernel is
+    added to the cache. Kernels that are currently furnished with SPICE are
+    never deleted.
+
+    The index file can be shared by several processes. Each time the index is
+    saved, it is merged with the changes other processes have saved.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum total size of the kernels in the cache.
+    max_age : float, optional
+        Maximum time in seconds since a kernel was last used.
+    directory : str, pathlib.Path, optional
+        Cache directory. Defaults to the astrospice cache directory.
+    """
+    def __init__(self, *, max_bytes=None, max_age=None, directory=None):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._directory = directory
+        self._entries = None
+        # Filenames removed from the index since it was last saved
+        self._removed = set()
+
+    def __repr__(self):
+        return (f'KernelCache(max_bytes={self.max_bytes}, '
+                f"max_age={self.max_age}, directory='{self.directory}')")
+
+    def __contains__(self, fname):
+        return Path(fname).name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _clear(self):
+        self._entries = None
+        self._removed = set()
+
+    @property
+    def entries(self):
+        """
+        Mapping from filename to the index entry of each kernel.
+        """
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    @property
+    def total_bytes(self):
+        """Total size of the kernels in the cache."""
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def add(self, fname, *, url=None, version=None):
+        """
+        Add a kernel in the cache directory to the index.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+            Path to the kernel.
+        url : str, optional
+            URL the kernel was downloaded from.
+        version : int, optional
+            Kernel version.
+        """
+        name = self._add(fname, url=url, version=version)
+        self._evict(self.max_bytes, self.max_age, keep={name})
+        self._save()
+
+    def touch(self, fname):
+        """
+        Record that a kernel in the cache has been used.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+            Path to the kernel.
+        """
+        name = self._touch(fname)
+        self._evict(self.max_bytes, self.max_age, keep={name})
+        self._save()
+
+    def scan(self):
+        """
+        Bring the index up to date with the contents of the cache directory.
+
+        Kernels that are in the directory but not in the index (e.g. because
+        they were downloaded by an older version of astrospice) are added,
+        and kernels that have been deleted are removed from the index.
+        """
+        names = {path.name for path in self.directory.glob('*')
+                 if path.is_file() and _is_kernel(path)}
+        for name in set(self.entries) - names:
+            del self.entries[name]
+            self._removed.add(name)
+        for name in names:
+            path = self.directory / name
+            entry = self.entries.get(name)
+            if entry is None or entry['mtime'] != path.stat().st_mtime:
+                accessed = None if entry is None else entry['accessed']
+                self._add(path)
+                if accessed is not None:
+                    self.entries[name]['accessed'] = accessed
+        self._save()
+
+    def evict(self, *, max_bytes=None, max_age=None):
+        """
+        Delete kernels from the cache.
+
+        Kernels that have not been used for longer than ``max_age`` are
+        deleted first, and then the least recently used kernels are deleted
+        until the cache is no larger than ``max_bytes``. Kernels that are
+        furnished with SPICE are never deleted.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Maximum total size of the cache. Defaults to the ``max_bytes`` the
+            cache was created with.
+        max_age : float, optional
+            Maximum time in seconds since each kernel was last used. Defaults
+            to the ``max_age`` the cache was created with.
+
+        Returns
+        -------
+        list[pathlib.Path]
+            Paths to the deleted kernels.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age is None else max_age
+        deleted = self._evict(max_bytes, max_age)
+        if deleted:
+            self._save()
+        return deleted
+
+    def _add(self, fname, *, url=None, version=None):
+        """
+        Add or update the index entry for a kernel, without saving the index.
+
+        Returns
+        -------
+        str
+            Filename of the kernel.
+        """
+        path = self.directory / Path(fname).name
+        stat = path.stat()
+        entry = self.entries.get(path.name, {})
+        if entry.get('mtime') != stat.st_mtime or 'segments' not in entry:
+            entry['segments'] = _segments(path)
+        entry.update({'size': stat.st_size,
+                      'mtime': stat.st_mtime,
+                      'accessed': time.time()})
+        if url is not None:
+            entry['url'] = url
+        if version is not None:
+            entry['version'] = int(version)
+        self.entries[path.name] = entry
+        return path.name
+
+    def _touch(self, fname):
+        """
+        Update the last access time of a kernel, without saving the index.
+
+        Returns
+        -------
+        str
+            Filename of the kernel.
+        """
+        name = Path(fname).name
+        if name not in self.entries:
+            return self._add(fname)
+        self.entries[name]['accessed'] = time.time()
+        return name
+
+    def _evict(self, max_bytes, max_age, keep=()):
+        """
+        Delete kernels to keep within the limits, never deleting the
+        filenames in ``keep``, without saving the index.
+        """
+        from astrospice.pool import _is_loaded
+
+        if max_bytes is None and max_age is None:
+            return []
+
+        now = time.time()
+        total = self.total_bytes
+        deleted = []
+        for name, entry in sorted(self.entries.items(),
+                                  key=lambda item: item[1]['accessed']):
+            too_old = max_age is not None and now - entry['accessed'] > max_age
+            too_big = max_bytes is not None and total > max_bytes
+            if not (too_old or too_big):
+                continue
+            path = self.directory / name
+            if name in keep or _is_loaded(str(path)):
+                continue
+            path.unlink(missing_ok=True)
+            del self.entries[name]
+            self._removed.add(name)
+            total -= entry['size']
+            deleted.append(path)
+        return deleted
+
+    def table(self):
+        """
+        Get a table of the kernels in the cache.
+
+        Returns
+        -------
+        astropy.table.Table
+            Table with one row for each kernel, containing its filename,
+            source URL, version, size in bytes, last access time, the bodies
+            it contains and the time range it covers (for SPK files).
+        """
+        rows = [(name,
+                 entry.get('url', ''),
+                 entry.get('version', -1),
+                 entry['size'],
+                 Time(entry['accessed'], format='unix').iso,
+                 ', '.join(str(target) for target in
+                           sorted({s[0] for s in entry['segments']})),
+                 *_coverage(entry['segments']))
+                for name, entry in sorted(self.entries.items())]
+        names = ['File', 'URL', 'Version', 'Size', 'Last accessed', 'Bodies',
+                 'Start time', 'End time']
+        if not rows:
+            return Table(names=names, dtype=[str, str, int, int] + [str] * 4)
+        return Table(rows=rows, names=names)
+
+    def kernels(self, body=None, time=None):
+        """
+        Get the kernels in the cache, optionally filtered by their contents.
+
+        Parameters
+        ----------
+        body : `int`, `str`, optional
+            If given, only return SPK kernels that contain this body.
+        time : `~astropy.time.Time`, optional
+            If given, only return SPK kernels with a segment that covers this
+            time (and if ``body`` is given, a segment for that body).
+
+        Returns
+        -------
+        list[pathlib.Path]
+        """
+        if body is not None:
+            from astrospice.body import Body
+            body = Body(body).id
+        if time is not None:
+            time = Time(time).et
+
+        paths = []
+        for name, entry in sorted(self.entries.items()):
+            segments = entry['segments']
+            if body is not None:
+                segments = [s for s in segments if s[0] == body]
+            if time is not None:
+                segments = [s for s in segments if s[2] <= time <= s[3]]
+            if (body is None and time is None) or segments:
+                paths.append(self.directory / name)
+        return paths
+
+    def _index_path(self):
+        return self.directory / _INDEX_NAME
+
+    def _load(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        """
+        Save the index, merged with any changes that other processes have
+        saved since it was loaded.
+        """
+        saved = self._load()
+        for name, entry in saved.items():
+            if name in self._removed:
+                continue
+            if name not in self.entries:
+                self.entries[name] = entry
+            elif self.entries[name]['mtime'] == entry['mtime']:
+                self.entries[name]['accessed'] = max(
+                    self.entries[name]['accessed'], entry['accessed'])
+        # Kernels that are missing from the saved index may have been deleted
+        # by another process
+        for name in set(self.entries) - set(saved):
+            if not (self.directory / name).exists():
+                del self.entries[name]
+        self._removed.clear()
+
+        with _atomic_write(self._index_path()) as f:
+            json.dump(self.entries, f)
+
+
+def _is_kernel(path):
+    """
+    Whether a file in the cache directory is a kernel.
+    """
+    return (path.name != _INDEX_NAME and
+            path.suffix not in ('.part', '.tmp', '.json'))
+
+
+def _segments(path):
+    """
+    Get the ``[target, center, start, stop]`` of each segment of an SPK
+    file, or an empty list for other kernels.
+    """
+    from astrospice.spk import read_summary
+
+    try:
+        summary = read_summary(path)
+    except (OSError, ValueError):
+        return []
+    return [[int(s['target']), int(s['center']),
+             float(s['start']), float(s['stop'])] for s in summary]
+
+
+def _coverage(segments):
+    """
+    Get the ISO start and end times covered by a list of segments.
+    """
+    if not segments:
+        return '', ''
+    return tuple(Time([min(s[2] for s in segments),
+                       max(s[3] for s in segments)], format='et').iso)
+
+
+#: The kernel cache used by astrospice.
+kernel_cache = KernelCache()
@@ -0,0 +1,248 @@
+"""
+Concurrent, resumable downloads of remote kernels.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import aiohttp
+
+from astrospice.config import get_cache_dir
+from astrospice.daf import DAFFile
+from astrospice.net.cache import kernel_cache
+
+__all__ = ['adownload_kernels', 'download_kernels']
+
+# Size of the chunks that downloads are written to disk in
+_CHUNK_SIZE = 2**20
+# DAF files are made of whole records of this many bytes
+_DAF_RECORD_BYTES = 1024
+# The FTP validation string in the DAF file record, which is mangled if the
+# file is transferred in text mode
+_DAF_FTPSTR = b'FTPSTR:\r:\n:\r\n:\r\x00:\x81:\x10\xce:ENDFTP'
+
+
+def download_kernels(kernels, *, directory=None, max_concurrent=4,
+                     timeout=60):
+    """
+    Download remote kernels concurrently.
+
+    This runs `adownload_kernels`. If it is called from a running event loop
+    (e.g. in a Jupyter notebook), the downloads run in a new thread, which
+    blocks the loop until they finish; use `adownload_kernels` directly to
+    avoid that.
+
+    Parameters
+    ----------
+    kernels : list[astrospice.net.RemoteKernel]
+        Kernels to download.
+    directory : str, pathlib.Path, optional
+        Directory to download to. Defaults to the astrospice cache directory.
+    max_concurrent : int, optional
+        Maximum number of simultaneous downloads.
+    timeout : float, optional
+        Timeout in seconds for connecting, and for each read.
+
+    Returns
+    -------
+    list[pathlib.Path]
+        Paths to the downloaded kernels, in the same order as ``kernels``.
+    """
+    return _run(adownload_kernels(
+        kernels, directory=directory, max_concurrent=max_concurrent,
+        timeout=timeout))
+
+
+def _run(coro):
+    """
+    Run a coroutine to completion and return its result.
+
+    `asyncio.run` can't be called from a running event loop, so in that case
+    the coroutine is run in a new event loop in another thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+async def adownload_kernels(kernels, *, directory=None, max_concurrent=4,
+                            timeout=60, session=None):
+    """
+    Download remote kernels concurrently.
+
+    Kernels that are already in ``directory`` are not downloaded again. Each
+    kernel is downloaded to a ``.part`` file, which is only renamed to the
+    kernel filename once it has been verified, so an interrupted download
+    never leaves an incomplete kernel behind. Interrupted downloads are
+    resumed from the end of the ``.part`` file where the server supports it.
+
+    Downloads are verified by checking their size against the size reported
+    by the server. Binary (DAF) kernels are also checked to be made of whole
+    records, to contain all of their segments, and to have not been
+    corrupted by a text mode transfer.
+
+    If ``directory`` is the directory of `astrospice.net.cache.kernel_cache`,
+    the downloaded kernels are added to its index, and the last access time
+    of kernels that were already downloaded is updated.
+
+    Parameters
+    ----------
+    kernels : list[astrospice.net.RemoteKernel]
+        Kernels to download.
+    directory : str, pathlib.Path, optional
+        Directory to download to. Defaults to the astrospice cache directory.
+    max_concurrent : int, optional
+        Maximum number of simultaneous downloads.
+    timeout : float, optional
+        Timeout in seconds for connecting, and for each read.
+    session : aiohttp.ClientSession, optional
+        Session used to make the requests. If not given a new session is
+        created.
+
+    Returns
+    -------
+    list[pathlib.Path]
+        Paths to the downloaded kernels, in the same order as ``kernels``.
+
+    Raises
+    ------
+    ValueError
+        If a downloaded kernel fails verification. This is raised once all
+        of the other downloads have finished.
+    """
+    if max_concurrent < 1:
+        raise ValueError('max_concurrent must be at least 1')
+    directory = Path(get_cache_dir() if directory is None else directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Only download each file once
+    unique = {}
+    for kernel in kernels:
+        unique.setdefault(kernel.fname, kernel)
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def download_all(session):
+        return await asyncio.gather(
+            *[_download(session, semaphore, kernel.url, directory / fname)
+              for fname, kernel in unique.items()],
+            return_exceptions=True)
+
+    if session is None:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=timeout,
+                sock_read=timeout)) as session:
+            results = await download_all(session)
+    else:
+        results = await download_all(session)
+
+    if directory == kernel_cache.directory:
+        _update_cache(unique.values(), results)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return [directory / kernel.fname for kernel in kernels]
+
+
+def _update_cache(kernels, results):
+    """
+    Record downloads in the kernel cache index.
+    """
+    names = set()
+    for kernel, downloaded in zip(kernels, results):
+        if isinstance(downloaded, BaseException):
+            continue
+        if downloaded:
+            names.add(kernel_cache._add(kernel.fname, url=kernel.url,
+                                        version=kernel.version))
+        else:
+            names.add(kernel_cache._touch(kernel.fname))
+    kernel_cache._evict(kernel_cache.max_bytes, kernel_cache.max_age,
+                        keep=names)
+    kernel_cache._save()
+
+
+async def _download(session, semaphore, url, path):
+    """
+    Download a single file, resuming from a partial download if one exists.
+
+    Returns
+    -------
+    bool
+        `False` if the file already existed, `True` otherwise.
+    """
+    if path.exists():
+        return False
+    part = path.with_name(path.name + '.part')
+    async with semaphore:
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        async with session.get(url, headers=headers) as response:
+            if response.status == 416:
+                # The partial download is already complete
+                size = _content_range_size(response.headers)
+            else:
+                response.raise_for_status()
+                if response.status == 206:
+                    size = _content_range_size(response.headers)
+                    mode = 'ab'
+                else:
+                    # The server ignored the range, so start again
+                    size = response.content_length
+                    mode = 'wb'
+                with open(part, mode) as f:
+                    async for chunk in response.content.iter_chunked(
+                            _CHUNK_SIZE):
+                        f.write(chunk)
+
+    _verify(part, url, size)
+    os.replace(part, path)
+    return True
+
+
+def _content_range_size(headers):
+    """
+    Get the total file size from a ``Content-Range`` header.
+    """
+    match = re.search(r'/(\d+)\s*$', headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+def _verify(part, url, size):
+    """
+    Check that a download is complete.
+
+    Incomplete downloads are kept so they can be resumed, but corrupt
+    downloads are deleted.
+    """
+    actual_size = part.stat().st_size
+    if size is not None and actual_size != size:
+        raise ValueError(f'Download of {url} is incomplete ({actual_size} '
+                         f'of {size} bytes)')
+
+    with open(part, 'rb') as f:
+        record = f.read(_DAF_RECORD_BYTES)
+    if not record.startswith((b'DAF/', b'NAIF/DAF')):
+        return
+    try:
+        _verify_daf(part, record, actual_size)
+    except ValueError as e:
+        part.unlink()
+        raise ValueError(f'Download of {url} is corrupt: {e}') from e
+
+
+def _verify_daf(fname, record, size):
+    if size % _DAF_RECORD_BYTES:
+        raise ValueError('file is not made of whole DAF records')
+    if _DAF_FTPSTR[:7] in record and _DAF_FTPSTR not in record:
+        raise ValueError('FTP validation string is corrupt')
+    try:
+        _, ints = DAFFile(fname).summaries
+    except (IndexError, ValueError) as e:
+        raise ValueError('summary records are truncated') from e
+    # The last integer component of each summary is its final address
+    if ints.size and ints[:, -1].max() * 8 > size:
+        raise ValueError('file is truncated')
@@ -1,14 +1,18 @@
 
-import spiceypy
 from astropy.coordinates.solar_system import solar_system_ephemeris
 from astropy.utils.data import download_file
 
+from astrospice.kernel import _furnish
+from astrospice.pool import kernel_pool
+
 __all__ = ['set_solar_system_ephem', 'get_solar_system_ephem']
 
 _known_jpl_ephem = ['de430', 'de432s', 'de440', 'de440s']
 _jpl_ephem = solar_system_ephemeris.get()
 if _jpl_ephem not in _known_jpl_ephem:
     _jpl_ephem = 'de440s'
+# Path to the furnished ephemeris file
+_jpl_ephem_fname = None
 
 _generic_files = [
     'https://naif.jpl.nasa.gov/pub/naif/generic_kernels/lsk',
@@ -29,10 +33,18 @@ def set_solar_system_ephem(name):
     url = ('https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/'
            f'planets/{name}.bsp')
     fname = download_file(url, cache=True)
-    spiceypy.furnsh(fname)
-
-    global _jpl_ephem
+    global _jpl_ephem, _jpl_ephem_fname
+    # Set this before furnishing, so if the generic kernels haven't been
+    # furnished yet this ephemeris is furnished instead of the default one
     _jpl_ephem = name
+    _furnish(fname, pinned=True)
+
+    # Unload the previous ephemeris, so it isn't used for bodies that are not
+    # in the new one
+    if (_jpl_ephem_fname is not None and _jpl_ephem_fname != fname and
+            _jpl_ephem_fname in kernel_pool):
+        kernel_pool.unload(_jpl_ephem_fname)
+    _jpl_ephem_fname = fname
 
 
 def get_solar_system_ephem():
@@ -50,7 +62,7 @@ def get_solar_system_ephem():
 
 def _setup_generic_files():
     for url in _generic_files:
-        spiceypy.furnsh(download_file(url, cache=True))
+        _furnish(download_file(url, cache=True), pinned=True)
 
     global _jpl_ephem
     set_solar_system_ephem(_jpl_ephem)
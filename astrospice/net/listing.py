@@ -0,0 +1,214 @@
+"""
+A persistent index of remote directory listings.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from astrospice.config import _atomic_write, _CacheDirectory
+
+__all__ = ['ListingIndex', 'listing_index']
+
+log = logging.getLogger(__name__)
+
+
+class ListingIndex(_CacheDirectory):
+    """
+    An index of the links in remote directory listings.
+
+    Each listing is saved in the cache directory along with the time it was
+    fetched. Listings younger than ``ttl`` are read straight from the index
+    without any network access. Older listings are refreshed with a
+    conditional request (using the ``ETag`` and ``Last-Modified`` headers
+    the server sent last time), so unchanged listings are not downloaded or
+    parsed again.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Time in seconds for which a listing is considered up to date.
+    directory : str, pathlib.Path, optional
+        Directory to save listings in. Defaults to a ``listings`` directory
+        within the astrospice cache directory.
+    """
+    _default_subdirectory = 'listings'
+
+    def __init__(self, *, ttl=24 * 3600, directory=None):
+        self.ttl = ttl
+        self._directory = directory
+        self._memory = {}
+
+    def __repr__(self):
+        return f"ListingIndex(ttl={self.ttl}, directory='{self.directory}')"
+
+    def _clear(self):
+        self._memory.clear()
+
+    def links(self, url, *, refresh=False):
+        """
+        Get the links in a remote directory listing.
+
+        Parameters
+        ----------
+        url : str
+            URL of the listing.
+        refresh : bool, optional
+            If `True`, check for an updated listing even if the indexed
+            listing is younger than ``ttl``.
+
+        Returns
+        -------
+        list[str]
+            The ``href`` of every link in the listing, in order.
+        """
+        entry = self._load(url)
+        if self._is_fresh(entry, refresh):
+            return entry['links']
+
+        try:
+            entry = self._fetch(url, entry)
+        except URLError as e:
+            return self._fallback(url, entry, e)
+        self._save(url, entry)
+        return entry['links']
+
+    async def alinks(self, url, session, *, refresh=False):
+        """
+        Get the links in a remote directory listing, asynchronously.
+
+        This is the asynchronous version of `links`.
+
+        Parameters
+        ----------
+        url : str
+            URL of the listing.
+        session : aiohttp.ClientSession
+            Session used to make the request.
+        refresh : bool, optional
+            If `True`, check for an updated listing even if the indexed
+            listing is younger than ``ttl``.
+
+        Returns
+        -------
+        list[str]
+            The ``href`` of every link in the listing, in order.
+        """
+        entry = self._load(url)
+        if self._is_fresh(entry, refresh):
+            return entry['links']
+
+        fetched = time.time()
+        try:
+            async with session.get(
+                    url, headers=_conditional_headers(entry)) as response:
+                if response.status == 304 and entry is not None:
+                    entry = dict(entry, fetched=fetched)
+                else:
+                    response.raise_for_status()
+                    entry = _parse_listing(
+                        url, await response.read(), fetched,
+                        response.headers.get('ETag'),
+                        response.headers.get('Last-Modified'))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return self._fallback(url, entry, e)
+        self._save(url, entry)
+        return entry['links']
+
+    def clear(self):
+        """
+        Remove all listings from the index.
+        """
+        self._memory.clear()
+        for path in self.directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+    def _path(self, url):
+        key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        return self.directory / f'{key}.json'
+
+    def _load(self, url):
+        if url in self._memory:
+            return self._memory[url]
+        try:
+            with open(self._path(url)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        self._memory[url] = entry
+        return entry
+
+    def _save(self, url, entry):
+        self._memory[url] = entry
+        with _atomic_write(self._path(url)) as f:
+            json.dump(entry, f)
+
+    def _is_fresh(self, entry, refresh):
+        return (entry is not None and not refresh and
+                time.time() - entry['fetched'] < self.ttl)
+
+    @staticmethod
+    def _fallback(url, entry, error):
+        """
+        Use the indexed listing if refreshing it failed.
+        """
+        if entry is None:
+            raise error
+        log.warning(f'Failed to refresh listing {url} ({error}), '
+                    'using the indexed listing')
+        return entry['links']
+
+    @staticmethod
+    def _fetch(url, entry):
+        """
+        Fetch a listing, re-using ``entry`` if the server says it is not
+        modified.
+        """
+        fetched = time.time()
+        request = Request(url, headers=_conditional_headers(entry))
+        try:
+            with urlopen(request) as response:
+                return _parse_listing(url, response.read(), fetched,
+                                      response.headers.get('ETag'),
+                                      response.headers.get('Last-Modified'))
+        except HTTPError as e:
+            if e.code == 304 and entry is not None:
+                return dict(entry, fetched=fetched)
+            raise
+
+
+def _conditional_headers(entry):
+    """
+    Headers for a request that only returns a listing if it has changed
+    since ``entry`` was fetched.
+    """
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def _parse_listing(url, page, fetched, etag, last_modified):
+    soup = BeautifulSoup(page, 'html.parser')
+    links = [link.get('href') for link in soup.find_all('a')
+             if link.get('href') is not None]
+    return {'url': url,
+            'fetched': fetched,
+            'etag': etag,
+            'last_modified': last_modified,
+            'links': links}
+
+
+#: The index used by the kernel registry.
+listing_index = ListingIndex()
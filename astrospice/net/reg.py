@@ -4,16 +4,20 @@
 A registry of SPICE kernels for various missions.
 """
 import abc
+import asyncio
 from collections import defaultdict
 from dataclasses import dataclass
+from urllib.parse import urljoin
 
+import aiohttp
 import astropy.time
-import parfive
+import numpy as np
 from astropy.table import Table, vstack
 from astropy.time import Time
 
-from astrospice.config import get_cache_dir
 from astrospice.kernel import Kernel
+from astrospice.net.download import _run, adownload_kernels, download_kernels
+from astrospice.net.listing import listing_index
 
 __all__ = ['KernelRegistry', 'RemoteKernel', 'RemoteKernelsBase', 'registry']
 
@@ -65,20 +69,76 @@ class KernelRegistry:
         tables = []
         for type in self._kernels[body]:
             kernels = self._kernels[body][type].get_remote_kernels()
-            urls = [k.url for k in kernels]
-            stimes = Time([k.start_time for k in kernels])
-            etimes = Time([k.end_time for k in kernels])
-            versions = [k.version for k in kernels]
-            tables.append(Table({'Mission': [body] * len(urls),
-                                 'Type': [type] * len(urls),
-                                 'Version': versions,
-                                 'Start time': stimes,
-                                 'End time': etimes}))
-
-        tables = vstack(tables)
-        tables['Start time'].format = 'iso'
-        tables['End time'].format = 'iso'
-        return tables
+            tables.append(_kernels_table(body, type, kernels))
+        return _stack_tables(tables)
+
+    async def aget_available_kernels(self, bodies=None, *, refresh=False,
+                                     limit_per_host=2, timeout=60):
+        """
+        Get a list of all the available kernels, asynchronously.
+
+        The listings of every source are fetched concurrently, so this takes
+        about as long as the slowest server.
+
+        Parameters
+        ----------
+        bodies : list[str], optional
+            Bodies to get kernels for. Defaults to all the bodies in the
+            registry.
+        refresh : bool, optional
+            If `True`, check for updated listings even if the indexed listings
+            are up to date (see `astrospice.net.listing.ListingIndex`).
+        limit_per_host : int, optional
+            Maximum number of simultaneous connections to each server.
+        timeout : float, optional
+            Timeout in seconds for each listing request.
+
+        Returns
+        -------
+        astropy.table.Table
+        """
+        if bodies is None:
+            bodies = self.bodies
+        for body in bodies:
+            self.check_body(body)
+        sources = [(body, type, self._kernels[body][type])
+                   for body in bodies for type in self._kernels[body]]
+
+        connector = aiohttp.TCPConnector(limit_per_host=limit_per_host)
+        async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            results = await asyncio.gather(
+                *[source.aget_remote_kernels(session, refresh=refresh)
+                  for _, _, source in sources])
+
+        return _stack_tables([_kernels_table(body, type, kernels)
+                              for (body, type, _), kernels
+                              in zip(sources, results)])
+
+    def refresh(self, bodies=None, **kwargs):
+        """
+        Refresh the indexed listings of all the sources concurrently.
+
+        This runs `aget_available_kernels` with ``refresh=True``. If it is
+        called from a running event loop (e.g. in a Jupyter notebook) it runs
+        in a new thread, which blocks the loop until it finishes; use
+        `aget_available_kernels` directly to avoid that.
+
+        Parameters
+        ----------
+        bodies : list[str], optional
+            Bodies to refresh. Defaults to all the bodies in the registry.
+        **kwargs
+            Passed to `aget_available_kernels`.
+
+        Returns
+        -------
+        astropy.table.Table
+            All the available kernels.
+        """
+        return _run(
+            self.aget_available_kernels(bodies, refresh=True, **kwargs))
 
     def get_latest_kernel(self, body, type):
         """
@@ -89,7 +149,7 @@ class KernelRegistry:
         self.check_body(body)
         return self._kernels[body][type].get_latest_kernel()
 
-    def get_kernels(self, body, type, *, version=None):
+    def get_kernels(self, body, type, *, version=None, trange=None):
         """
         Download a set of kernels. Any kernels not present locally will be
         downloaded.
@@ -103,6 +163,9 @@ class KernelRegistry:
             kernels respectively.
         version : int, optional
             If given, get only kernels with this version.
+        trange : tuple[astropy.time.Time], optional
+            If given, only get kernels that overlap the ``(start, end)`` time
+            range.
 
         Returns
         -------
@@ -114,12 +177,107 @@ class KernelRegistry:
         if type not in types:
             raise ValueError(f'{type} is not one of the known kernel types '
                              f'for {body}: {types}')
-        return self._kernels[body][type].get_kernels(version=version)
+        return self._kernels[body][type].get_kernels(version=version,
+                                                     trange=trange)
+
+    def prefetch(self, bodies=None, types=None, **kwargs):
+        """
+        Download kernels into the astrospice cache directory, without
+        furnishing them.
+
+        This runs `aprefetch`. If it is called from a running event loop
+        (e.g. in a Jupyter notebook) it runs in a new thread, which blocks the
+        loop until it finishes; use `aprefetch` directly to avoid that.
+
+        Parameters
+        ----------
+        bodies : list[str], optional
+            Bodies to download kernels for. Defaults to all the bodies in the
+            registry.
+        types : list[str], optional
+            Kernel types to download. Defaults to all types.
+        **kwargs
+            Passed to `aprefetch`.
+
+        Returns
+        -------
+        list[pathlib.Path]
+            Paths to the downloaded kernels.
+        """
+        return _run(self.aprefetch(bodies, types, **kwargs))
+
+    async def aprefetch(self, bodies=None, types=None, *, version=None,
+                        trange=None, max_concurrent=4, timeout=60):
+        """
+        Download kernels into the astrospice cache directory, without
+        furnishing them.
+
+        The listings of all the sources are fetched concurrently, and then
+        all of the kernels are downloaded concurrently (see
+        `astrospice.net.download.adownload_kernels`). As with `get_kernels`,
+        only the latest ``'predict'`` kernel is downloaded for each body.
+
+        Parameters
+        ----------
+        bodies : list[str], optional
+            Bodies to download kernels for. Defaults to all the bodies in the
+            registry.
+        types : list[str], optional
+            Kernel types to download. Defaults to all types.
+        version : int, optional
+            If given, only download kernels with this version.
+        trange : tuple[astropy.time.Time], optional
+            If given, only download kernels that overlap the ``(start, end)``
+            time range.
+        max_concurrent : int, optional
+            Maximum number of simultaneous downloads.
+        timeout : float, optional
+            Timeout in seconds for connecting, and for each read.
+
+        Returns
+        -------
+        list[pathlib.Path]
+            Paths to the downloaded kernels.
+        """
+        if bodies is None:
+            bodies = self.bodies
+        for body in bodies:
+            self.check_body(body)
+        sources = [self._kernels[body][type] for body in bodies
+                   for type in self._kernels[body]
+                   if types is None or type in types]
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=timeout,
+                sock_read=timeout)) as session:
+            remote = await asyncio.gather(
+                *[source.aget_remote_kernels(session) for source in sources])
+            kernels = []
+            for source, source_kernels in zip(sources, remote):
+                kernels += source._select_kernels(
+                    source_kernels, version=version, trange=trange)
+            return await adownload_kernels(
+                kernels, max_concurrent=max_concurrent, session=session)
 
 
 registry = KernelRegistry()
 
 
+def _kernels_table(body, type, kernels):
+    return Table({'Mission': [body] * len(kernels),
+                  'Type': [type] * len(kernels),
+                  'Version': [k.version for k in kernels],
+                  'Start time': Time([k.start_time for k in kernels]),
+                  'End time': Time([k.end_time for k in kernels])})
+
+
+def _stack_tables(tables):
+    tables = vstack(tables)
+    tables['Start time'].format = 'iso'
+    tables['End time'].format = 'iso'
+    return tables
+
+
 @dataclass
 class RemoteKernel:
     """
@@ -154,16 +312,63 @@ class RemoteKernel:
         -------
         astrospice.KernelBase
         """
-        local_path = get_cache_dir() / self.fname
-        if not local_path.exists():
-            dl = parfive.Downloader()
-            dl.enqueue_file(self.url, get_cache_dir(), self.fname)
-            dl.download()
+        return Kernel(download_kernels([self])[0])
+
+
+class _IntervalIndex:
+    """
+    An index of kernels by the time interval they cover.
+
+    Kernels with an unknown end time are assumed to cover all times after
+    their start time.
+
+    Parameters
+    ----------
+    kernels : list[RemoteKernel]
+    """
+    def __init__(self, kernels):
+        starts = np.array([_mjd(k.start_time, -np.inf) for k in kernels])
+        ends = np.array([_mjd(k.end_time, np.inf) for k in kernels])
+        order = np.argsort(starts, kind='stable')
+        self._kernels = [kernels[i] for i in order]
+        self._starts = starts[order]
+        self._ends = ends[order]
+
+    def overlapping(self, start, end):
+        """
+        Get the kernels that overlap a time range.
+
+        Parameters
+        ----------
+        start, end : astropy.time.Time
+
+        Returns
+        -------
+        list[RemoteKernel]
+            Overlapping kernels, in order of start time.
+        """
+        start, end = Time(start).mjd, Time(end).mjd
+        if end < start:
+            raise ValueError('trange start must be before trange end')
+        # Only kernels that start before the end of the range can overlap
+        n = np.searchsorted(self._starts, end, side='right')
+        keep = np.nonzero(self._ends[:n] >= start)[0]
+        return [self._kernels[i] for i in keep]
 
-        return Kernel(local_path)
+
+def _mjd(time, default):
+    if time is None:
+        return default
+    mjd = Time(time).mjd
+    return default if np.isnan(mjd) else mjd
 
 
 class RemoteKernelsBase(abc.ABC):
+    #: URL of the remote directory listing that contains the kernels. Sources
+    #: without a directory listing leave this as `None`, and override
+    #: `get_remote_kernels` instead.
+    listing_url = None
+
     def __init_subclass__(cls):
         registry._kernels[cls.body][cls.type] = cls()
         assert cls.type in ['predict', 'recon']
@@ -181,7 +386,7 @@ class RemoteKernelsBase(abc.ABC):
         k = sorted(kernels)[-1]
         return k.fetch()
 
-    def get_kernels(self, *, version=None):
+    def get_kernels(self, *, version=None, trange=None):
         """
         Get a set of kernels. Any kernels not present locally will be
         downloaded.
@@ -191,7 +396,8 @@ class RemoteKernelsBase(abc.ABC):
         version : int, optional
             If given, get only this version of the kernel.
         trange : tuple[astropy.time.Time], optional
-            If given, only get kernels to cover the given time range.
+            If given, only get kernels that overlap the ``(start, end)`` time
+            range.
 
         Returns
         -------
@@ -204,32 +410,110 @@ class RemoteKernelsBase(abc.ABC):
             If there are no kernels available for the given type, version, and
             timerange.
         """
-        kernels = self.get_remote_kernels()
-        if version is not None:
-            kernels = [k for k in kernels if k.version == version]
-
+        kernels = self._select_kernels(self.get_remote_kernels(),
+                                       version=version, trange=trange)
         if len(kernels) == 0:
             msg = f'No kernels available for {self.body}, type={self.type}'
             if version is not None:
                 msg += f', version={version}'
+            if trange is not None:
+                start, end = Time(trange[0]).iso, Time(trange[1]).iso
+                msg += f', trange=({start}, {end})'
             raise ValueError(msg)
+        return [Kernel(f) for f in download_kernels(kernels)]
 
-        if self.type == 'predict':
+    def _select_kernels(self, kernels, *, version=None, trange=None):
+        """
+        Select the kernels to get from a list of remote kernels.
+
+        Returns
+        -------
+        list[RemoteKernel]
+        """
+        if version is not None:
+            kernels = [k for k in kernels if k.version == version]
+        if trange is not None:
+            kernels = _IntervalIndex(kernels).overlapping(*trange)
+        if self.type == 'predict' and len(kernels):
             # Only get the most recent version
             kernels = [max(kernels)]
-        dl = parfive.Downloader()
-        for k in kernels:
-            dl.enqueue_file(k.url, get_cache_dir(), k.fname)
-
-        result = dl.download()
-        return [Kernel(f) for f in result.data]
+        return kernels
 
-    @abc.abstractmethod
     def get_remote_kernels(self):
         """
         Get a list of all available remote kernels.
 
+        The remote directory listing is read from
+        `astrospice.net.listing.listing_index`, so the network is only
+        accessed if the indexed listing is out of date.
+
         Returns
         -------
         list[RemoteKernel]
         """
+        if self.listing_url is None:
+            return []
+        return self.parse_links(listing_index.links(self.listing_url))
+
+    async def aget_remote_kernels(self, session, *, refresh=False):
+        """
+        Get a list of all available remote kernels, asynchronously.
+
+        Parameters
+        ----------
+        session : aiohttp.ClientSession
+            Session used to fetch the listing.
+        refresh : bool, optional
+            If `True`, check for an updated listing even if the indexed
+            listing is up to date.
+
+        Returns
+        -------
+        list[RemoteKernel]
+        """
+        if self.listing_url is None:
+            return self.get_remote_kernels()
+        links = await listing_index.alinks(self.listing_url, session,
+                                           refresh=refresh)
+        return self.parse_links(links)
+
+    def parse_links(self, links):
+        """
+        Get the kernels available from the links in a directory listing.
+
+        By default, every link to a file that `matches` accepts is a kernel.
+        Sources whose listings need more than this override this method.
+
+        Parameters
+        ----------
+        links : list[str]
+            Links in the directory listing at ``listing_url``.
+
+        Returns
+        -------
+        list[RemoteKernel]
+        """
+        base_url = self.listing_url.rstrip('/') + '/'
+        kernels = []
+        for href in links:
+            matches = self.matches(href.split('/')[-1])
+            if matches:
+                kernels.append(RemoteKernel(urljoin(base_url, href),
+                                            *matches[1:]))
+        return kernels
+
+    def matches(self, fname):
+        """
+        Check if the given filename matches the pattern of this kernel.
+
+        By default no filenames match, so sources that use the default
+        `parse_links` must override this.
+
+        Returns
+        -------
+        matches : bool
+        start_time : astropy.time.Time
+        end_time : astropy.time.Time
+        version : int
+        """
+        return False
@@ -1,7 +1,4 @@
-from urllib.request import urlopen
-
 from astropy.time import Time
-from bs4 import BeautifulSoup
 
 from astrospice.net.reg import RemoteKernel, RemoteKernelsBase
 
@@ -11,25 +8,21 @@ __all__ = ['CassiniRecon']
 class CassiniRecon(RemoteKernelsBase):
     body = 'cassini'
     type = 'recon'
+    listing_url = 'https://naif.jpl.nasa.gov/pub/naif/CASSINI/kernels/spk'
 
-    def get_remote_kernels(self):
+    def parse_links(self, links):
         """
         Returns
         -------
         list[RemoteKernel]
         """
-        base_url = 'https://naif.jpl.nasa.gov/pub/naif/CASSINI/kernels/spk'
-        page = urlopen(base_url)
-        soup = BeautifulSoup(page, 'html.parser')
-
         kernel_urls = []
-        for link in soup.find_all('a'):
-            fname = link.get('href')
-            if (fname is not None and fname.endswith('.bsp')):
+        for fname in links:
+            if fname.endswith('.bsp'):
                 matches = self.matches(fname)
                 if matches:
                     kernel_urls.append(RemoteKernel(
-                        f'{base_url}/{fname}', *matches[1:]))
+                        f'{self.listing_url}/{fname}', *matches[1:]))
 
         return kernel_urls
 
@@ -1,7 +1,4 @@
-from urllib.request import urlopen
-
 from astropy.time import Time
-from bs4 import BeautifulSoup
 
 from astrospice.net.reg import RemoteKernel, RemoteKernelsBase
 
@@ -11,25 +8,22 @@ __all__ = ['PSPPredict', 'PSPRecon']
 class PSPPredict(RemoteKernelsBase):
     body = 'psp'
     type = 'predict'
+    listing_url = 'https://spdf.gsfc.nasa.gov/pub/data/psp/ephemeris/spice/Long_Term_Predicted_Ephemeris/'
 
-    def get_remote_kernels(self):
+    def parse_links(self, links):
         """
         Returns
         -------
         list[RemoteKernel]
         """
-        page = urlopen('https://spdf.gsfc.nasa.gov/pub/data/psp/ephemeris/spice/Long_Term_Predicted_Ephemeris/')
-        soup = BeautifulSoup(page, 'html.parser')
-
         kernel_urls = []
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if href is not None and href.startswith('spp'):
+        for href in links:
+            if href.startswith('spp'):
                 fname = href.split('/')[-1]
                 matches = self.matches(fname)
                 if matches:
                     kernel_urls.append(
-                        RemoteKernel(f'https://spdf.gsfc.nasa.gov/pub/data/psp/ephemeris/spice/Long_Term_Predicted_Ephemeris/{href}', *matches[1:]))
+                        RemoteKernel(f'{self.listing_url}{href}', *matches[1:]))
 
         return kernel_urls
 
@@ -61,21 +55,17 @@ class PSPPredict(RemoteKernelsBase):
 class PSPRecon(RemoteKernelsBase):
     body = 'psp'
     type = 'recon'
+    listing_url = 'https://sppgway.jhuapl.edu/recon_ephem'
 
-    def get_remote_kernels(self):
+    def parse_links(self, links):
         """
         Returns
         -------
         list[RemoteKernel]
         """
-        page = urlopen('https://sppgway.jhuapl.edu/recon_ephem')
-        soup = BeautifulSoup(page, 'html.parser')
-
         kernel_urls = []
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if (href is not None and
-                    href.startswith('MOC/reconstructed_ephemeris') and
+        for href in links:
+            if (href.startswith('MOC/reconstructed_ephemeris') and
                     'archive' not in href):
                 fname = href.split('/')[-1]
                 matches = self.matches(fname)
@@ -1,7 +1,4 @@
-from urllib.request import urlopen
-
 from astropy.time import Time
-from bs4 import BeautifulSoup
 
 from astrospice.net.reg import RemoteKernel, RemoteKernelsBase
 
@@ -11,26 +8,22 @@ __all__ = ['SolarOrbiterPredict']
 class SolarOrbiterPredict(RemoteKernelsBase):
     body = 'solar orbiter'
     type = 'predict'
+    listing_url = 'http://spiftp.esac.esa.int/data/SPICE/SOLAR-ORBITER/kernels/spk'
 
-    def get_remote_kernels(self):
+    def parse_links(self, links):
         """
         Returns
         -------
         list[RemoteKernel]
         """
-        base_url = 'http://spiftp.esac.esa.int/data/SPICE/SOLAR-ORBITER/kernels/spk'
-        page = urlopen(base_url)
-        soup = BeautifulSoup(page, 'html.parser')
-
         kernel_urls = []
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if href is not None and href.endswith('.bsp'):
+        for href in links:
+            if href.endswith('.bsp'):
                 fname = href.split('/')[-1]
                 matches = self.matches(fname)
                 if matches:
                     kernel_urls.append(
-                        RemoteKernel(f'{base_url}/{fname}',
+                        RemoteKernel(f'{self.listing_url}/{fname}',
                                      *matches[1:]))
 
         return kernel_urls
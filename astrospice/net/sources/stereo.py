@@ -1,9 +1,6 @@
-from urllib.request import urlopen
-
 import astropy.units as u
 import numpy as np
 from astropy.time import Time
-from bs4 import BeautifulSoup
 
 from astrospice.net.reg import RemoteKernel, RemoteKernelsBase
 
@@ -16,25 +13,24 @@ stereo_url = 'https://sohowww.nascom.nasa.gov/solarsoft/stereo/gen/data/spice'
 class STEREORecon:
     type = 'recon'
 
-    def get_remote_kernels(self):
+    @property
+    def listing_url(self):
+        return f'{stereo_url}/depm/{self.spacecraft}/'
+
+    def parse_links(self, links):
         """
         Returns
         -------
         list[RemoteKernel]
         """
-        url = f'{stereo_url}/depm/{self.spacecraft}/'
-        page = urlopen(url)
-        soup = BeautifulSoup(page, 'html.parser')
-
         kernel_urls = []
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if href is not None and href.endswith('.bsp'):
+        for href in links:
+            if href.endswith('.bsp'):
                 fname = href
                 matches = self.matches(fname)
                 if matches:
                     kernel_urls.append(
-                        RemoteKernel(f'{url}{href}',
+                        RemoteKernel(f'{self.listing_url}{href}',
                                      *matches[1:]))
 
         for k1, k2 in zip(kernel_urls[:-1], kernel_urls[1:]):
@@ -0,0 +1,102 @@
+"""
+Parallel evaluation of ephemerides in a pool of worker processes.
+
+SPICE keeps its state in process-global memory and is not thread safe, so
+ephemerides are evaluated in parallel using separate processes. Each worker
+process is initialised once with the kernels furnished in the parent process
+(see `astrospice.furnished_kernels`).
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import spiceypy
+
+from astrospice import pool
+from astrospice.kernel import furnished_kernels
+
+__all__ = []
+
+# The current worker pool, and the (number of workers, kernels) it was
+# created with
+_EXECUTOR = None
+_EXECUTOR_KEY = None
+# Number of chunks to split the times into for each worker, to balance the
+# load if some workers are slower than others
+_CHUNKS_PER_WORKER = 4
+
+
+def _init_worker(kernels):
+    # The kernels include the generic kernels, so don't furnish them again
+    pool._GENERIC_FURNISHED = True
+    for kernel in kernels:
+        spiceypy.furnsh(kernel)
+
+
+def _worker_states(body_id, times_et, engine, observer_id):
+    from astrospice.body import Body
+    from astrospice.coords import _states
+    return _states(Body(body_id), times_et, engine, observer=observer_id)
+
+
+def _get_executor(workers):
+    """
+    Get a pool of ``workers`` processes, furnished with the current kernels.
+
+    The pool is re-used between calls, and re-created if the number of
+    workers or the set of furnished kernels changes.
+    """
+    global _EXECUTOR, _EXECUTOR_KEY
+    kernels = tuple(str(k) for k in furnished_kernels())
+    key = (workers, kernels)
+    if _EXECUTOR_KEY != key:
+        _shutdown_executor()
+        # Use 'spawn' so workers never share SPICE file handles with the
+        # parent process
+        _EXECUTOR = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(kernels,))
+        _EXECUTOR_KEY = key
+    return _EXECUTOR
+
+
+def _shutdown_executor():
+    global _EXECUTOR, _EXECUTOR_KEY
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown()
+    _EXECUTOR = None
+    _EXECUTOR_KEY = None
+
+
+def _parallel_states(body, times_et, engine, workers, observer=0):
+    """
+    Get the states of a body, evaluated in parallel.
+
+    Parameters
+    ----------
+    body : astrospice.Body
+    times_et : numpy.ndarray
+        Ephemeris times.
+    engine : str
+        Engine passed to `astrospice.generate_coords`.
+    workers : int
+        Number of worker processes.
+    observer : int, optional
+        Observing body ID. Defaults to the solar system barycentre.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(times_et), 6)`` array of positions (km) and velocities (km/s),
+        in the same order as ``times_et``.
+    """
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+    executor = _get_executor(workers)
+    n_chunks = max(min(workers * _CHUNKS_PER_WORKER, times_et.size), 1)
+    chunks = np.array_split(times_et, n_chunks)
+    results = executor.map(_worker_states, [body.id] * n_chunks, chunks,
+                           [engine] * n_chunks, [observer] * n_chunks)
+    return np.concatenate(list(results))
@@ -0,0 +1,270 @@
+"""
+Management of the kernels furnished with SPICE.
+"""
+import contextlib
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import spiceypy
+from spiceypy.utils.exceptions import NotFoundError
+
+from astrospice.body import _clear_body_cache
+from astrospice.daf import DAFFile
+
+__all__ = ['KernelPool', 'kernel_pool', 'spice_lock']
+
+# Whether the generic kernels have been furnished
+_GENERIC_FURNISHED = False
+#: Lock that is held whenever astrospice calls SPICE. SPICE keeps its state
+#: in process-global memory and is not thread safe, so code that calls
+#: ``spiceypy`` directly from several threads should also hold this lock.
+#: It is re-entrant, so can be held while calling astrospice functions.
+spice_lock = threading.RLock()
+
+
+def _locked(func):
+    """
+    Decorator that holds `spice_lock` while calling ``func``.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with spice_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@_locked
+def _furnish_generic_kernels():
+    """
+    Furnish the generic kernels (see `astrospice.set_solar_system_ephem`), if
+    they have not been furnished yet.
+
+    This is deferred until SPICE is first used, so importing astrospice does
+    not download or load any files.
+    """
+    global _GENERIC_FURNISHED
+    if _GENERIC_FURNISHED:
+        return
+    # Set this first, as furnishing the generic kernels calls this again
+    _GENERIC_FURNISHED = True
+    from astrospice.net.generic import _setup_generic_files
+    try:
+        _setup_generic_files()
+    except BaseException:
+        _GENERIC_FURNISHED = False
+        raise
+
+
+class KernelPool:
+    """
+    The pool of kernels furnished with SPICE by astrospice.
+
+    Furnishing a kernel that is already in the pool does not load it again.
+    Kernels can be unloaded explicitly with `unload`, or automatically at the
+    end of a `scope`.
+
+    SPICE searches through every loaded segment to find data, so it slows
+    down as more kernels are loaded. To bound this, the pool can be given a
+    maximum number of kernels and/or SPK segments. When a limit is exceeded
+    the least recently furnished kernels are unloaded, apart from pinned
+    kernels (e.g. the generic kernels). A meta-kernel is a single kernel in
+    the pool, which has the segments of all the kernels it lists, so they are
+    loaded and unloaded together.
+
+    Parameters
+    ----------
+    max_kernels : int, optional
+        Maximum number of kernels to keep loaded.
+    max_segments : int, optional
+        Maximum number of SPK (or other DAF) segments to keep loaded.
+    """
+    def __init__(self, *, max_kernels=None, max_segments=None):
+        self.max_kernels = max_kernels
+        self.max_segments = max_segments
+        # Mapping from path to (number of segments, pinned), in least to most
+        # recently furnished order
+        self._kernels = OrderedDict()
+        # Paths in the order they were loaded into SPICE
+        self._load_order = []
+
+    def __repr__(self):
+        return (f'KernelPool(max_kernels={self.max_kernels}, '
+                f'max_segments={self.max_segments})')
+
+    @_locked
+    def __contains__(self, fname):
+        fname = str(fname)
+        return fname in self._kernels and _is_loaded(fname)
+
+    def __len__(self):
+        return len(self.kernels)
+
+    @property
+    @_locked
+    def kernels(self):
+        """
+        Paths to the kernels in the pool, in the order they were loaded.
+
+        Kernels that have been unloaded from SPICE outside of astrospice are
+        not included.
+        """
+        return [Path(f) for f in self._load_order if _is_loaded(f)]
+
+    @property
+    def n_segments(self):
+        """Total number of segments in the kernels in the pool."""
+        return sum(n for n, _ in self._kernels.values())
+
+    @_locked
+    def furnish(self, fname, *, pinned=False):
+        """
+        Furnish SPICE with a kernel, unless it is already loaded.
+
+        Furnishing a kernel that is already loaded marks it as recently used,
+        but does not load it again. This means that, unlike calling
+        `spiceypy.furnsh` again, it does not give the kernel a higher priority
+        than kernels loaded after it. To do that, `unload` the kernel first.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+            Path to the kernel.
+        pinned : bool, optional
+            If `True`, never unload the kernel to keep within the limits of
+            the pool.
+        """
+        # Furnish the generic kernels first, so they have a lower priority
+        _furnish_generic_kernels()
+        fname = str(fname)
+        if fname in self:
+            pinned = pinned or self._kernels[fname][1]
+            self._kernels[fname] = (self._kernels[fname][0], pinned)
+            self._kernels.move_to_end(fname)
+            return
+
+        self._forget(fname)
+        spiceypy.furnsh(fname)
+        self._kernels[fname] = (_n_segments(fname), pinned)
+        self._load_order.append(fname)
+        # Text kernels can define new body names and IDs
+        _clear_body_cache()
+        self._enforce_limits(keep=fname)
+
+    @_locked
+    def unload(self, fname):
+        """
+        Unload a kernel from SPICE.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+            Path to the kernel.
+
+        Raises
+        ------
+        ValueError
+            If the kernel is not in the pool.
+        """
+        fname = str(fname)
+        if fname not in self:
+            self._forget(fname)
+            raise ValueError(f'{fname} is not furnished')
+        spiceypy.unload(fname)
+        self._forget(fname)
+        _clear_body_cache()
+
+    @_locked
+    def unload_all(self, *, pinned=False):
+        """
+        Unload all the kernels in the pool.
+
+        Parameters
+        ----------
+        pinned : bool, optional
+            If `True`, also unload pinned kernels.
+        """
+        for fname, (_, is_pinned) in list(self._kernels.items()):
+            if pinned or not is_pinned:
+                if fname in self:
+                    spiceypy.unload(fname)
+                self._forget(fname)
+        _clear_body_cache()
+
+    @contextlib.contextmanager
+    def scope(self):
+        """
+        A context manager that unloads any kernels furnished within it.
+
+        Kernels that were already in the pool when the context was entered
+        are left loaded.
+
+        Examples
+        --------
+        >>> with kernel_pool.scope():  # doctest: +SKIP
+        ...     Kernel('spacecraft.bsp')
+        ...     coords = generate_coords('spacecraft', times)
+        """
+        before = set(self._kernels)
+        try:
+            yield self
+        finally:
+            for fname in list(self._kernels):
+                if fname not in before and fname in self:
+                    self.unload(fname)
+
+    def _forget(self, fname):
+        self._kernels.pop(fname, None)
+        if fname in self._load_order:
+            self._load_order.remove(fname)
+
+    def _enforce_limits(self, keep):
+        """
+        Unload the least recently furnished unpinned kernels until the pool is
+        within its limits, never unloading ``keep``.
+        """
+        def over_limits():
+            return ((self.max_kernels is not None and
+                     len(self._kernels) > self.max_kernels) or
+                    (self.max_segments is not None and
+                     self.n_segments > self.max_segments))
+
+        for fname, (_, pinned) in list(self._kernels.items()):
+            if not over_limits():
+                break
+            if pinned or fname == keep:
+                continue
+            if fname in self:
+                spiceypy.unload(fname)
+            self._forget(fname)
+
+
+@_locked
+def _is_loaded(fname):
+    try:
+        spiceypy.kinfo(fname)
+    except NotFoundError:
+        return False
+    return True
+
+
+def _n_segments(fname):
+    """
+    Number of segments in a kernel, or 0 if it is not a binary DAF file.
+
+    For a meta-kernel, this is the total number of segments in the kernels it
+    lists.
+    """
+    try:
+        if Path(fname).suffix.lower() == '.tm':
+            from astrospice.kernel import MetaKernel
+            return sum(_n_segments(kernel) for kernel in
+                       MetaKernel(fname, furnish=False).kernels)
+        return len(DAFFile(fname).summaries[0])
+    except (OSError, ValueError):
+        return 0
+
+
+#: The kernel pool used by astrospice.
+kernel_pool = KernelPool()
@@ -0,0 +1,759 @@
+"""
+Pure NumPy evaluation of SPK ephemeris files.
+
+This module reads the segments of the SPK files that are currently furnished
+with SPICE directly, and evaluates them for whole arrays of epochs at once.
+It is used by `astrospice.generate_coords` when ``engine='numpy'``.
+
+References
+----------
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/spk.html
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/daf.html
+"""
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import spiceypy
+
+from astrospice.daf import DAFFile
+from astrospice.pool import _furnish_generic_kernels, _locked
+
+__all__ = ['CoverageIndex', 'SPKSegment', 'coverage_index', 'get_states',
+           'get_states_multi', 'read_summary', 'SUMMARY_DTYPE']
+
+# NAIF ID of the solar system barycentre
+_SSB = 0
+# NAIF ID of the J2000 frame
+_J2000 = 1
+# Number of epochs evaluated at once, to bound the size of temporary arrays
+_BLOCK_SIZE = 2**16
+# Mapping from file path to (modification time, list of segments)
+_FILE_CACHE = {}
+# Mapping from tuple of furnished SPK files to CoverageIndex
+_LOADED_CACHE = {}
+#: Data type of the segment summaries returned by `read_summary`
+SUMMARY_DTYPE = np.dtype([('start', float), ('stop', float),
+                          ('target', int), ('center', int),
+                          ('frame', int), ('type', int),
+                          ('start_address', int), ('end_address', int)])
+
+
+class SPKSegment:
+    """
+    A single segment of an SPK file.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        The double precision words of the whole DAF file.
+    summary : numpy.void
+        Row of the array returned by `read_summary` for this segment.
+    fname : str, optional
+        Path to the SPK file the segment is in.
+    """
+    def __init__(self, data, summary, fname=None):
+        self.fname = fname
+        self.start, self.stop = float(summary['start']), float(summary['stop'])
+        self.target = int(summary['target'])
+        self.center = int(summary['center'])
+        self.frame = int(summary['frame'])
+        self.type = int(summary['type'])
+        # DAF addresses are 1-indexed and inclusive
+        self._data = data[summary['start_address'] - 1:summary['end_address']]
+
+    def __repr__(self):
+        return (f'SPKSegment(target={self.target}, center={self.center}, '
+                f'frame={self.frame}, type={self.type})')
+
+    def states(self, et):
+        """
+        Evaluate the segment.
+
+        Parameters
+        ----------
+        et : numpy.ndarray
+            Ephemeris times.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(len(et), 6)`` array of positions (km) and velocities (km/s) of
+            the target relative to the center, in the segment frame.
+        """
+        if self.type not in _EVALUATORS:
+            raise NotImplementedError(
+                f'SPK segment type {self.type} is not supported')
+        return _EVALUATORS[self.type](self._data, et)
+
+
+def read_summary(fname):
+    """
+    Read the segment summaries of an SPK file.
+
+    The file does not need to be furnished with SPICE.
+
+    Parameters
+    ----------
+    fname : str, pathlib.Path
+        Path to the SPK file.
+
+    Returns
+    -------
+    numpy.ndarray
+        Structured array with one row for each segment, in the order they
+        appear in the file, with fields ``'start'``, ``'stop'`` (coverage
+        window in ephemeris time), ``'target'``, ``'center'``, ``'frame'``
+        (NAIF IDs), ``'type'`` (SPK segment type), and ``'start_address'``,
+        ``'end_address'`` (DAF addresses of the segment data).
+
+    Raises
+    ------
+    ValueError
+        If the file is not an SPK file.
+    """
+    daf = DAFFile(fname)
+    if (daf.nd, daf.ni) != (2, 6) or daf.type not in ('SPK', ''):
+        raise ValueError(f'{fname} is not an SPK file')
+
+    doubles, ints = daf.summaries
+    summary = np.empty(len(doubles), dtype=SUMMARY_DTYPE)
+    for i, name in enumerate(SUMMARY_DTYPE.names[:2]):
+        summary[name] = doubles[:, i]
+    for i, name in enumerate(SUMMARY_DTYPE.names[2:]):
+        summary[name] = ints[:, i]
+    return summary
+
+
+def _read_segments(fname):
+    """
+    Read all the segments from an SPK file.
+
+    Returns
+    -------
+    list[SPKSegment]
+        Segments, in the order they appear in the file.
+    """
+    data = DAFFile(fname).data
+    return [SPKSegment(data, row, fname) for row in read_summary(fname)]
+
+
+def _file_segments(fname):
+    """
+    Get the segments of an SPK file, caching them by modification time.
+    """
+    mtime = Path(fname).stat().st_mtime
+    if fname not in _FILE_CACHE or _FILE_CACHE[fname][0] != mtime:
+        _FILE_CACHE[fname] = (mtime, _read_segments(fname))
+    return _FILE_CACHE[fname][1]
+
+
+def _furnished_spk_files():
+    """
+    Get the SPK files furnished with SPICE, in the order they were loaded.
+    """
+    return tuple(spiceypy.kdata(i, 'SPK')[0]
+                 for i in range(spiceypy.ktotal('SPK')))
+
+
+class CoverageIndex:
+    """
+    An index of the time coverage of a set of SPK segments.
+
+    For each body the segment boundaries are split into elementary
+    intervals, each labelled with the highest priority segment that covers
+    it, so finding the segment that serves each of an array of epochs is a
+    single binary search. Like SPICE, segments later in the list take
+    priority, and segment coverage windows include their end points.
+
+    Usually created with `coverage_index`, which indexes all the furnished
+    SPK files.
+
+    Parameters
+    ----------
+    segments : list[SPKSegment]
+        Segments, in order of increasing priority.
+    """
+    def __init__(self, segments):
+        self.segments = list(segments)
+        self._centers = np.array([s.center for s in self.segments] + [_SSB])
+        self._fnames = np.array([str(s.fname or '') for s in self.segments] +
+                                [''])
+        by_target = defaultdict(list)
+        for i, segment in enumerate(self.segments):
+            by_target[segment.target].append(i)
+        self._index = {target: self._build(idx)
+                       for target, idx in by_target.items()}
+
+    def __repr__(self):
+        return (f'CoverageIndex(n_segments={len(self)}, '
+                f'n_bodies={len(self._index)})')
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _build(self, idx):
+        """
+        Build the elementary intervals for the segments ``idx`` of one body.
+
+        Returns the interval boundaries, the segment serving each boundary,
+        and the segment serving the open interval between each pair of
+        boundaries (-1 where there is none).
+        """
+        starts = np.array([self.segments[i].start for i in idx])
+        stops = np.array([self.segments[i].stop for i in idx])
+        bounds = np.unique(np.concatenate([starts, stops]))
+        points = np.full(bounds.size, -1)
+        intervals = np.full(bounds.size - 1, -1)
+        lower = np.searchsorted(bounds, starts)
+        upper = np.searchsorted(bounds, stops)
+        # Later segments take priority, so overwrite earlier ones
+        for i, a, b in zip(idx, lower, upper):
+            points[a:b + 1] = i
+            intervals[a:b] = i
+        return bounds, points, intervals
+
+    @property
+    def bodies(self):
+        """IDs of the bodies that have segments, in increasing order."""
+        return sorted(self._index)
+
+    def table(self):
+        """
+        Get a table of the indexed segments.
+
+        Returns
+        -------
+        astropy.table.Table
+            Table with one row for each segment, in order of increasing
+            priority, containing its file, target, center, frame and
+            segment type, and the start and stop of its coverage as
+            ephemeris times. Rows are numbered by `segment_index`.
+        """
+        from astropy.table import Table
+
+        return Table([self._fnames[:-1],
+                      [s.target for s in self.segments],
+                      [s.center for s in self.segments],
+                      [s.frame for s in self.segments],
+                      [s.type for s in self.segments],
+                      np.array([s.start for s in self.segments]),
+                      np.array([s.stop for s in self.segments])],
+                     names=['File', 'Target', 'Center', 'Frame', 'Type',
+                            'Start', 'Stop'],
+                     dtype=[str, int, int, int, int, float, float])
+
+    def intervals(self, body):
+        """
+        Get the time intervals covered by the segments for a body.
+
+        Parameters
+        ----------
+        body : int
+            Body ID.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(n, 2)`` array of the start and stop ephemeris times of each
+            disjoint covered interval, in increasing order.
+        """
+        if body not in self._index:
+            return np.empty((0, 2))
+        bounds, points, intervals = self._index[body]
+        # Merge consecutive boundaries that are joined by a covered interval
+        joined = np.concatenate([intervals >= 0, [False]])
+        covered = points >= 0
+        starts = covered & ~np.concatenate([[False], joined[:-1]])
+        stops = covered & ~joined
+        return np.stack([bounds[starts], bounds[stops]], axis=1)
+
+    def segment_index(self, body, et):
+        """
+        Find the segment that serves a body at each epoch.
+
+        Parameters
+        ----------
+        body : int
+            Body ID.
+        et : numpy.ndarray
+            Ephemeris times.
+
+        Returns
+        -------
+        numpy.ndarray
+            Index into `segments` of the highest priority segment for
+            ``body`` that covers each time, or -1 where there isn't one.
+        """
+        et = np.asarray(et, dtype=float)
+        if body not in self._index:
+            return np.full(et.shape, -1)
+        bounds, points, intervals = self._index[body]
+        j = np.searchsorted(bounds, et)
+        index = np.full(et.shape, -1)
+        # Times strictly between bounds[j - 1] and bounds[j]
+        inside = (j > 0) & (j < bounds.size)
+        index[inside] = intervals[j[inside] - 1]
+        # Times on a boundary
+        on_bound = j < bounds.size
+        on_bound[on_bound] = bounds[j[on_bound]] == et[on_bound]
+        index[on_bound] = points[j[on_bound]]
+        return index
+
+    def files(self, body, et):
+        """
+        Find the SPK file that serves a body at each epoch.
+
+        Parameters
+        ----------
+        body : int
+            Body ID.
+        et : numpy.ndarray
+            Ephemeris times.
+
+        Returns
+        -------
+        numpy.ndarray
+            Path of the file containing the segment for ``body`` that
+            covers each time, or an empty string where there isn't one.
+        """
+        return self._fnames[self.segment_index(body, et)]
+
+    def _runs(self, body):
+        """
+        Split the coverage of a body into runs of time served by a single
+        segment.
+
+        Returns
+        -------
+        list[tuple]
+            ``(segment index, start, stop)`` of each run, in time order.
+            Isolated points of coverage are not included.
+        """
+        bounds, _, intervals = self._index[body]
+        runs = []
+        for k, seg_id in enumerate(intervals):
+            if seg_id < 0:
+                continue
+            if runs and runs[-1][0] == seg_id and runs[-1][2] == bounds[k]:
+                runs[-1][2] = bounds[k + 1]
+            else:
+                runs.append([seg_id, bounds[k], bounds[k + 1]])
+        return [tuple(run) for run in runs]
+
+    def covered(self, body, et, observer=_SSB):
+        """
+        Check whether the state of a body can be computed at each epoch.
+
+        As well as the body itself, the chain of segment centres from the
+        body (and from ``observer``) back to the solar system barycentre
+        must be covered. This is what ``engine='numpy'`` requires; SPICE
+        itself can sometimes do with less if the body and observer chains
+        meet before the barycentre.
+
+        Parameters
+        ----------
+        body : int
+            Body ID.
+        et : numpy.ndarray
+            Ephemeris times.
+        observer : int, optional
+            Observing body ID. Defaults to the solar system barycentre.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array, `True` where the state can be computed.
+        """
+        return self._missing(body, et, observer) == _SSB
+
+    def _missing(self, body, et, observer=_SSB):
+        """
+        Get the ID of the first body without coverage in the chains from
+        ``body`` and ``observer`` to the solar system barycentre at each
+        epoch, or the barycentre ID (0) where everything is covered.
+        """
+        et = np.asarray(et, dtype=float)
+        missing = self._chain_missing(body, et.ravel())
+        if observer != _SSB:
+            ok = missing == _SSB
+            missing[ok] = self._chain_missing(observer, et.ravel()[ok])
+        return missing.reshape(et.shape)
+
+    def _chain_missing(self, body, et):
+        missing = np.full(et.shape, _SSB)
+        if body == _SSB:
+            return missing
+        index = self.segment_index(body, et)
+        centers = self._centers[index]
+        missing[index < 0] = body
+        centers[index < 0] = _SSB
+        for center in np.unique(centers):
+            if center != _SSB:
+                mask = centers == center
+                missing[mask] = self._chain_missing(center, et[mask])
+        return missing
+
+
+@_locked
+def coverage_index():
+    """
+    Get the coverage index of the SPK files furnished with SPICE.
+
+    The index is cached, and only rebuilt when the set of furnished SPK
+    files changes.
+
+    Returns
+    -------
+    CoverageIndex
+    """
+    _furnish_generic_kernels()
+    return _loaded_index()
+
+
+def _loaded_index():
+    """
+    Get a `CoverageIndex` of all of the furnished segments.
+    """
+    files = _furnished_spk_files()
+    if files not in _LOADED_CACHE:
+        # Files loaded later, and segments later in a file, take priority
+        segments = [segment for fname in files
+                    for segment in _file_segments(fname)]
+        _LOADED_CACHE.clear()
+        _LOADED_CACHE[files] = CoverageIndex(segments)
+    return _LOADED_CACHE[files]
+
+
+@_locked
+def _write_spk(fname, pieces):
+    """
+    Write an SPK file made of parts of existing segments.
+
+    The data is copied with the SPICE ``spksub`` routine, so the segments
+    keep their type, frame and center.
+
+    Parameters
+    ----------
+    fname : str, pathlib.Path
+        Path to write the file to. Any existing file is replaced.
+    pieces : list[tuple]
+        ``(segment, start, stop)`` for each new segment, where ``segment``
+        is an `SPKSegment` (which must have its ``fname`` set) and
+        ``start``, ``stop`` are ephemeris times within its coverage. Pieces
+        later in the list take priority.
+    """
+    fname = Path(fname)
+    tmp = fname.with_name(fname.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    handles = {}
+    descriptors = {}
+    new_handle = spiceypy.spkopn(str(tmp), 'astrospice', 0)
+    try:
+        for segment, start, stop in pieces:
+            if segment.fname not in handles:
+                handles[segment.fname] = spiceypy.dafopr(str(segment.fname))
+                descriptors[segment.fname] = _descriptors(
+                    segment.fname, handles[segment.fname])
+            descr, ident = descriptors[segment.fname][segment]
+            spiceypy.spksub(handles[segment.fname], descr, ident,
+                            float(start), float(stop), new_handle)
+    finally:
+        spiceypy.spkcls(new_handle)
+        for handle in handles.values():
+            spiceypy.dafcls(handle)
+    tmp.replace(fname)
+
+
+def _descriptors(fname, handle):
+    """
+    Get a mapping from each segment of an open SPK file to its DAF
+    descriptor and name.
+    """
+    descriptors = []
+    spiceypy.dafbfs(handle)
+    while spiceypy.daffna():
+        descriptors.append((spiceypy.dafgs(n=5), spiceypy.dafgn()))
+    return dict(zip(_file_segments(fname), descriptors))
+
+
+@_locked
+def get_states(target, et, observer=_SSB, *, out=None):
+    """
+    Get the geometric states of a body in the J2000 frame.
+
+    This evaluates the SPK files furnished with SPICE without calling SPICE,
+    following the chain of segment centers back to the solar system
+    barycentre.
+
+    Parameters
+    ----------
+    target : int
+        Target body ID.
+    et : numpy.ndarray
+        Ephemeris times.
+    observer : int, optional
+        Observing body ID. Defaults to the solar system barycentre.
+    out : numpy.ndarray, optional
+        ``(len(et), 6)`` array to write the states into.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(et), 6)`` array of positions (km) and velocities (km/s). This
+        is ``out`` if it is given.
+
+    Raises
+    ------
+    ValueError
+        If there is not enough data loaded to compute the state at all of the
+        given times.
+    """
+    _furnish_generic_kernels()
+    et = np.atleast_1d(np.asarray(et, dtype=float))
+    index = _loaded_index()
+    states = np.empty((et.size, 6)) if out is None else out
+    for i in range(0, et.size, _BLOCK_SIZE):
+        block = et[i:i + _BLOCK_SIZE]
+        states[i:i + _BLOCK_SIZE] = _ssb_states(target, block, index)
+        if observer != _SSB:
+            states[i:i + _BLOCK_SIZE] -= _ssb_states(observer, block, index)
+    return states
+
+
+@_locked
+def get_states_multi(targets, et, observer=_SSB, *, out=None):
+    """
+    Get the geometric states of several bodies in the J2000 frame.
+
+    This is faster than calling `get_states` for each body, as the states of
+    the centres shared by the bodies' segments (e.g. the Sun or the solar
+    system barycentre) and of the observer are only evaluated once.
+
+    Parameters
+    ----------
+    targets : list[int]
+        Target body IDs.
+    et : numpy.ndarray
+        Ephemeris times.
+    observer : int, optional
+        Observing body ID. Defaults to the solar system barycentre.
+    out : numpy.ndarray, optional
+        ``(len(targets), len(et), 6)`` array to write the states into.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(len(targets), len(et), 6)`` array of positions (km) and velocities
+        (km/s). This is ``out`` if it is given.
+
+    Raises
+    ------
+    ValueError
+        If there is not enough data loaded to compute the state of any of the
+        bodies at all of the given times.
+    """
+    _furnish_generic_kernels()
+    et = np.atleast_1d(np.asarray(et, dtype=float))
+    index = _loaded_index()
+    if out is None:
+        out = np.empty((len(targets), et.size, 6))
+    for i in range(0, et.size, _BLOCK_SIZE):
+        block = et[i:i + _BLOCK_SIZE]
+        # States relative to the solar system barycentre over the whole
+        # block, shared between targets
+        memo = {}
+        if observer != _SSB:
+            observer_states = _ssb_states(observer, block, index, memo)
+        for j, target in enumerate(targets):
+            out[j, i:i + _BLOCK_SIZE] = _ssb_states(target, block, index,
+                                                    memo)
+            if observer != _SSB:
+                out[j, i:i + _BLOCK_SIZE] -= observer_states
+    return out
+
+
+def _ssb_states(target, et, index, memo=None):
+    """
+    Get the state of ``target`` relative to the solar system barycentre.
+
+    If ``memo`` is given, it is used to store and look up the states of
+    bodies at all of the times in ``et``.
+    """
+    if memo is not None and target in memo:
+        return memo[target]
+    states = np.zeros((et.size, 6))
+    if target == _SSB:
+        return states
+
+    seg_index = index.segment_index(target, et)
+    if np.any(seg_index < 0):
+        missing = et[seg_index < 0][0]
+        raise ValueError(f'Insufficient ephemeris data loaded to compute the '
+                         f'state of body {target} at ET {missing}')
+
+    # Group the times by segment
+    order = np.argsort(seg_index, kind='stable')
+    seg_ids, starts = np.unique(seg_index[order], return_index=True)
+    for seg_id, sel in zip(seg_ids, np.split(order, starts[1:])):
+        segment = index.segments[seg_id]
+        seg_states = segment.states(et[sel])
+        if segment.frame != _J2000:
+            rot = _rotation_to_j2000(segment.frame)
+            seg_states[:, :3] = seg_states[:, :3] @ rot.T
+            seg_states[:, 3:] = seg_states[:, 3:] @ rot.T
+        states[sel] = seg_states
+
+    centers = index._centers[seg_index]
+    for center in np.unique(centers):
+        if center != _SSB:
+            mask = centers == center
+            states[mask] += _center_states(center, et, mask, index, memo)
+    if memo is not None:
+        memo[target] = states
+    return states
+
+
+def _center_states(center, et, mask, index, memo):
+    """
+    Get the state of a segment centre relative to the solar system
+    barycentre at the times ``et[mask]``.
+    """
+    if memo is not None:
+        try:
+            return _ssb_states(center, et, index, memo)[mask]
+        except ValueError:
+            # The centre is not covered at all of the times, so only use it
+            # where it is needed
+            pass
+    return _ssb_states(center, et[mask], index)
+
+
+def _rotation_to_j2000(frame):
+    """
+    Get the rotation matrix from an inertial frame to J2000.
+    """
+    _, frame_class, _ = spiceypy.frinfo(int(frame))
+    # Class 1 frames are inertial, so the rotation is constant in time
+    if frame_class != 1:
+        raise NotImplementedError(
+            f'SPK segments in non-inertial frame {frame} are not supported')
+    return spiceypy.pxform(spiceypy.frmnam(int(frame)), 'J2000', 0.0)
+
+
+def _chebyshev_states(data, et, velocity_coeffs):
+    """
+    Evaluate Chebyshev polynomial segments (types 2 and 3).
+    """
+    init, intlen, rsize, n = data[-4:]
+    rsize, n = int(rsize), int(n)
+    records = data[:rsize * n].reshape(n, rsize)
+    ncomp = 6 if velocity_coeffs else 3
+    ncoeff = (rsize - 2) // ncomp
+
+    idx = np.clip(((et - init) // intlen).astype(int), 0, n - 1)
+    rows = records[idx]
+    mid, radius = rows[:, 0], rows[:, 1]
+    coeffs = rows[:, 2:].reshape(et.size, ncomp, ncoeff)
+    x = (et - mid) / radius
+
+    # Chebyshev polynomials T_k(x) and their derivatives
+    t = np.empty((ncoeff, et.size))
+    dt = np.empty((ncoeff, et.size))
+    t[0], dt[0] = 1, 0
+    if ncoeff > 1:
+        t[1], dt[1] = x, 1
+    for k in range(2, ncoeff):
+        t[k] = 2 * x * t[k - 1] - t[k - 2]
+        dt[k] = 2 * t[k - 1] + 2 * x * dt[k - 1] - dt[k - 2]
+
+    values = np.einsum('ijk,ki->ij', coeffs, t)
+    if velocity_coeffs:
+        return values
+    derivs = np.einsum('ijk,ki->ij', coeffs, dt) / radius[:, None]
+    return np.concatenate([values, derivs], axis=1)
+
+
+def _window_start(epochs, et, window):
+    """
+    Get the index of the first epoch in the interpolation window for
+    each time, for segments of unequally spaced states (types 9 and 13).
+    """
+    n = epochs.size
+    # Index of the last epoch strictly less than each time
+    low = np.searchsorted(epochs, et, side='left') - 1
+    if window % 2:
+        # Centre the window on the nearest epoch
+        low = np.clip(low, 0, n - 2)
+        near = np.where(et - epochs[low] <= epochs[low + 1] - et, low, low + 1)
+        first = near - (window - 1) // 2
+    else:
+        first = low - window // 2 + 1
+    return np.clip(first, 0, n - window)
+
+
+def _unequal_step_data(data):
+    n = int(data[-1])
+    states = data[:6 * n].reshape(n, 6)
+    epochs = data[6 * n:7 * n]
+    return states, epochs
+
+
+def _lagrange_states(data, et):
+    """
+    Evaluate Lagrange interpolation segments (type 9).
+    """
+    states, epochs = _unequal_step_data(data)
+    window = int(data[-2]) + 1
+    # Indices have shape (window, len(et))
+    idx = _window_start(epochs, et, window) + np.arange(window)[:, None]
+    x = epochs[idx]
+    diffs = et - x
+
+    weights = np.ones(idx.shape)
+    for j in range(window):
+        for m in range(window):
+            if m != j:
+                weights[j] *= diffs[m] / (x[j] - x[m])
+    return np.einsum('ji,jik->ik', weights, states[idx])
+
+
+def _hermite_states(data, et):
+    """
+    Evaluate Hermite interpolation segments (type 13).
+
+    Positions are interpolated using the positions and velocities, and
+    velocities are the derivative of the interpolating polynomial.
+    """
+    states, epochs = _unequal_step_data(data)
+    window = int(data[-2]) + 1
+    # Indices have shape (window, len(et))
+    idx = _window_start(epochs, et, window) + np.arange(window)[:, None]
+    npoints = 2 * window
+
+    # Newton divided differences, with each epoch repeated twice
+    z = np.repeat(epochs[idx], 2, axis=0)[..., None]
+    window_states = states[idx]
+    c = np.repeat(window_states[..., :3], 2, axis=0)
+    c[2::2] = (c[2::2] - c[1:-1:2]) / (z[2::2] - z[1:-1:2])
+    c[1::2] = window_states[..., 3:]
+    for level in range(2, npoints):
+        c[level:] = ((c[level:] - c[level - 1:-1]) /
+                     (z[level:] - z[:npoints - level]))
+
+    # Evaluate the Newton polynomial and its derivative
+    dt = et[:, None] - z
+    pos = c[-1]
+    vel = np.zeros_like(pos)
+    for i in range(npoints - 2, -1, -1):
+        vel = vel * dt[i] + pos
+        pos = pos * dt[i] + c[i]
+    return np.concatenate([pos, vel], axis=1)
+
+
+_EVALUATORS = {
+    2: lambda data, et: _chebyshev_states(data, et, False),
+    3: lambda data, et: _chebyshev_states(data, et, True),
+    9: _lagrange_states,
+    13: _hermite_states,
+}
@@ -0,0 +1,304 @@
+"""
+Fitted Chebyshev polynomial approximations of ephemerides.
+
+A `ChebyshevEphemeris` is fitted once from the furnished kernels, and can
+then be saved, loaded and evaluated with NumPy alone, without furnishing any
+kernels with SPICE.
+"""
+from pathlib import Path
+
+import astropy.units as u
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from astrospice.config import _atomic_write, get_cache_dir
+from astrospice.time import to_et
+
+__all__ = ['ChebyshevEphemeris']
+
+# Number of points in each segment, spread evenly across it, at which the
+# fit is checked against the ephemeris
+_N_CHECK = 64
+
+
+class ChebyshevEphemeris:
+    """
+    A piecewise Chebyshev polynomial approximation of the ephemeris of a body.
+
+    Instances are usually created with `fit` or `load`. The positions are
+    fitted, and velocities are the derivative of the fitted positions.
+
+    Parameters
+    ----------
+    breakpoints : numpy.ndarray
+        ``(n + 1,)`` ephemeris times of the segment boundaries, in
+        increasing order.
+    coeffs : numpy.ndarray
+        ``(n, 3, degree + 1)`` Chebyshev coefficients of the x, y and z
+        positions (km) in each segment.
+    body : int
+        Body ID.
+    observer : int
+        Observer ID.
+    frame : str
+        Coordinate frame (see `astrospice.generate_coords`).
+    tolerance : float
+        Maximum position error of the fit (km), at the points it was checked
+        at.
+    """
+    def __init__(self, breakpoints, coeffs, *, body, observer, frame,
+                 tolerance):
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.coeffs = np.asarray(coeffs, dtype=float)
+        if self.coeffs.shape[:2] != (self.breakpoints.size - 1, 3):
+            raise ValueError('coeffs must have shape (n, 3, degree + 1) for '
+                             'n + 1 breakpoints')
+        self.body = int(body)
+        self.observer = int(observer)
+        self.frame = frame
+        self.tolerance = float(tolerance)
+
+    def __repr__(self):
+        return (f'ChebyshevEphemeris(body={self.body}, '
+                f'observer={self.observer}, frame={self.frame}, '
+                f'n_segments={self.n_segments}, degree={self.degree})')
+
+    @property
+    def start(self):
+        """First ephemeris time covered."""
+        return self.breakpoints[0]
+
+    @property
+    def stop(self):
+        """Last ephemeris time covered."""
+        return self.breakpoints[-1]
+
+    @property
+    def n_segments(self):
+        """Number of polynomial segments."""
+        return self.coeffs.shape[0]
+
+    @property
+    def degree(self):
+        """Degree of the polynomials."""
+        return self.coeffs.shape[2] - 1
+
+    @classmethod
+    def fit(cls, body, start, stop, *, tolerance=1 * u.km, degree=12,
+            frame=None, observer=None, max_segment=32 * u.day,
+            min_segment=1 * u.min, engine='spice'):
+        """
+        Fit the ephemeris of a body.
+
+        The time range is split into segments of at most ``max_segment``,
+        and each segment is fitted by interpolating the ephemeris at
+        Chebyshev nodes. The fit is checked against the ephemeris at 64
+        points spread evenly across each segment, and segments where the
+        fitted position differs by more than ``tolerance`` at any of these
+        points are split in half and fitted again. The error between the
+        check points is not checked, so is not guaranteed to be within
+        ``tolerance``, although for smooth trajectories it is very close to
+        the error at the check points.
+
+        Parameters
+        ----------
+        body : `int`, `str`
+            Body ID code or name.
+        start, stop : `~astropy.time.Time`, float
+            Time range to fit, as `~astropy.time.Time` or ephemeris times.
+        tolerance : `~astropy.units.Quantity`, optional
+            Maximum position error of the fit at the check points.
+        degree : int, optional
+            Degree of the Chebyshev polynomials.
+        frame : str, optional
+            Coordinate frame. See `astrospice.generate_coords`.
+        observer : `int`, `str`, optional
+            Body that coordinates are relative to. See
+            `astrospice.generate_coords`.
+        max_segment : `~astropy.units.Quantity`, optional
+            Maximum length of each segment.
+        min_segment : `~astropy.units.Quantity`, optional
+            Minimum length of each segment.
+        engine : {'spice', 'numpy'}, optional
+            How to evaluate the ephemeris. See `astrospice.generate_coords`.
+
+        Returns
+        -------
+        ChebyshevEphemeris
+
+        Raises
+        ------
+        ValueError
+            If the ephemeris can't be fitted to within ``tolerance`` using
+            segments longer than ``min_segment``.
+        """
+        from astrospice.body import Body
+        from astrospice.coords import _frame_observer, generate_coords
+
+        body = Body(body)
+        frame, observer = _frame_observer(frame, observer)
+        start, stop = float(to_et(start)), float(to_et(stop))
+        if stop <= start:
+            raise ValueError('start must be before stop')
+        if degree < 1:
+            raise ValueError('degree must be at least 1')
+        tolerance = u.Quantity(tolerance, u.km).value
+        max_segment = u.Quantity(max_segment, u.s).value
+        min_segment = u.Quantity(min_segment, u.s).value
+
+        def positions(times_et):
+            return generate_coords(body, times_et.ravel(), frame=frame,
+                                   observer=observer, output='array',
+                                   engine=engine)[:, :3].reshape(
+                times_et.shape + (3,))
+
+        nodes = np.cos(np.pi * (np.arange(degree + 1) + 0.5) / (degree + 1))
+        inverse = np.linalg.inv(chebyshev.chebvander(nodes, degree))
+        check = np.linspace(-1, 1, _N_CHECK)
+
+        n = int(np.ceil((stop - start) / max_segment))
+        edges = np.linspace(start, stop, n + 1)
+        lower, upper = edges[:-1], edges[1:]
+        fitted = []
+        while lower.size:
+            mid, radius = (upper + lower) / 2, (upper - lower) / 2
+            # (segment, node, xyz) -> (segment, xyz, coefficient)
+            values = positions(mid[:, None] + radius[:, None] * nodes)
+            coeffs = np.einsum('ij,sjk->ski', inverse, values)
+
+            expected = positions(mid[:, None] + radius[:, None] * check)
+            actual = chebyshev.chebval(
+                check, coeffs.transpose(2, 0, 1)).transpose(0, 2, 1)
+            error = np.linalg.norm(actual - expected, axis=-1).max(axis=1)
+
+            good = error <= tolerance
+            fitted.append((lower[good], coeffs[good]))
+            if np.any(radius[~good] < min_segment):
+                raise ValueError(
+                    f'Could not fit {body} to within {tolerance} km with '
+                    f'segments longer than {min_segment} s')
+            lower = np.concatenate([lower[~good], mid[~good]])
+            upper = np.concatenate([mid[~good], upper[~good]])
+
+        lower = np.concatenate([f[0] for f in fitted])
+        coeffs = np.concatenate([f[1] for f in fitted])
+        order = np.argsort(lower)
+        return cls(np.append(lower[order], stop), coeffs[order],
+                   body=body.id, observer=observer.id, frame=frame,
+                   tolerance=tolerance)
+
+    def states(self, times):
+        """
+        Evaluate the fitted ephemeris.
+
+        Parameters
+        ----------
+        times : `~astropy.time.Time`, numpy.ndarray
+            Times, as `~astropy.time.Time` or ephemeris times (see
+            `astrospice.time.to_et`).
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(len(times), 6)`` array of positions (km) and velocities
+            (km/s).
+
+        Raises
+        ------
+        ValueError
+            If any of the times are outside the fitted time range.
+        """
+        times_et = np.atleast_1d(to_et(times)).reshape(-1)
+        if np.any((times_et < self.start) | (times_et > self.stop)):
+            raise ValueError('times must be within the fitted time range '
+                             f'(ET {self.start} to {self.stop})')
+        idx = np.searchsorted(self.breakpoints, times_et, side='right') - 1
+        idx = np.clip(idx, 0, self.n_segments - 1)
+
+        # Evaluate one segment at a time, to avoid gathering the
+        # coefficients for every time
+        states = np.empty((times_et.size, 6))
+        is_sorted = np.all(idx[1:] >= idx[:-1])
+        order = None if is_sorted else np.argsort(idx, kind='stable')
+        bounds = np.searchsorted(idx if is_sorted else idx[order],
+                                 np.arange(self.n_segments + 1))
+        for i in np.nonzero(np.diff(bounds))[0]:
+            sel = slice(bounds[i], bounds[i + 1])
+            if not is_sorted:
+                sel = order[sel]
+            lower, upper = self.breakpoints[i], self.breakpoints[i + 1]
+            radius = (upper - lower) / 2
+            x = (times_et[sel] - lower) / radius - 1
+            coeffs = self.coeffs[i].T
+            derivs = chebyshev.chebder(coeffs)
+            states[sel, :3] = chebyshev.chebval(x, coeffs).T
+            states[sel, 3:] = chebyshev.chebval(x, derivs).T / radius
+        return states
+
+    def coords(self, times):
+        """
+        Evaluate the fitted ephemeris as coordinates.
+
+        Parameters
+        ----------
+        times : `~astropy.time.Time`, numpy.ndarray
+            Times, as `~astropy.time.Time` or ephemeris times.
+
+        Returns
+        -------
+        `~astropy.coordinates.SkyCoord`
+        """
+        from astrospice.coords import _obstime, _to_skycoord
+
+        times_et = np.atleast_1d(to_et(times)).reshape(-1)
+        return _to_skycoord(self.states(times_et),
+                            _obstime(times, times_et), self.frame)
+
+    def save(self, fname=None):
+        """
+        Save to a file.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path, optional
+            File to save to. Defaults to a file in the ``surrogates``
+            directory within the astrospice cache directory.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the saved file.
+        """
+        if fname is None:
+            fname = (get_cache_dir() / 'surrogates' /
+                     f'{self.body}_{self.observer}_{self.frame}_'
+                     f'{self.start:.0f}_{self.stop:.0f}.npz')
+        fname = Path(fname)
+        with _atomic_write(fname, 'wb') as f:
+            np.savez_compressed(f, breakpoints=self.breakpoints,
+                                coeffs=self.coeffs,
+                                body=self.body,
+                                observer=self.observer,
+                                frame=self.frame,
+                                tolerance=self.tolerance)
+        return fname
+
+    @classmethod
+    def load(cls, fname):
+        """
+        Load from a file saved with `save`.
+
+        Parameters
+        ----------
+        fname : str, pathlib.Path
+
+        Returns
+        -------
+        ChebyshevEphemeris
+        """
+        with np.load(fname) as f:
+            return cls(f['breakpoints'], f['coeffs'],
+                       body=int(f['body']),
+                       observer=int(f['observer']),
+                       frame=str(f['frame']),
+                       tolerance=float(f['tolerance']))
@@ -0,0 +1,26 @@
+import pytest
+import spiceypy
+
+from astrospice import Kernel
+from astrospice.tests.helpers import write_synthetic_spk
+
+
+@pytest.fixture(scope='session')
+def synthetic_spk(tmp_path_factory):
+    """
+    Path to a synthetic SPK file. The file is not furnished.
+    """
+    fname = tmp_path_factory.mktemp('spk') / 'synthetic.bsp'
+    write_synthetic_spk(fname)
+    return fname
+
+
+@pytest.fixture()
+def furnished_spk(synthetic_spk):
+    """
+    Path to a synthetic SPK file, which is furnished for the duration of
+    the test.
+    """
+    Kernel(synthetic_spk)
+    yield synthetic_spk
+    spiceypy.unload(str(synthetic_spk))
@@ -0,0 +1,87 @@
+"""
+Constants and functions shared by the tests.
+"""
+import numpy as np
+import spiceypy
+
+# Start and end ephemeris times of the synthetic kernel (2019-01-05 to
+# 2020-08-07)
+T0 = 6.0e8
+T1 = 6.5e8
+# Time at which the type 3 and type 13 PSP segments meet
+T_SPLIT = T0 + 289 * 86400
+
+
+def circular_orbit(et, radius, period, phase=0, inclination=0.3):
+    """
+    States for an inclined circular orbit.
+    """
+    angle = 2 * np.pi * np.asarray(et) / period + phase
+    speed = 2 * np.pi * radius / period
+    cos_i, sin_i = np.cos(inclination), np.sin(inclination)
+    return np.stack([radius * np.cos(angle),
+                     radius * np.sin(angle) * cos_i,
+                     radius * np.sin(angle) * sin_i,
+                     -speed * np.sin(angle),
+                     speed * np.cos(angle) * cos_i,
+                     speed * np.cos(angle) * sin_i], axis=-1)
+
+
+def chebyshev_coeffs(states, start, stop, intlen, degree, velocity):
+    """
+    Chebyshev coefficients for SPK type 2 and 3 segments.
+    """
+    n = int(round((stop - start) / intlen))
+    nodes = np.cos(np.pi * (np.arange(degree + 1) + 0.5) / (degree + 1))
+    components = range(6) if velocity else range(3)
+    coeffs = []
+    for i in range(n):
+        mid = start + (i + 0.5) * intlen
+        s = states(mid + intlen / 2 * nodes)
+        coeffs += [np.polynomial.chebyshev.chebfit(nodes, s[:, c], degree)
+                   for c in components]
+    return n, np.concatenate(coeffs)
+
+
+def write_synthetic_spk(fname):
+    """
+    Write an SPK file containing segments of types 2, 3, 9 and 13.
+
+    The file contains the Sun relative to the solar system barycentre (type 2),
+    PSP relative to the Sun (type 3 then type 13), Solar Orbiter relative to
+    the Sun in the ECLIPJ2000 frame (type 9), and STEREO-A relative to the Sun
+    (type 13 with an odd window size).
+    """
+    rng = np.random.default_rng(1)
+    handle = spiceypy.spkopn(str(fname), 'astrospice test', 0)
+
+    def sun(et):
+        return circular_orbit(et, 7e5, 3.7e8, 0.3)
+
+    # Cover past T1, so no generic kernels are needed to get states relative
+    # to the solar system barycentre
+    intlen = 8 * 86400
+    n, coeffs = chebyshev_coeffs(sun, T0, T1 + intlen, intlen, 10, False)
+    spiceypy.spkw02(handle, 10, 0, 'J2000', T0, T0 + n * intlen, 'SUN',
+                    intlen, n, 10, coeffs, T0)
+
+    def psp(et):
+        return circular_orbit(et, 3e7, 88 * 86400, 1.0)
+
+    intlen = 86400
+    n, coeffs = chebyshev_coeffs(psp, T0, T_SPLIT, intlen, 12, True)
+    spiceypy.spkw03(handle, -96, 10, 'J2000', T0, T_SPLIT, 'PSP 3',
+                    intlen, n, 12, coeffs, T0)
+    epochs = T_SPLIT - 1e6 + np.cumsum(rng.uniform(3000, 9000, 7000))
+    spiceypy.spkw13(handle, -96, 10, 'J2000', T_SPLIT, T1, 'PSP 13',
+                    7, len(epochs), psp(epochs), epochs)
+
+    def solo(et):
+        return circular_orbit(et, 5e7, 150 * 86400, 2.0)
+
+    epochs = T0 - 1e5 + np.cumsum(rng.uniform(1000, 3000, 30000))
+    spiceypy.spkw09(handle, -144, 10, 'ECLIPJ2000', T0, T1, 'SOLO 9',
+                    8, len(epochs), solo(epochs), epochs)
+    spiceypy.spkw13(handle, -234, 10, 'J2000', T0, T1, 'STA 13',
+                    5, len(epochs), solo(epochs + 5e6), epochs)
+    spiceypy.spkcls(handle)
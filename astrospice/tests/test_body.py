@@ -1,6 +1,12 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pytest
 
-from astrospice import Body
+import astrospice
+from astrospice import Body, body_ids
+from astrospice.tests.helpers import T0
 
 
 def test_errors():
@@ -13,3 +19,51 @@ def test_errors():
     msg = 'Body name "not a body" not known by SPICE'
     with pytest.raises(ValueError, match=msg):
         Body('not a body')
+
+
+def test_interned():
+    sun = Body(10)
+    assert Body('SUN') is sun
+    assert Body(np.int32(10)) is sun
+    assert Body(sun) is sun
+    assert sun.name == 'SUN'
+    assert pickle.loads(pickle.dumps(sun)) is sun
+
+
+def test_hashable():
+    bodies = {Body(10): 'sun', Body(399): 'earth'}
+    assert bodies[Body('SUN')] == 'sun'
+    assert {Body(10), Body('SUN'), Body(399)} == {Body(10), Body(399)}
+
+
+def test_read_only():
+    with pytest.raises(AttributeError):
+        Body(10).id = 399
+
+
+def test_body_ids():
+    ids = body_ids(['SUN', 10, 'EARTH', Body(399), 10])
+    np.testing.assert_array_equal(ids, [10, 10, 399, 399, 10])
+
+    ids = body_ids([['SUN', 'EARTH'], ['EARTH', 'SUN']])
+    np.testing.assert_array_equal(ids, [[10, 399], [399, 10]])
+
+    with pytest.raises(ValueError, match='not known by SPICE'):
+        body_ids(['SUN', 'not a body'])
+
+
+def test_threads(furnished_spk):
+    from astrospice.body import _clear_body_cache
+
+    # Unknown names in some threads shouldn't cause SPICE errors in others
+    def resolve(i):
+        _clear_body_cache()
+        if i % 2:
+            with pytest.raises(ValueError, match='not known by SPICE'):
+                Body(f'not a body {i}')
+        else:
+            assert astrospice.generate_coords(
+                'SOLAR PROBE PLUS', [T0 + i], output='array').shape == (1, 6)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(resolve, range(200)))
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import numpy as np
+import spiceypy
+
+from astrospice.__main__ import main
+from astrospice.bundle import export_bundle
+from astrospice.pool import kernel_pool
+from astrospice.spk import CoverageIndex, _read_segments, _ssb_states
+from astrospice.tests.helpers import T0, T1
+
+BODIES = [10, -96, -144, -234]
+
+
+def test_export_bundle(furnished_spk, tmp_path):
+    mk = export_bundle(tmp_path)
+    assert mk.fname == tmp_path / 'astrospice.tm'
+    assert mk.kernels[-1] == furnished_spk
+    assert not (tmp_path / 'astrospice.bsp').exists()
+
+
+def test_export_bundle_consolidate(furnished_spk, tmp_path):
+    mk = export_bundle(tmp_path, name='bundle', consolidate=True)
+    spk = tmp_path / 'bundle.bsp'
+    assert mk.kernels[-1] == spk
+    assert furnished_spk not in mk.kernels
+    assert not any(Path(k).suffix == '.bsp' for k in mk.kernels[:-1])
+
+    # The consolidated file gives the same states as the furnished files,
+    # without overlapping segments
+    index = CoverageIndex(_read_segments(str(spk)))
+    ets = np.linspace(T0, T1, 1000)
+    for body in BODIES:
+        expected = np.array([spiceypy.spkgeo(body, et, 'J2000', 0)[0]
+                             for et in ets])
+        np.testing.assert_allclose(_ssb_states(body, ets, index), expected,
+                                   rtol=0, atol=1e-6)
+    for body in index.bodies:
+        starts, stops = index.table()[index.table()['Target'] == body][
+            ['Start', 'Stop']].columns.values()
+        assert np.all(starts[1:] >= stops[:-1])
+
+
+def test_bundle_cli(synthetic_spk, tmp_path, capsys):
+    with kernel_pool.scope():
+        assert main(['bundle', str(tmp_path), str(synthetic_spk),
+                     '--consolidate']) == 0
+    assert capsys.readouterr().out.strip() == str(tmp_path / 'astrospice.tm')
+    assert (tmp_path / 'astrospice.bsp').exists()
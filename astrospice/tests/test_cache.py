@@ -0,0 +1,91 @@
+import astropy.units as u
+import numpy as np
+import pytest
+import spiceypy
+from astropy.tests.helper import assert_quantity_allclose
+from astropy.time import Time
+
+from astrospice import Kernel, generate_coords
+from astrospice.cache import CoordsCache, coords_cache
+from astrospice.tests.helpers import T0, T1
+
+
+@pytest.fixture()
+def tmp_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(coords_cache, 'directory', tmp_path)
+    coords_cache.clear()
+    yield coords_cache
+    coords_cache.clear()
+
+
+def test_generate_coords_cache(furnished_spk, tmp_cache, monkeypatch):
+    times = Time(T0 + np.arange(100) * 3600, format='et')
+    coords = generate_coords('SOLAR PROBE PLUS', times, cache=True)
+    assert len(list(tmp_cache.directory.glob('*.npz'))) == 1
+
+    # Make sure the result comes from the cache
+    monkeypatch.setattr('astrospice.coords._states', None)
+    cached = generate_coords('SOLAR PROBE PLUS', times, cache=True)
+    assert_quantity_allclose(coords.separation_3d(cached), 0 * u.km)
+
+    # And from the disk cache, once the memory cache is empty
+    tmp_cache._memory.clear()
+    cached = generate_coords('SOLAR PROBE PLUS', times, cache=True)
+    assert_quantity_allclose(coords.separation_3d(cached), 0 * u.km)
+
+
+def test_gaps_mask_not_cached(furnished_spk, tmp_cache):
+    times = np.array([T0 + 1, T1 + 86400])
+    states, _ = generate_coords(-96, times, output='array', gaps='mask',
+                                cache=True)
+    assert states.mask[1].all()
+    # The NaNs for the uncovered time must not be returned from the cache
+    with pytest.raises(spiceypy.utils.exceptions.SpiceSPKINSUFFDATA):
+        generate_coords(-96, times, cache=True)
+    assert not spiceypy.failed()
+
+
+def test_invalidated_by_kernels(furnished_spk, tmp_cache):
+    times_et = np.arange(10.)
+    key = tmp_cache.key(-96, times_et, 'J2000', 0)
+    tmp_cache.put(key, np.zeros((10, 6)))
+    assert tmp_cache.get(key) is not None
+
+    spiceypy.unload(str(furnished_spk))
+    assert tmp_cache.key(-96, times_et, 'J2000', 0) != key
+    assert len(tmp_cache._memory) == 0
+
+    Kernel(furnished_spk)
+    assert tmp_cache.key(-96, times_et, 'J2000', 0) == key
+
+
+def test_keys(tmp_cache):
+    times_et = np.arange(10.)
+    key = tmp_cache.key(-96, times_et, 'J2000', 0)
+    assert tmp_cache.key(-96, times_et, 'J2000', 0) == key
+    assert tmp_cache.key(-96, times_et + 1, 'J2000', 0) != key
+    assert tmp_cache.key(-144, times_et, 'J2000', 0) != key
+    assert tmp_cache.key(-96, times_et, 'ECLIPJ2000', 0) != key
+    assert tmp_cache.key(-96, times_et, 'J2000', 10) != key
+
+
+def test_lru(tmp_path):
+    cache = CoordsCache(max_memory_items=2, max_disk_bytes=0,
+                        directory=tmp_path)
+    for key in ['a', 'b', 'c']:
+        cache.put(key, np.zeros(3))
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+    assert not list(tmp_path.iterdir())
+
+
+def test_disk_eviction(tmp_path):
+    cache = CoordsCache(max_memory_items=0, directory=tmp_path)
+    cache.put('a', np.random.default_rng(0).random(1000))
+    size = (tmp_path / 'a.npz').stat().st_size
+    cache.max_disk_bytes = 2.5 * size
+    cache.put('b', np.random.default_rng(1).random(1000))
+    # Accessing 'a' means 'b' is now the least recently used
+    assert cache.get('a') is not None
+    cache.put('c', np.random.default_rng(2).random(1000))
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ['a', 'c']
@@ -0,0 +1,18 @@
+import pytest
+
+from astrospice.config import _atomic_write
+
+
+def test_atomic_write(tmp_path):
+    fname = tmp_path / 'new' / 'file.txt'
+    with _atomic_write(fname) as f:
+        f.write('first')
+    assert fname.read_text() == 'first'
+
+    # On an error the file is unchanged, and the temporary file is removed
+    with pytest.raises(RuntimeError):
+        with _atomic_write(fname) as f:
+            f.write('second')
+            raise RuntimeError
+    assert fname.read_text() == 'first'
+    assert list(fname.parent.iterdir()) == [fname]
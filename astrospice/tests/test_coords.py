@@ -1,15 +1,23 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import astropy
 import astropy.units as u
 import hypothesis.strategies as st
+import numpy as np
 import pytest
+import spiceypy
 from astropy.coordinates import get_body
 from astropy.tests.helper import assert_quantity_allclose
-from astropy.time import Time
+from astropy.time import Time, TimeDelta
 from hypothesis import given, settings
 from packaging import version
 
 import astrospice
-from astrospice import generate_coords
+from astrospice import generate_coords, generate_coords_multi, iter_coords
+from astrospice.tests.helpers import T0, T1
 
 
 @st.composite
@@ -47,3 +55,294 @@ def test_different_ephem():
 
     # Check that generated coordinates are different
     assert coords[0].separation_3d(coords[1]) > 100 * u.m
+
+
+def test_observer(furnished_spk):
+    times = Time(np.linspace(T0, T1, 100), format='et')
+    coords = generate_coords('SOLAR PROBE PLUS', times, observer='SUN')
+    assert coords.frame.name == 'hcrs'
+    expected = (generate_coords('SOLAR PROBE PLUS', times, output='array') -
+                generate_coords('SUN', times, output='array'))
+    assert_quantity_allclose(coords.cartesian.xyz.T, expected[:, :3] * u.km,
+                             atol=1 * u.mm)
+    assert_quantity_allclose(coords.velocity.d_xyz.T,
+                             expected[:, 3:] * u.km / u.s,
+                             atol=1 * u.mm / u.s)
+
+    coords_numpy = generate_coords('SOLAR PROBE PLUS', times, frame='hcrs',
+                                   engine='numpy')
+    assert_quantity_allclose(coords.separation_3d(coords_numpy), 0 * u.km,
+                             atol=1 * u.mm)
+
+
+def test_heliocentric_inertial(furnished_spk):
+    from sunpy.coordinates import HeliocentricInertial
+
+    times = Time(np.linspace(T0, T1, 100), format='et')
+    coords = generate_coords('SOLAR PROBE PLUS', times,
+                             frame='heliocentricinertial')
+    assert isinstance(coords.frame, HeliocentricInertial)
+    # The frame's default spherical representation is kept
+    assert coords.lon.unit == u.deg
+    assert coords.lat.unit == u.deg
+    assert_quantity_allclose(coords.distance, coords.cartesian.norm())
+    expected = generate_coords('SOLAR PROBE PLUS', times,
+                               observer='SUN').transform_to(
+        HeliocentricInertial(obstime=times))
+    # sunpy's own rotation is only numerically precise to ~1e-7
+    assert_quantity_allclose(coords.separation_3d(expected), 0 * u.km,
+                             atol=10 * u.km)
+
+    chunks = list(iter_coords('SOLAR PROBE PLUS', times, chunk_size=30,
+                              frame='heliocentricinertial'))
+    assert all(isinstance(c.frame, HeliocentricInertial) for c in chunks)
+
+    # Evenly spaced times, as used in the PSP trajectory example
+    coords = generate_coords('SOLAR PROBE PLUS',
+                             (times[0], times[-1], TimeDelta(0.5 * u.day)),
+                             frame='heliocentricinertial')
+    assert isinstance(coords.frame, HeliocentricInertial)
+
+
+def test_frame_errors(furnished_spk):
+    time = Time(T0, format='et')
+    with pytest.raises(ValueError, match='frame must be one of'):
+        generate_coords('SOLAR PROBE PLUS', time, frame='galactic')
+    with pytest.raises(ValueError, match='observer must be Body'):
+        generate_coords('SOLAR PROBE PLUS', time, frame='icrs',
+                        observer='SUN')
+
+
+@pytest.mark.parametrize('engine', ['spice', 'numpy'])
+def test_array_output(furnished_spk, engine):
+    times = Time(np.linspace(T0, T1, 100), format='et')
+    states = generate_coords('SOLAR PROBE PLUS', times, output='array',
+                             engine=engine)
+    assert states.shape == (100, 6)
+    assert states.dtype == np.float64
+    expected, _ = spiceypy.spkezr('SOLAR PROBE PLUS', times.et, 'J2000',
+                                  'NONE', 'SSB')
+    np.testing.assert_allclose(states, expected, rtol=0, atol=1e-6)
+
+    coords = generate_coords('SOLAR PROBE PLUS', times, engine=engine)
+    assert_quantity_allclose(coords.cartesian.xyz.T, states[:, :3] * u.km)
+    assert_quantity_allclose(coords.velocity.d_xyz.T,
+                             states[:, 3:] * u.km / u.s)
+
+    with pytest.raises(ValueError, match='output must be'):
+        generate_coords('SOLAR PROBE PLUS', times, output='table')
+
+
+def test_out_buffer(furnished_spk):
+    times = Time(np.linspace(T0, T1, 100), format='et')
+    out = np.empty((100, 6))
+    for frame in ['icrs', 'hcrs', 'heliocentricinertial']:
+        expected = generate_coords('SOLAR PROBE PLUS', times, frame=frame,
+                                   output='array')
+        states = generate_coords('SOLAR PROBE PLUS', times, frame=frame,
+                                 output='array', out=out)
+        assert states is out
+        np.testing.assert_array_equal(out, expected)
+
+    coords = generate_coords('SOLAR PROBE PLUS', times, out=out, cache=True)
+    cached = generate_coords('SOLAR PROBE PLUS', times, output='array',
+                             out=out, cache=True)
+    assert cached is out
+    assert_quantity_allclose(coords.cartesian.xyz.T, out[:, :3] * u.km)
+
+    for bad in [np.empty((99, 6)), np.empty((100, 6), dtype=np.float32),
+                np.empty((6, 100)).T, [[0] * 6] * 100]:
+        with pytest.raises(ValueError, match='out must be'):
+            generate_coords('SOLAR PROBE PLUS', times, output='array',
+                            out=bad)
+
+
+def test_time_inputs(furnished_spk):
+    # Avoid the kernel edges, as datetime64 conversion is approximate
+    times = Time(np.linspace(T0 + 1, T1 - 1, 100), format='et')
+    expected = generate_coords('SOLAR PROBE PLUS', times, output='array')
+
+    states = generate_coords('SOLAR PROBE PLUS', times.et, output='array')
+    np.testing.assert_array_equal(states, expected)
+    coords = generate_coords('SOLAR PROBE PLUS', times.et)
+    assert np.all(coords.obstime == times)
+
+    states = generate_coords('SOLAR PROBE PLUS',
+                             times.utc.datetime64, output='array')
+    # Within 50 microseconds, at up to ~100 km/s
+    np.testing.assert_allclose(states, expected, rtol=0, atol=1e-2)
+
+    step = (T1 - T0 - 2) / 99 * u.s
+    states = generate_coords('SOLAR PROBE PLUS', (times[0], times[-1], step),
+                             output='array')
+    assert states.shape == (99, 6)
+    np.testing.assert_allclose(states, expected[:-1], rtol=1e-12)
+    states = generate_coords('SOLAR PROBE PLUS',
+                             (times[0], times[-1], TimeDelta(step)),
+                             output='array')
+    np.testing.assert_allclose(states, expected[:-1], rtol=1e-12)
+
+
+@pytest.mark.parametrize('engine', ['spice', 'numpy'])
+@pytest.mark.parametrize('frame', ['icrs', 'hcrs', 'heliocentricinertial'])
+def test_generate_coords_multi(furnished_spk, engine, frame):
+    bodies = ['SUN', 'SOLAR PROBE PLUS', -144]
+    times = np.linspace(T0, T1, 100)
+    states = generate_coords_multi(bodies, times, frame=frame,
+                                   output='array', engine=engine)
+    assert states.shape == (3, 100, 6)
+    coords = generate_coords_multi(bodies, times, frame=frame, engine=engine)
+    assert list(coords) == bodies
+
+    for body, body_states in zip(bodies, states):
+        expected = generate_coords(body, times, frame=frame, output='array',
+                                   engine=engine)
+        np.testing.assert_allclose(body_states, expected, rtol=1e-12,
+                                   atol=1e-9)
+        assert coords[body].frame.name == frame
+        assert_quantity_allclose(coords[body].cartesian.xyz.T,
+                                 body_states[:, :3] * u.km)
+    assert coords['SUN'].obstime is coords[-144].obstime
+
+
+@pytest.mark.parametrize('engine', ['spice', 'numpy'])
+def test_gaps_mask(furnished_spk, engine):
+    times = np.array([T0 - 86400, T0 + 1, T1 - 1, T1 + 86400])
+    expected = generate_coords(-96, times[1:3], output='array')
+
+    states, reasons = generate_coords(-96, times, output='array',
+                                      engine=engine, gaps='mask')
+    assert isinstance(states, np.ma.MaskedArray)
+    np.testing.assert_array_equal(states.mask[:, 0],
+                                  [True, False, False, True])
+    np.testing.assert_allclose(states[1:3], expected, rtol=0, atol=1e-6)
+    reason = 'Insufficient ephemeris data loaded for body -96'
+    np.testing.assert_array_equal(reasons, [reason, '', '', reason])
+
+    coords, reasons = generate_coords(-96, times, engine=engine, gaps='mask')
+    xyz = coords.cartesian.xyz.to_value(u.km)
+    assert np.isnan(xyz[:, [0, 3]]).all()
+    np.testing.assert_allclose(xyz[:, 1:3], expected[:, :3].T, rtol=0,
+                               atol=1e-6)
+
+    # Fully covered
+    states, reasons = generate_coords(-96, times[1:3], output='array',
+                                      engine=engine, gaps='mask')
+    assert not states.mask.any()
+    assert (reasons == '').all()
+
+    with pytest.raises(ValueError, match='gaps must be'):
+        generate_coords(-96, times, gaps='skip')
+
+
+@pytest.mark.parametrize('engine', ['spice', 'numpy'])
+def test_agenerate_coords(furnished_spk, monkeypatch, engine):
+    times = [np.linspace(T0 + 1, T1 - 1, n) for n in range(1, 11)]
+    calls = []
+    frame_states = astrospice.coords._frame_states
+
+    def counting_frame_states(body, times_et, *args, **kwargs):
+        calls.append(times_et.size)
+        return frame_states(body, times_et, *args, **kwargs)
+
+    monkeypatch.setattr(astrospice.coords, '_frame_states',
+                        counting_frame_states)
+
+    async def generate():
+        # Hold the lock while the requests are made, so they are coalesced
+        with astrospice.spice_lock:
+            tasks = [asyncio.create_task(astrospice.agenerate_coords(
+                -96, t, output='array', engine=engine)) for t in times]
+            await asyncio.sleep(0.1)
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(generate())
+    assert calls == [sum(t.size for t in times)]
+    for t, result in zip(times, results):
+        np.testing.assert_allclose(result, generate_coords(
+            -96, t, output='array', engine=engine), rtol=0, atol=1e-6)
+
+    coords = asyncio.run(astrospice.agenerate_coords(
+        -96, Time(times[1], format='et'), frame='hcrs'))
+    assert_quantity_allclose(
+        coords.separation_3d(generate_coords(-96, Time(times[1], format='et'),
+                                             frame='hcrs')),
+        0 * u.km, atol=1 * u.mm)
+
+
+def test_agenerate_coords_errors(furnished_spk):
+    async def generate():
+        with astrospice.spice_lock:
+            tasks = [asyncio.create_task(astrospice.agenerate_coords(
+                -96, t, output='array', engine='numpy'))
+                for t in [[T0 + 1], [T1 + 86400], [T1 - 1]]]
+            await asyncio.sleep(0.1)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    good, bad, good2 = asyncio.run(generate())
+    assert isinstance(bad, ValueError)
+    assert good.shape == good2.shape == (1, 6)
+
+
+def test_generate_coords_threads(furnished_spk):
+    times = np.linspace(T0 + 1, T1 - 1, 1000)
+    expected = generate_coords(-96, times, output='array')
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(
+            lambda body: generate_coords(body, times, output='array'),
+            [-96] * 16))
+    for result in results:
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_spkgeo_public_fallback(furnished_spk, monkeypatch):
+    times = np.linspace(T0 + 1, T1 - 1, 10)
+    expected = generate_coords(-96, times, output='array')
+    monkeypatch.setattr(astrospice.coords, 'libspice', None)
+    np.testing.assert_array_equal(
+        generate_coords(-96, times, output='array'), expected)
+
+
+def test_agenerate_coords_setup_error(furnished_spk, monkeypatch):
+    def fail():
+        raise OSError('Could not download the generic kernels')
+
+    monkeypatch.setattr(astrospice.coords, '_furnish_generic_kernels', fail)
+
+    async def generate():
+        with astrospice.spice_lock:
+            tasks = [asyncio.create_task(astrospice.agenerate_coords(
+                -96, [T0 + 1], output='array')) for _ in range(3)]
+            await asyncio.sleep(0.1)
+        return await asyncio.wait_for(
+            asyncio.gather(*tasks, return_exceptions=True), 10)
+
+    results = asyncio.run(generate())
+    assert all(isinstance(result, OSError) for result in results)
+
+
+def test_agenerate_coords_responsive(furnished_spk):
+    # Another thread holding the SPICE lock shouldn't block the event loop
+    locked, release = threading.Event(), threading.Event()
+
+    def hold():
+        with astrospice.spice_lock:
+            locked.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+
+    async def generate():
+        task = asyncio.create_task(astrospice.agenerate_coords(
+            -96, [T0 + 1], frame='hcrs'))
+        start = time.monotonic()
+        await asyncio.sleep(0.1)
+        assert time.monotonic() - start < 2
+        release.set()
+        return await task
+
+    coords = asyncio.run(generate())
+    thread.join()
+    assert coords.frame.name == 'hcrs'
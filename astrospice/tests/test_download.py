@@ -0,0 +1,174 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+
+from astrospice.__main__ import main
+from astrospice.net.cache import kernel_cache
+from astrospice.net.download import download_kernels
+from astrospice.net.reg import KernelRegistry, RemoteKernel
+
+
+@pytest.fixture()
+def server(synthetic_spk):
+    """
+    A local HTTP server that supports range requests, and serves a synthetic
+    SPK file and a text file.
+
+    Responses for the paths in ``server.truncate`` are cut short once.
+    """
+    files = {'/synthetic.bsp': synthetic_spk.read_bytes(),
+             '/kernel.tm': b'\\begindata\nKERNELS_TO_LOAD = ()\n'}
+    requests = []
+    truncate = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append((self.path, self.headers.get('Range')))
+            data = files.get(self.path)
+            if data is None:
+                self.send_error(404)
+                return
+            start = 0
+            if self.headers.get('Range'):
+                start = int(self.headers['Range'][6:-1])
+                if start >= len(data):
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{len(data)}')
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header('Content-Range',
+                                 f'bytes {start}-{len(data) - 1}/{len(data)}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', str(len(data) - start))
+            self.end_headers()
+            self.wfile.write(data[start:truncate.pop(self.path, None)])
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    httpd.files = files
+    httpd.requests = requests
+    httpd.truncate = truncate
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def remote(server, fname):
+    return RemoteKernel(server.url + fname, None, None, 1)
+
+
+def test_download(server, tmp_path):
+    kernels = [remote(server, 'synthetic.bsp'), remote(server, 'kernel.tm'),
+               remote(server, 'synthetic.bsp')]
+    paths = download_kernels(kernels, directory=tmp_path)
+    assert paths == [tmp_path / 'synthetic.bsp', tmp_path / 'kernel.tm',
+                     tmp_path / 'synthetic.bsp']
+    for path in paths:
+        assert path.read_bytes() == server.files['/' + path.name]
+    assert len(server.requests) == 2
+    assert not list(tmp_path.glob('*.part'))
+
+    # Existing files aren't downloaded again
+    download_kernels(kernels, directory=tmp_path)
+    assert len(server.requests) == 2
+
+
+def test_download_in_event_loop(server, tmp_path):
+    # e.g. in a Jupyter notebook
+    async def download():
+        return download_kernels([remote(server, 'synthetic.bsp')],
+                                directory=tmp_path)
+
+    assert asyncio.run(download()) == [tmp_path / 'synthetic.bsp']
+
+
+def test_resume(server, tmp_path):
+    kernel = remote(server, 'synthetic.bsp')
+    server.truncate['/synthetic.bsp'] = 5000
+    with pytest.raises(aiohttp.ClientPayloadError):
+        download_kernels([kernel], directory=tmp_path)
+    # The partial download isn't mistaken for a complete kernel
+    assert not (tmp_path / 'synthetic.bsp').exists()
+    assert (tmp_path / 'synthetic.bsp.part').stat().st_size == 5000
+
+    path, = download_kernels([kernel], directory=tmp_path)
+    assert path.read_bytes() == server.files['/synthetic.bsp']
+    assert server.requests[-1] == ('/synthetic.bsp', 'bytes=5000-')
+    assert not (tmp_path / 'synthetic.bsp.part').exists()
+
+    # A complete partial download is verified and renamed
+    path.rename(tmp_path / 'synthetic.bsp.part')
+    download_kernels([kernel], directory=tmp_path)
+    assert path.read_bytes() == server.files['/synthetic.bsp']
+
+
+def test_corrupt(server, tmp_path):
+    # Served in full, but not a complete DAF file
+    data = server.files['/synthetic.bsp']
+    server.files['/synthetic.bsp'] = data[:len(data) // 2048 * 1024]
+    with pytest.raises(ValueError, match='is corrupt: file is truncated'):
+        download_kernels([remote(server, 'synthetic.bsp')],
+                         directory=tmp_path)
+    assert not list(tmp_path.iterdir())
+
+    server.files['/synthetic.bsp'] = data.replace(b'\r\n', b'\n', 1)
+    with pytest.raises(ValueError, match='is corrupt'):
+        download_kernels([remote(server, 'synthetic.bsp')],
+                         directory=tmp_path)
+
+
+def test_kernel_cache(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(kernel_cache, 'directory', tmp_path)
+    kernel = RemoteKernel(server.url + 'synthetic.bsp', None, None, 3)
+    download_kernels([kernel], directory=tmp_path)
+    entry = kernel_cache.entries['synthetic.bsp']
+    assert entry['url'] == kernel.url
+    assert entry['version'] == 3
+
+    # Using a kernel that's already downloaded updates its access time
+    accessed = entry['accessed']
+    download_kernels([kernel], directory=tmp_path)
+    assert kernel_cache.entries['synthetic.bsp']['accessed'] > accessed
+
+
+def test_prefetch_cli(monkeypatch, capsys):
+    calls = []
+
+    def prefetch(self, bodies, types, **kwargs):
+        calls.append((bodies, types, kwargs))
+        return ['kernel.bsp']
+
+    monkeypatch.setattr(KernelRegistry, 'prefetch', prefetch)
+    assert main(['prefetch', 'psp', '--type', 'recon',
+                 '--start', '2020-01-01', '--end', '2020-02-01']) == 0
+    assert capsys.readouterr().out == 'kernel.bsp\n'
+    bodies, types, kwargs = calls[-1]
+    assert (bodies, types) == (['psp'], ['recon'])
+    assert kwargs['trange'][0].isot == '2020-01-01T00:00:00.000'
+
+    assert main(['prefetch']) == 0
+    assert calls[-1][:2] == (None, None)
+
+    with pytest.raises(SystemExit):
+        main(['prefetch', '--start', '2020-01-01'])
+
+
+def test_cache_cli(tmp_path, synthetic_spk, monkeypatch, capsys):
+    monkeypatch.setattr(kernel_cache, 'directory', tmp_path)
+    (tmp_path / 'synthetic.bsp').write_bytes(synthetic_spk.read_bytes())
+    assert main(['cache', '--scan']) == 0
+    assert 'synthetic.bsp' in capsys.readouterr().out
+
+    assert main(['cache', '--max-bytes', '0']) == 0
+    assert 'Deleted' in capsys.readouterr().out
+    assert not (tmp_path / 'synthetic.bsp').exists()
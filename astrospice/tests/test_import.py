@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import astrospice
+
+
+def test_lazy_import():
+    # Importing astrospice should not import any heavy dependencies, or
+    # furnish any kernels
+    code = ('import sys, astrospice; '
+            'print(" ".join(sorted(sys.modules)))')
+    # Use isolated mode, so nothing else is imported at startup
+    modules = subprocess.run([sys.executable, '-I', '-c', code], check=True,
+                             capture_output=True, text=True).stdout.split()
+    for module in ['astropy', 'spiceypy', 'numpy', 'bs4', 'aiohttp',
+                   'astrospice.kernel', 'astrospice.net.reg']:
+        assert module not in modules
+
+
+def test_lazy_attributes():
+    assert 'generate_coords' in dir(astrospice)
+    assert astrospice.Body is astrospice.body.Body
+    assert astrospice.registry is astrospice.net.reg.registry
+    assert 'psp' in astrospice.registry.bodies
+    assert astrospice.net.listing.listing_index is not None
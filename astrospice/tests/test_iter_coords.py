@@ -0,0 +1,67 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import SkyCoord
+from astropy.tests.helper import assert_quantity_allclose
+from astropy.time import Time
+
+from astrospice import generate_coords, iter_coords
+from astrospice.tests.helpers import T0
+
+START = Time(T0 + 86400, format='et')
+STOP = START + 10 * u.day
+STEP = 1 * u.hour
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 1000])
+def test_time_range(furnished_spk, chunk_size):
+    chunks = list(iter_coords('SOLAR PROBE PLUS', (START, STOP, STEP),
+                              chunk_size=chunk_size, output='array'))
+    assert all(len(et) <= chunk_size for et, states in chunks)
+
+    et = np.concatenate([et for et, states in chunks])
+    states = np.concatenate([states for et, states in chunks])
+    assert et.size == 240
+    np.testing.assert_allclose(np.diff(et), 3600)
+    assert et[0] == START.et
+
+    expected = generate_coords('SOLAR PROBE PLUS', Time(et, format='et'))
+    np.testing.assert_allclose(states[:, 0], expected.cartesian.x.to_value(u.km))
+
+
+def test_time_range_float_step(furnished_spk):
+    # A step without units is an error, not three separate times
+    with pytest.raises(ValueError, match='must be a Quantity or TimeDelta'):
+        list(iter_coords('SOLAR PROBE PLUS', (START, STOP, 3600.)))
+    with pytest.raises(ValueError, match='must be a Quantity or TimeDelta'):
+        generate_coords('SOLAR PROBE PLUS', (START, STOP, 3600.))
+
+
+def test_time_array(furnished_spk):
+    times = START + np.arange(50) * u.hour
+    chunks = list(iter_coords('SOLAR PROBE PLUS', times, chunk_size=20))
+    assert [len(c) for c in chunks] == [20, 20, 10]
+    assert all(isinstance(c, SkyCoord) for c in chunks)
+    assert chunks[1].obstime[0] == times[20]
+
+    expected = generate_coords('SOLAR PROBE PLUS', times)
+    assert_quantity_allclose(chunks[2].separation_3d(expected[40:]), 0 * u.km)
+
+
+def test_time_iterator(furnished_spk):
+    def times():
+        for i in range(5):
+            yield START + i * u.day + np.arange(7) * u.hour
+
+    chunks = list(iter_coords('SOLAR PROBE PLUS', times(), chunk_size=10,
+                              output='array'))
+    assert [len(et) for et, states in chunks] == [10, 10, 10, 5]
+
+
+def test_errors():
+    with pytest.raises(ValueError, match='output must be'):
+        next(iter_coords('SUN', (START, STOP, STEP), output='table'))
+    with pytest.raises(ValueError, match='chunk_size must be at least 1'):
+        next(iter_coords('SUN', (START, STOP, STEP), chunk_size=0))
+    with pytest.raises(ValueError, match='step must be positive'):
+        next(iter_coords('SUN', (START, STOP, -STEP)))
@@ -1,13 +1,22 @@
 from pathlib import Path
 
+import numpy as np
 import pytest
+import spiceypy
+from astropy.time import Time
 from spiceypy.utils.exceptions import SpiceFILEREADFAILED, SpiceNOSUCHFILE
 
-from astrospice import Kernel
+from astrospice import Body, Kernel, SPKKernel, furnished_kernels, kernel_pool
 from astrospice.kernel import MetaKernel
+from astrospice.tests.helpers import T0, T1
 
 # mimic text structure of MetaKernel
-METAKERNEL_CONTENT = "KERNELS_TO_LOAD   = (\n                           '$KERNELS/test_subfolder/test_kernel.bsp'\n                         )"
+METAKERNEL_CONTENT = ("\\begindata\n"
+                      "PATH_VALUES = ( '.' )\n"
+                      "PATH_SYMBOLS = ( 'KERNELS' )\n"
+                      "KERNELS_TO_LOAD   = (\n"
+                      "                           '$KERNELS/test_subfolder/test_kernel.bsp'\n"
+                      "                         )")
 
 
 @pytest.fixture()
@@ -40,6 +49,13 @@ def test_metakernel_kernels(example_mk):
     assert kernels[0].parent.stem == 'test_subfolder'
 
 
+def test_metakernel_undefined_symbol(tmp_path):
+    fname = tmp_path / 'undefined.tm'
+    fname.write_text("\\begindata\nKERNELS_TO_LOAD = ( '$KERNELS/a.bsp' )\n")
+    with pytest.raises(ValueError, match='"KERNELS" in .* is not defined'):
+        MetaKernel(fname, furnish=False).kernels
+
+
 def test_all_kernels_exist(example_mk, tmp_path):
     mk = MetaKernel(example_mk)
     assert not mk.all_kernels_exist
@@ -59,3 +75,102 @@ def test_metakernels_init(example_mk, tmp_path):
     create_example_kernel(tmp_path)
     with pytest.raises(SpiceFILEREADFAILED):
         MetaKernel(example_mk)
+
+
+def test_spk_no_furnish(synthetic_spk):
+    n_loaded = spiceypy.ktotal('ALL')
+    k = Kernel(synthetic_spk, furnish=False)
+    assert isinstance(k, SPKKernel)
+    assert spiceypy.ktotal('ALL') == n_loaded
+
+    assert k.bodies == [Body(-234), Body(-144), Body(-96), Body(10)]
+    assert len(k.summary) == 5
+    assert list(k.summary['type']) == [2, 3, 13, 9, 13]
+    assert set(k.summary['center']) == {0, 10}
+    assert set(k.summary['frame']) == {1, 17}
+    assert str(k) == ('SPK Kernel for Stereo ahead, Solar orbiter, '
+                      'Solar probe plus, Sun')
+
+
+@pytest.mark.parametrize('body', [10, -96, -144])
+def test_spk_coverage(synthetic_spk, body):
+    k = SPKKernel(synthetic_spk, furnish=False)
+    expected = spiceypy.spkcov(str(synthetic_spk), body)
+    coverage = k.coverage(body)
+    assert isinstance(coverage, Time)
+    np.testing.assert_equal(coverage.tdb.et, list(expected))
+
+
+def test_spk_not_daf(tmp_path):
+    fpath = tmp_path / 'test.bsp'
+    fpath.write_text(' ' * 2048)
+    with pytest.raises(ValueError, match='is not a binary DAF file'):
+        SPKKernel(fpath, furnish=False)
+
+
+def test_furnished_kernels(synthetic_spk):
+    Kernel(synthetic_spk)
+    assert furnished_kernels()[-1] == synthetic_spk
+    spiceypy.unload(str(synthetic_spk))
+    assert synthetic_spk not in furnished_kernels()
+
+
+def test_metakernel_path_values(tmp_path, synthetic_spk):
+    long_dir = tmp_path / ('x' * 60) / ('y' * 60)
+    long_dir.mkdir(parents=True)
+    (long_dir / 'synthetic.bsp').write_bytes(synthetic_spk.read_bytes())
+    mk_dir = tmp_path / 'mk'
+    mk_dir.mkdir()
+    fname = mk_dir / 'test.tm'
+    relative = f'../{"x" * 60}/{"y" * 60}'
+    fname.write_text(
+        "KPL/MK\n\\begindata\n"
+        f"PATH_VALUES = ( '{relative[:40]}+'\n '{relative[40:]}' )\n"
+        "PATH_SYMBOLS = ( 'KERNELS' )\n"
+        "KERNELS_TO_LOAD = ( '$KERNELS/synthetic.bsp' )\n"
+        "\\begintext\n")
+
+    mk = MetaKernel(fname, furnish=False)
+    assert mk.kernels == [mk_dir / relative / 'synthetic.bsp']
+    assert mk.missing_kernels == []
+    assert not mk.is_furnished
+
+    n_loaded = spiceypy.ktotal('ALL')
+    n_pool = len(kernel_pool)
+    mk = MetaKernel(fname)
+    assert mk.is_furnished
+    # The metakernel and the SPK file it lists
+    assert spiceypy.ktotal('ALL') == n_loaded + 2
+    # The pool only has the metakernel, with the segments of the SPK file
+    assert len(kernel_pool) == n_pool + 1
+    assert kernel_pool._kernels[str(mk._resolved_fname())][0] == 5
+    mk.unload()
+    assert not mk.is_furnished
+    assert spiceypy.ktotal('ALL') == n_loaded
+
+
+def test_spk_subset(synthetic_spk, tmp_path):
+    k = SPKKernel(synthetic_spk, furnish=False)
+    start, stop = T0 + 100 * 86400, T0 + 400 * 86400
+    subset = k.subset(tmp_path / 'subset.bsp', ['SOLAR PROBE PLUS'],
+                      Time(start, format='et'), stop)
+    assert isinstance(subset, SPKKernel)
+    assert not subset.is_furnished
+    # PSP and the Sun, which it is defined relative to
+    assert subset.bodies == [Body(-96), Body(10)]
+    for body in [-96, 10]:
+        np.testing.assert_allclose(subset.coverage(body).tdb.et,
+                                   [start, stop], rtol=0, atol=1e-3)
+    assert subset.fname.stat().st_size < synthetic_spk.stat().st_size
+
+    ets = np.linspace(start, stop, 100)
+    with Kernel(synthetic_spk):
+        expected = [spiceypy.spkgeo(-96, et, 'J2000', 0)[0] for et in ets]
+    with Kernel(subset.fname):
+        states = [spiceypy.spkgeo(-96, et, 'J2000', 0)[0] for et in ets]
+    np.testing.assert_allclose(states, expected, rtol=0, atol=1e-6)
+
+    with pytest.raises(ValueError, match='has no data for body -144'):
+        k.subset(tmp_path / 'subset.bsp', [-144], T1 + 1, T1 + 2)
+    with pytest.raises(ValueError, match='start must be before stop'):
+        k.subset(tmp_path / 'subset.bsp', [-96], stop, start)
@@ -0,0 +1,136 @@
+import shutil
+import time
+from types import SimpleNamespace
+
+import pytest
+import spiceypy
+from astropy.time import Time
+
+import astrospice.net.cache
+from astrospice import Kernel
+from astrospice.net.cache import KernelCache, kernel_cache
+from astrospice.tests.helpers import T0, T1
+
+
+@pytest.fixture()
+def cache(tmp_path, synthetic_spk, monkeypatch):
+    """
+    A kernel cache containing three copies of the synthetic SPK file, and a
+    text kernel.
+    """
+    cache = KernelCache(directory=tmp_path)
+    now = time.time()
+    for i in range(3):
+        shutil.copy(synthetic_spk, tmp_path / f'spk{i}.bsp')
+        # Make sure access times are distinct
+        monkeypatch.setattr(astrospice.net.cache, 'time', SimpleNamespace(
+            time=lambda i=i: now - 100 * (3 - i)))
+        cache.add(tmp_path / f'spk{i}.bsp', url=f'http://a/spk{i}.bsp',
+                  version=i)
+    monkeypatch.setattr(astrospice.net.cache, 'time', time)
+    (tmp_path / 'kernel.tm').write_text('\\begindata\n')
+    cache.add(tmp_path / 'kernel.tm')
+    return cache
+
+
+def test_index(cache, tmp_path, synthetic_spk):
+    assert len(cache) == 4
+    assert 'spk0.bsp' in cache
+    entry = cache.entries['spk1.bsp']
+    assert entry['url'] == 'http://a/spk1.bsp'
+    assert entry['version'] == 1
+    assert entry['size'] == synthetic_spk.stat().st_size
+    assert sorted({s[0] for s in entry['segments']}) == [-234, -144, -96, 10]
+    assert cache.entries['kernel.tm']['segments'] == []
+
+    # The index is saved, so a new cache doesn't need to open the files
+    new_cache = KernelCache(directory=tmp_path)
+    assert new_cache.entries == cache.entries
+
+    table = cache.table()
+    assert list(table['File']) == ['kernel.tm', 'spk0.bsp', 'spk1.bsp',
+                                   'spk2.bsp']
+    assert table['Bodies'][1] == '-234, -144, -96, 10'
+    assert table['Start time'][1] == Time(T0, format='et').iso
+    assert table['Start time'][0] == ''
+
+    assert cache.kernels() == [tmp_path / name for name in table['File']]
+    assert len(cache.kernels(body='SOLAR PROBE PLUS')) == 3
+    assert cache.kernels(body='EARTH') == []
+    assert len(cache.kernels(time=Time(T0 + 1, format='et'))) == 3
+    assert cache.kernels(time=Time(T1 + 10 * 86400, format='et')) == []
+
+
+def test_evict_size(cache, tmp_path):
+    size = cache.entries['spk0.bsp']['size']
+    spiceypy.furnsh(str(tmp_path / 'spk0.bsp'))
+    try:
+        # The least recently used kernel is furnished, so is kept
+        deleted = cache.evict(max_bytes=2 * size + 100)
+    finally:
+        spiceypy.unload(str(tmp_path / 'spk0.bsp'))
+    assert deleted == [tmp_path / 'spk1.bsp']
+    assert not (tmp_path / 'spk1.bsp').exists()
+    assert 'spk1.bsp' not in KernelCache(directory=tmp_path)
+    assert cache.total_bytes <= 2 * size + 100
+
+    cache.touch(tmp_path / 'spk0.bsp')
+    assert cache.evict(max_bytes=size + 100) == [tmp_path / 'spk2.bsp']
+
+
+def test_furnish_touches(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(kernel_cache, 'directory', tmp_path)
+    accessed = kernel_cache.entries['spk0.bsp']['accessed']
+    with Kernel(tmp_path / 'spk0.bsp'):
+        # Furnishing a cached kernel makes it the most recently used
+        assert kernel_cache.entries['spk0.bsp']['accessed'] > accessed
+        accessed = kernel_cache.entries['spk0.bsp']['accessed']
+        # but furnishing it again while it's loaded doesn't write the index
+        Kernel(tmp_path / 'spk0.bsp')
+        assert kernel_cache.entries['spk0.bsp']['accessed'] == accessed
+    assert kernel_cache.evict(max_bytes=1) == [tmp_path / 'spk1.bsp',
+                                               tmp_path / 'spk2.bsp',
+                                               tmp_path / 'kernel.tm',
+                                               tmp_path / 'spk0.bsp']
+
+
+def test_other_processes(cache, tmp_path, synthetic_spk):
+    # Another process, with its own copy of the index
+    other = KernelCache(directory=tmp_path)
+    assert other.evict(max_bytes=3 * cache.entries['spk0.bsp']['size']) == [
+        tmp_path / 'spk0.bsp']
+    shutil.copy(synthetic_spk, tmp_path / 'spk3.bsp')
+    other.add(tmp_path / 'spk3.bsp')
+
+    # Saving merges the changes the other process made
+    cache.touch(tmp_path / 'spk1.bsp')
+    saved = KernelCache(directory=tmp_path).entries
+    assert sorted(saved) == ['kernel.tm', 'spk1.bsp', 'spk2.bsp', 'spk3.bsp']
+    assert saved['spk1.bsp']['accessed'] > saved['spk3.bsp']['accessed']
+    assert saved == cache.entries
+
+
+def test_evict_age(cache, tmp_path):
+    cache.entries['kernel.tm']['accessed'] = time.time() - 3600
+    assert cache.evict(max_age=150) == [tmp_path / 'kernel.tm',
+                                        tmp_path / 'spk0.bsp',
+                                        tmp_path / 'spk1.bsp']
+    assert cache.evict(max_age=150) == []
+
+    # Limits set on the cache are applied when kernels are added
+    cache.max_age = 0
+    shutil.copy(tmp_path / 'spk2.bsp', tmp_path / 'spk3.bsp')
+    cache.add(tmp_path / 'spk3.bsp')
+    assert list(cache.entries) == ['spk3.bsp']
+
+
+def test_scan(cache, tmp_path, synthetic_spk):
+    (tmp_path / 'spk0.bsp').unlink()
+    shutil.copy(synthetic_spk, tmp_path / 'new.bsp')
+    (tmp_path / 'partial.bsp.part').write_bytes(b'DAF/SPK')
+    accessed = cache.entries['spk1.bsp']['accessed']
+    cache.scan()
+    assert sorted(cache.entries) == ['kernel.tm', 'new.bsp', 'spk1.bsp',
+                                     'spk2.bsp']
+    assert cache.entries['spk1.bsp']['accessed'] == accessed
+    assert len(cache.entries['new.bsp']['segments']) == 5
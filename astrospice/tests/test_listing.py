@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+
+import aiohttp
+import pytest
+
+from astrospice.net.listing import ListingIndex
+from astrospice.net.reg import RemoteKernelsBase, registry
+from astrospice.net.sources.psp import PSPPredict
+from astrospice.net.sources.stereo import STEREOPredAhead
+
+PAGE = """<html><body>
+<a href="spp_nom_20180812_20250831_v038_RO5.bsp">v38</a>
+<a href="spp_nom_20180812_20250831_v039_RO6.bsp">v39</a>
+<a href="../">Parent directory</a>
+<a>No link</a>
+</body></html>
+"""
+
+
+# Time the test server takes to respond to each request
+server_delay = 0.2
+
+
+@pytest.fixture()
+def server(tmp_path):
+    """
+    A local HTTP server for a directory containing a single listing page,
+    which records the status code of each response.
+    """
+    (tmp_path / 'index.html').write_text(PAGE)
+    statuses = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(server_delay)
+            super().do_GET()
+
+        def log_request(self, code='-', size='-'):
+            statuses.append(int(code))
+
+    httpd = ThreadingHTTPServer(
+        ('127.0.0.1', 0), partial(Handler, directory=str(tmp_path)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    httpd.statuses = statuses
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_links(server, tmp_path):
+    index = ListingIndex(directory=tmp_path / 'listings')
+    links = index.links(server.url)
+    assert links == ['spp_nom_20180812_20250831_v038_RO5.bsp',
+                     'spp_nom_20180812_20250831_v039_RO6.bsp',
+                     '../']
+    assert server.statuses == [200]
+
+    # Within the TTL the listing is read from the index
+    assert index.links(server.url) == links
+    assert server.statuses == [200]
+
+    # A new index re-reads the listing from disk
+    index = ListingIndex(directory=tmp_path / 'listings')
+    assert index.links(server.url) == links
+    assert server.statuses == [200]
+
+    # After the TTL a conditional request is made
+    index.ttl = 0
+    assert index.links(server.url) == links
+    assert server.statuses == [200, 304]
+
+
+def test_modified(server, tmp_path):
+    index = ListingIndex(ttl=0, directory=tmp_path / 'listings')
+    index.links(server.url)
+    (tmp_path / 'index.html').write_text(PAGE.replace('v039', 'v040'))
+    # Pretend the indexed listing is older than the file
+    entry = index._load(server.url)
+    entry['last_modified'] = 'Thu, 01 Jan 1970 00:00:00 GMT'
+
+    links = index.links(server.url)
+    assert 'spp_nom_20180812_20250831_v040_RO6.bsp' in links
+    assert server.statuses == [200, 200]
+
+
+def test_offline(server, tmp_path):
+    index = ListingIndex(ttl=0, directory=tmp_path / 'listings')
+    links = index.links(server.url)
+    server.shutdown()
+    server.server_close()
+    # Falls back to the indexed listing if the server can't be reached
+    assert index.links(server.url) == links
+
+    with pytest.raises(URLError):
+        index.links(server.url + 'other/')
+
+
+def test_clear(server, tmp_path):
+    index = ListingIndex(directory=tmp_path / 'listings')
+    index.links(server.url)
+    index.clear()
+    assert list((tmp_path / 'listings').glob('*.json')) == []
+    index.links(server.url)
+    assert server.statuses == [200, 200]
+
+
+def test_parse_links():
+    kernels = PSPPredict().parse_links(
+        ['spp_nom_20180812_20250831_v038_RO5.bsp', '../', 'index.html'])
+    assert len(kernels) == 1
+    assert kernels[0].version == 38
+    assert kernels[0].url == (PSPPredict.listing_url +
+                              'spp_nom_20180812_20250831_v038_RO5.bsp')
+
+
+@pytest.mark.filterwarnings(r'ignore:ERFA function.*dubious year')
+def test_no_listing_url():
+    # Sources without a listing get an empty list of links
+    kernels = STEREOPredAhead().get_remote_kernels()
+    assert len(kernels) == 1
+    assert kernels[0].url.endswith(STEREOPredAhead.fname)
+
+
+def test_remote_kernels_base():
+    # Sources can override get_remote_kernels, or rely on the default
+    # parse_links with their own matches
+    class GetRemoteKernels(RemoteKernelsBase):
+        body = 'test body'
+        type = 'predict'
+
+        def get_remote_kernels(self):
+            return []
+
+    class Matches(RemoteKernelsBase):
+        body = 'test body'
+        type = 'recon'
+        listing_url = 'https://example.com/kernels'
+
+        def matches(self, fname):
+            if fname.startswith('test_v'):
+                return True, None, None, int(fname[6:9])
+            return False
+
+    try:
+        assert GetRemoteKernels().get_remote_kernels() == []
+        kernels = Matches().parse_links(['test_v002.bsp', '../', 'a.bsp'])
+        assert [k.url for k in kernels] == [
+            'https://example.com/kernels/test_v002.bsp']
+        assert kernels[0].version == 2
+    finally:
+        del registry._kernels['test body']
+
+
+def test_alinks(server, tmp_path):
+    index = ListingIndex(directory=tmp_path / 'listings')
+    urls = [f'{server.url}?page={i}' for i in range(5)]
+
+    async def fetch(refresh=False):
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(
+                *[index.alinks(url, session, refresh=refresh) for url in urls])
+
+    start = time.monotonic()
+    results = asyncio.run(fetch())
+    # Requests are made concurrently
+    assert time.monotonic() - start < len(urls) * server_delay
+    assert all(links == index.links(server.url) for links in results)
+    assert server.statuses == [200] * 6
+
+    results = asyncio.run(fetch(refresh=True))
+    assert server.statuses == [200] * 6 + [304] * 5
+
+
+def test_alinks_offline(server, tmp_path):
+    index = ListingIndex(ttl=0, directory=tmp_path / 'listings')
+    links = index.links(server.url)
+    server.shutdown()
+    server.server_close()
+
+    async def fetch(url):
+        async with aiohttp.ClientSession() as session:
+            return await index.alinks(url, session)
+
+    assert asyncio.run(fetch(server.url)) == links
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(fetch(server.url + 'other/'))
@@ -0,0 +1,119 @@
+import shutil
+
+import pytest
+import spiceypy
+
+from astrospice import Kernel, KernelPool, furnished_kernels, kernel_pool
+from astrospice.kernel import _write_metakernel
+
+
+@pytest.fixture()
+def spk_copies(synthetic_spk, tmp_path):
+    """
+    Paths to three copies of the synthetic SPK file.
+    """
+    fnames = []
+    for i in range(3):
+        fnames.append(tmp_path / f'synthetic_{i}.bsp')
+        shutil.copy(synthetic_spk, fnames[-1])
+    yield fnames
+    for fname in fnames:
+        if fname in kernel_pool:
+            kernel_pool.unload(fname)
+
+
+def n_loaded():
+    return spiceypy.ktotal('ALL')
+
+
+def test_dedup(spk_copies):
+    n = n_loaded()
+    Kernel(spk_copies[0])
+    Kernel(spk_copies[0])
+    assert n_loaded() == n + 1
+    assert furnished_kernels()[-1] == spk_copies[0]
+
+    # Unloaded outside astrospice
+    spiceypy.unload(str(spk_copies[0]))
+    assert spk_copies[0] not in kernel_pool
+    Kernel(spk_copies[0])
+    assert n_loaded() == n + 1
+
+
+def test_unload(spk_copies):
+    n = n_loaded()
+    kernel = Kernel(spk_copies[0])
+    assert kernel.is_furnished
+    kernel.unload()
+    assert not kernel.is_furnished
+    assert n_loaded() == n
+    assert spk_copies[0] not in furnished_kernels()
+
+    with pytest.raises(ValueError, match='is not furnished'):
+        kernel.unload()
+
+
+def test_context_manager(spk_copies):
+    n = n_loaded()
+    with Kernel(spk_copies[0]) as kernel:
+        assert kernel.is_furnished
+        assert n_loaded() == n + 1
+    assert not kernel.is_furnished
+    assert n_loaded() == n
+
+
+def test_scope(spk_copies):
+    Kernel(spk_copies[0])
+    n = n_loaded()
+    with kernel_pool.scope():
+        Kernel(spk_copies[0])
+        Kernel(spk_copies[1])
+        assert n_loaded() == n + 1
+    # Kernels loaded before the scope are kept
+    assert spk_copies[0] in kernel_pool
+    assert spk_copies[1] not in kernel_pool
+    assert n_loaded() == n
+
+
+@pytest.mark.parametrize('limits', [{'max_kernels': 2},
+                                    {'max_segments': 10}])
+def test_limits(spk_copies, limits):
+    pool = KernelPool(**limits)
+    pool.furnish(spk_copies[0])
+    pool.furnish(spk_copies[1])
+    # Mark the first kernel as recently used
+    pool.furnish(spk_copies[0])
+    pool.furnish(spk_copies[2])
+    assert pool.kernels == [spk_copies[0], spk_copies[2]]
+    assert pool.n_segments == 10
+    assert spk_copies[1] not in pool
+    with pytest.raises(spiceypy.utils.exceptions.NotFoundError):
+        spiceypy.kinfo(str(spk_copies[1]))
+    pool.unload_all()
+    assert len(pool) == 0
+
+
+def test_metakernel_segments(spk_copies, tmp_path):
+    # The segments in the kernels listed by a meta-kernel count towards the
+    # limits
+    mk = _write_metakernel(tmp_path / 'test.tm', spk_copies[:2])
+    pool = KernelPool(max_segments=10)
+    pool.furnish(mk.fname)
+    assert pool.n_segments == 10
+    pool.furnish(spk_copies[2])
+    assert pool.kernels == [spk_copies[2]]
+    assert not mk.is_furnished
+    pool.unload_all()
+
+
+def test_pinned(spk_copies):
+    pool = KernelPool(max_kernels=1)
+    pool.furnish(spk_copies[0], pinned=True)
+    pool.furnish(spk_copies[1])
+    pool.furnish(spk_copies[2])
+    assert pool.kernels == [spk_copies[0], spk_copies[2]]
+
+    pool.unload_all()
+    assert pool.kernels == [spk_copies[0]]
+    pool.unload_all(pinned=True)
+    assert len(pool) == 0
@@ -1,7 +1,12 @@
+import asyncio
+
+import numpy as np
 import pytest
 from astropy.table import Table
+from astropy.time import Time
 
 from astrospice import Body, SPKKernel, registry
+from astrospice.net.reg import RemoteKernel, _IntervalIndex
 
 # Ignore dubious year warnings for years a while in the future
 pytestmark = pytest.mark.filterwarnings(r'ignore:ERFA function.*dubious year')
@@ -13,6 +18,12 @@ def test_search(body):
     assert isinstance(kernels, Table)
 
 
+def test_aget_available_kernels():
+    kernels = asyncio.run(registry.aget_available_kernels(refresh=True))
+    assert isinstance(kernels, Table)
+    assert set(kernels['Mission']) == set(registry.bodies)
+
+
 def test_get_kernels():
     k = registry.get_kernels('psp', 'predict', version=35)
     assert isinstance(k, list)
@@ -37,3 +48,39 @@ def test_get_latest():
     kernel = registry.get_latest_kernel('psp', 'predict')
     assert isinstance(kernel, SPKKernel)
     assert kernel.bodies == [Body('SOLAR PROBE PLUS')]
+
+
+def test_interval_index():
+    kernels = [
+        RemoteKernel('c', Time('2020-03-01'), Time('2020-04-01'), 1),
+        RemoteKernel('a', Time('2020-01-01'), Time('2020-02-01'), 1),
+        RemoteKernel('b', Time('2020-02-01'), Time('2020-03-01'), 1),
+        # Unknown end time
+        RemoteKernel('d', Time('2020-04-01'),
+                     Time(val=0, val2=np.nan, format='mjd'), 1),
+    ]
+    index = _IntervalIndex(kernels)
+
+    def urls(start, end):
+        return [k.url for k in index.overlapping(Time(start), Time(end))]
+
+    assert urls('2020-01-10', '2020-01-20') == ['a']
+    assert urls('2020-01-10', '2020-02-10') == ['a', 'b']
+    assert urls('2020-02-01', '2020-02-01') == ['a', 'b']
+    assert urls('2020-03-10', '2021-01-01') == ['c', 'd']
+    assert urls('2030-01-01', '2030-01-02') == ['d']
+    assert urls('2019-01-01', '2019-02-01') == []
+
+    with pytest.raises(ValueError, match='trange start must be before'):
+        urls('2020-02-01', '2020-01-01')
+
+
+def test_get_kernels_trange():
+    trange = Time(['2019-01-01', '2019-02-01'])
+    kernels = registry.get_kernels('psp', 'recon', trange=trange)
+    assert 0 < len(kernels) < len(registry['psp']['recon'].get_remote_kernels())
+
+    msg = 'No kernels available for psp, type=recon, trange'
+    with pytest.raises(ValueError, match=msg):
+        registry.get_kernels('psp', 'recon', trange=Time(['2000-01-01',
+                                                          '2000-02-01']))
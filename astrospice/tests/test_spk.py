@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+
+import astropy.units as u
+import numpy as np
+import pytest
+import spiceypy
+from astropy.tests.helper import assert_quantity_allclose
+from astropy.time import Time
+
+from astrospice import generate_coords
+from astrospice.spk import (
+    CoverageIndex,
+    coverage_index,
+    get_states,
+    get_states_multi,
+)
+from astrospice.tests.helpers import T0, T1, T_SPLIT
+
+# One body for each segment type in the synthetic kernel
+BODIES = [10, -96, -144, -234]
+
+
+def random_ets(n):
+    ets = np.random.default_rng(0).uniform(T0, T1, n)
+    # Include the segment boundaries
+    return np.concatenate([ets, [T0, T_SPLIT, T1]])
+
+
+@pytest.mark.parametrize('body', BODIES)
+@pytest.mark.parametrize('observer', [0, 10])
+def test_against_spice(furnished_spk, body, observer):
+    ets = random_ets(1000)
+    expected = np.array(
+        [spiceypy.spkezr(str(body), et, 'J2000', 'NONE', str(observer))[0]
+         for et in ets])
+    states = get_states(body, ets, observer)
+
+    assert states.shape == (ets.size, 6)
+    # Positions to within a millimetre, velocities to within a micrometre/s
+    np.testing.assert_allclose(states[:, :3], expected[:, :3], rtol=0,
+                               atol=1e-6)
+    np.testing.assert_allclose(states[:, 3:], expected[:, 3:], rtol=0,
+                               atol=1e-9)
+
+
+@pytest.mark.parametrize('observer', [0, 10, -96])
+def test_get_states_multi(furnished_spk, observer):
+    ets = random_ets(1000)
+    states = get_states_multi(BODIES, ets, observer)
+    assert states.shape == (len(BODIES), ets.size, 6)
+    for body, body_states in zip(BODIES, states):
+        np.testing.assert_array_equal(body_states,
+                                      get_states(body, ets, observer))
+
+    with pytest.raises(ValueError, match='Insufficient ephemeris data'):
+        get_states_multi(BODIES, [T0, T1 + 86400])
+
+
+def test_scalar_time(furnished_spk):
+    states = get_states(-96, T_SPLIT)
+    assert states.shape == (1, 6)
+
+
+def test_insufficient_data(furnished_spk):
+    with pytest.raises(ValueError, match='Insufficient ephemeris data'):
+        get_states(-96, [T0, T1 + 86400])
+
+
+def test_generate_coords_engine(furnished_spk):
+    times = Time(random_ets(100), format='et')
+    spice_coords = generate_coords('SOLAR PROBE PLUS', times)
+    numpy_coords = generate_coords('SOLAR PROBE PLUS', times, engine='numpy')
+    assert_quantity_allclose(spice_coords.separation_3d(numpy_coords),
+                             0 * u.km, atol=1 * u.mm)
+
+    with pytest.raises(ValueError, match='engine must be'):
+        generate_coords('SOLAR PROBE PLUS', times, engine='fortran')
+
+
+@pytest.mark.parametrize('engine', ['spice', 'numpy'])
+def test_generate_coords_workers(furnished_spk, engine):
+    times = Time(random_ets(1000), format='et')
+    serial = generate_coords('SOLAR PROBE PLUS', times)
+    parallel = generate_coords('SOLAR PROBE PLUS', times, engine=engine,
+                               workers=2)
+    assert_quantity_allclose(serial.separation_3d(parallel), 0 * u.km,
+                             atol=1 * u.mm)
+
+    with pytest.raises(ValueError, match='workers must be at least 1'):
+        generate_coords('SOLAR PROBE PLUS', times, workers=0)
+
+
+def test_generate_coords_spice_error(furnished_spk):
+    with pytest.raises(spiceypy.utils.exceptions.SpiceSPKINSUFFDATA):
+        generate_coords(-96, Time([T0, T1 + 86400], format='et'))
+    assert not spiceypy.failed()
+
+
+def fake_segment(target, start, stop, center=0):
+    return SimpleNamespace(target=target, center=center, start=start,
+                           stop=stop, frame=1, type=2, fname=f'{start}.bsp')
+
+
+def test_coverage_index_priority():
+    index = CoverageIndex([fake_segment(1, 0, 10),
+                           fake_segment(1, 5, 15),
+                           fake_segment(1, 20, 20),
+                           fake_segment(1, 2, 3),
+                           fake_segment(2, 0, 10, center=1)])
+    et = np.array([-1, 0, 2, 4, 5, 10, 12, 15, 17, 20, 21, np.nan])
+    np.testing.assert_array_equal(index.segment_index(1, et),
+                                  [-1, 0, 3, 0, 1, 1, 1, 1, -1, 2, -1, -1])
+    np.testing.assert_array_equal(index.segment_index(3, et), -1)
+    np.testing.assert_array_equal(index.intervals(1), [[0, 15], [20, 20]])
+    assert index.files(1, [-1, 2])[1] == '2.bsp'
+    assert index.files(1, [-1, 2])[0] == ''
+    # Body 2 is only covered where its center is
+    np.testing.assert_array_equal(index.covered(2, [0, 10, 12]),
+                                  [True, True, False])
+    np.testing.assert_array_equal(index.covered(1, [0, 17], observer=2),
+                                  [True, False])
+    assert index.bodies == [1, 2]
+    assert len(index.table()) == 5
+
+
+def test_coverage_index(furnished_spk):
+    index = coverage_index()
+    assert coverage_index() is index
+    ets = random_ets(1000)
+    for body in BODIES:
+        assert index.covered(body, ets).all()
+    # Spacecraft are only in the synthetic kernel
+    for body in BODIES[1:]:
+        assert not index.covered(body, [T1 + 86400]).any()
+        np.testing.assert_array_equal(index.intervals(body), [[T0, T1]])
+
+    # The type 13 segment is later in the file, so serves the boundary
+    table = index.table()
+    seg = index.segment_index(-96, [T0, T_SPLIT, T1])
+    np.testing.assert_array_equal(table['Type'][seg], [3, 13, 13])
+    assert index.files(-96, [T0])[0] == str(furnished_spk)
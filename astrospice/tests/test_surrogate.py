@@ -0,0 +1,60 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.time import Time
+
+from astrospice import ChebyshevEphemeris, generate_coords
+from astrospice.tests.helpers import T0, T1
+
+
+@pytest.mark.parametrize('body', [10, -96, -144])
+@pytest.mark.parametrize('tolerance', [1 * u.km, 1 * u.m])
+def test_fit(furnished_spk, body, tolerance):
+    fit = ChebyshevEphemeris.fit(body, T0, T1 - 1e6, tolerance=tolerance,
+                                 engine='numpy')
+    ets = np.random.default_rng(0).uniform(fit.start, fit.stop, 10000)
+    states = fit.states(ets)
+    expected = generate_coords(body, ets, output='array', engine='numpy')
+    errors = np.linalg.norm(states[:, :3] - expected[:, :3], axis=1)
+    assert errors.max() <= tolerance.to_value(u.km)
+    np.testing.assert_allclose(states[:, 3:], expected[:, 3:], rtol=0,
+                               atol=1e-3)
+
+    # Sorted and unsorted times give the same result
+    np.testing.assert_array_equal(fit.states(np.sort(ets)),
+                                  states[np.argsort(ets)])
+
+
+def test_adaptive(furnished_spk):
+    # Tighter tolerances need shorter segments
+    coarse = ChebyshevEphemeris.fit(-96, T0, T0 + 5e6, tolerance=1000 * u.km,
+                                    degree=4, engine='numpy')
+    fine = ChebyshevEphemeris.fit(-96, T0, T0 + 5e6, tolerance=1 * u.m,
+                                  degree=4, engine='numpy')
+    assert fine.n_segments > coarse.n_segments
+    assert np.all(np.diff(fine.breakpoints) > 0)
+
+    with pytest.raises(ValueError, match='Could not fit'):
+        ChebyshevEphemeris.fit(-96, T0, T0 + 5e6, tolerance=1 * u.nm,
+                               degree=1, min_segment=1 * u.day,
+                               engine='numpy')
+
+
+def test_save_load(furnished_spk, tmp_path):
+    fit = ChebyshevEphemeris.fit('SOLAR PROBE PLUS', T0, T0 + 1e7,
+                                 frame='hcrs')
+    fname = fit.save(tmp_path / 'psp.npz')
+    loaded = ChebyshevEphemeris.load(fname)
+    assert (loaded.body, loaded.observer, loaded.frame) == (-96, 10, 'hcrs')
+
+    times = Time(np.linspace(T0, T0 + 1e7, 100), format='et')
+    np.testing.assert_array_equal(loaded.states(times), fit.states(times))
+    coords = loaded.coords(times)
+    assert coords.frame.name == 'hcrs'
+    assert coords.obstime is times
+
+
+def test_out_of_range(furnished_spk):
+    fit = ChebyshevEphemeris.fit(-96, T0, T0 + 1e6)
+    with pytest.raises(ValueError, match='within the fitted time range'):
+        fit.states([T0 - 1, T0])
@@ -0,0 +1,65 @@
+import pytest
+
+from astrospice.textkernel import read_text_kernel
+
+TEXT_KERNEL = r"""
+KPL/MK
+
+This comment mentions NOT_A_VARIABLE = 1
+
+\begindata
+
+   PATH_VALUES  = ( '/data/kernels',
+                    'it''s' )
+   PATH_SYMBOLS = ( 'KERNELS' 'QUOTE' )
+   BODY10_GM    = 1.3271244004193938D+11
+   COUNT        = 3
+   EPOCH        = @2020-JAN-01
+   KERNELS_TO_LOAD = ( '$KERNELS/a.bsp' )
+
+\begintext
+
+More comments ( that = 'are not data'
+
+\begindata
+   KERNELS_TO_LOAD += ( '$KERNELS/b.bsp', '$QUOTE/c.bsp' )
+   NEGATIVE = ( -1.5e3, +.5 )
+"""
+
+
+def test_read_text_kernel(tmp_path):
+    fname = tmp_path / 'test.tm'
+    fname.write_text(TEXT_KERNEL)
+    variables = read_text_kernel(fname)
+    assert variables == {
+        'PATH_VALUES': ['/data/kernels', "it's"],
+        'PATH_SYMBOLS': ['KERNELS', 'QUOTE'],
+        'BODY10_GM': [1.3271244004193938e11],
+        'COUNT': [3],
+        'EPOCH': ['2020-JAN-01'],
+        'KERNELS_TO_LOAD': ['$KERNELS/a.bsp', '$KERNELS/b.bsp',
+                            '$QUOTE/c.bsp'],
+        'NEGATIVE': [-1500.0, 0.5],
+    }
+    assert isinstance(variables['COUNT'][0], int)
+
+    # Modifying the result doesn't change the cached copy
+    variables['COUNT'].append(4)
+    assert read_text_kernel(fname)['COUNT'] == [3]
+
+
+def test_no_begindata(tmp_path):
+    # Like SPICE, a file without \begindata has no variables
+    fname = tmp_path / 'test.tm'
+    fname.write_text("KERNELS_TO_LOAD = ( 'a.bsp' )\n")
+    assert read_text_kernel(fname) == {}
+
+
+@pytest.mark.parametrize('text', ["\\begindata\nA = ( 'b'\n",
+                                  "\\begindata\nA 'b'\n",
+                                  "\\begindata\nA = b\n"])
+def test_read_text_kernel_errors(tmp_path, text):
+    fname = tmp_path / 'bad.tm'
+    fname.write_text(text)
+    with pytest.raises(ValueError, match='Could not parse text kernel'):
+        read_text_kernel(fname)
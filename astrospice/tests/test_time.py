@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from astropy.time import Time
+
+from astrospice.time import to_et
+
+
+def test_to_et_datetime64():
+    rng = np.random.default_rng(0)
+    seconds = rng.uniform(0, 50 * 365.25 * 86400, 1000)
+    times = (np.datetime64('1972-01-01') +
+             (seconds * 1e6).astype('timedelta64[us]'))
+    np.testing.assert_allclose(to_et(times), Time(times).et,
+                               rtol=0, atol=5e-5)
+
+    # Either side of a leap second
+    times = np.array(['2016-12-31T23:59:59', '2017-01-01T00:00:00'],
+                     dtype='datetime64[s]')
+    assert np.diff(to_et(times)) == pytest.approx(2)
+
+    with pytest.raises(ValueError, match='NaT'):
+        to_et(np.array(['2020-01-01', 'NaT'], dtype='datetime64[s]'))
+
+
+def test_to_et():
+    et = np.linspace(6e8, 6.5e8, 10)
+    np.testing.assert_array_equal(to_et(et), et)
+    assert to_et(6e8) == 6e8
+
+    times = Time(['2020-01-01', '2021-01-01'])
+    np.testing.assert_array_equal(to_et(times), times.et)
+    np.testing.assert_array_equal(to_et(['2020-01-01', '2021-01-01']),
+                                  times.et)
@@ -0,0 +1,128 @@
+"""
+Reading SPICE text kernels.
+
+Text kernels (e.g. meta-kernels, leapseconds and frame kernels) assign values
+to variables in ``\\begindata`` blocks, with free text comments in
+``\\begintext`` blocks. This module parses the assignments without furnishing
+the kernel with SPICE.
+
+References
+----------
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/kernel.html
+"""
+import re
+from pathlib import Path
+
+__all__ = ['read_text_kernel']
+
+# Mapping from file path to (modification time, variables)
+_FILE_CACHE = {}
+_TOKEN_RE = re.compile(r"""
+    '(?:[^']|'')*'      # String, with '' for a literal quote
+    | \+= | [=(),]      # Operators and punctuation
+    | [^\s=(),']+       # Names, numbers and dates
+""", re.VERBOSE)
+_NUMBER_RE = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eEdD][+-]?\d+)?')
+
+
+def read_text_kernel(fname):
+    """
+    Read the variables assigned in a text kernel.
+
+    Values can be strings, numbers (including FORTRAN style ``D``
+    exponents), or ``@`` dates, which are returned as strings without the
+    ``@``. ``+=`` assignments append to the values already assigned. As in
+    SPICE, a file without a ``\\begindata`` marker has no variables.
+
+    Files are only parsed once, and the result is cached until the file is
+    modified.
+
+    Parameters
+    ----------
+    fname : str, pathlib.Path
+        Path to the text kernel.
+
+    Returns
+    -------
+    dict[str, list]
+        Mapping from variable name to a list of its values, in the order
+        they were assigned.
+
+    Raises
+    ------
+    ValueError
+        If the file can't be parsed.
+    """
+    fname = str(fname)
+    mtime = Path(fname).stat().st_mtime
+    if fname not in _FILE_CACHE or _FILE_CACHE[fname][0] != mtime:
+        with open(fname) as f:
+            text = f.read()
+        _FILE_CACHE[fname] = (mtime, _parse(_data_text(text), fname))
+    return {name: list(values)
+            for name, values in _FILE_CACHE[fname][1].items()}
+
+
+def _data_text(text):
+    """
+    Get the text within the ``\\begindata`` blocks of a text kernel.
+    """
+    lines = text.splitlines()
+    data, in_data = [], False
+    for line in lines:
+        marker = line.strip()
+        if marker == '\\begindata':
+            in_data = True
+        elif marker == '\\begintext':
+            in_data = False
+        elif in_data:
+            data.append(line)
+    return '\n'.join(data)
+
+
+def _parse(text, fname):
+    """
+    Parse the assignments in the data of a text kernel.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    variables = {}
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if i + 2 >= len(tokens) or tokens[i + 1] not in ('=', '+='):
+            raise ValueError(f'Could not parse text kernel {fname}: expected '
+                             f'an assignment to "{name}"')
+        operator = tokens[i + 1]
+        i += 2
+        if tokens[i] == '(':
+            try:
+                end = tokens.index(')', i)
+            except ValueError:
+                raise ValueError(f'Could not parse text kernel {fname}: '
+                                 f'unclosed "(" in the value of "{name}"')
+            values = [_value(t, fname) for t in tokens[i + 1:end]
+                      if t != ',']
+            i = end + 1
+        else:
+            values = [_value(tokens[i], fname)]
+            i += 1
+        if operator == '+=':
+            variables.setdefault(name, []).extend(values)
+        else:
+            variables[name] = values
+    return variables
+
+
+def _value(token, fname):
+    """
+    Convert a single value token to a string or number.
+    """
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    if token.startswith('@'):
+        return token[1:]
+    if _NUMBER_RE.fullmatch(token):
+        number = float(token.replace('D', 'E').replace('d', 'e'))
+        return int(number) if re.fullmatch(r'[+-]?\d+', token) else number
+    raise ValueError(f'Could not parse text kernel {fname}: invalid value '
+                     f'"{token}"')
@@ -1 +1,2 @@
+from .conversion import *
 from .epochs import *
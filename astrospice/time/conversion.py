@@ -0,0 +1,73 @@
+import erfa
+import numpy as np
+from astropy.time import Time
+
+__all__ = ['to_et']
+
+# Constants used by SPICE to convert between TAI and ephemeris time. These
+# are the same in every NAIF leapseconds kernel.
+_DELTA_T_A = 32.184
+_K = 1.657e-3
+_EB = 1.671e-2
+_M = (6.239996, 1.99096871e-7)
+
+_J2000 = np.datetime64('2000-01-01T12:00:00', 'us')
+
+
+def to_et(times):
+    """
+    Convert times to ephemeris times.
+
+    This is a fast alternative to ``Time(times).et`` for large arrays of
+    times.
+
+    Parameters
+    ----------
+    times : `~astropy.time.Time`, numpy.ndarray, float
+        Times to convert. Can be one of:
+
+        - A `~astropy.time.Time`.
+        - Floats, which are taken to already be ephemeris times.
+        - `numpy.datetime64` values, which are taken to be UTC. These are
+          converted with the same (vectorized) algorithm that SPICE uses,
+          which agrees with `astropy.time.Time` to within 50 microseconds.
+        - Anything else that can be converted to a `~astropy.time.Time`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Ephemeris times, in seconds past the J2000 epoch.
+    """
+    if isinstance(times, Time):
+        return np.asarray(times.et, dtype=float)
+    array = np.asarray(times)
+    if array.dtype.kind in 'iuf':
+        return array.astype(float)
+    if array.dtype.kind == 'M':
+        return _datetime64_to_et(array)
+    return np.asarray(Time(times).et, dtype=float)
+
+
+def _datetime64_to_et(times):
+    """
+    Convert UTC `numpy.datetime64` values to ephemeris times.
+    """
+    if np.isnat(times).any():
+        raise ValueError('times must not contain NaT')
+    utc = (times.astype('datetime64[us]') - _J2000).astype(float) / 1e6
+
+    # Leap seconds, which are constant from 1972 onwards
+    table = erfa.leap_seconds.get()
+    table = table[table['year'] >= 1972]
+    starts = np.array([f'{year:04}-{month:02}-01'
+                       for year, month in table[['year', 'month']]],
+                      dtype='datetime64[us]')
+    starts = (starts - _J2000).astype(float) / 1e6
+    i = np.searchsorted(starts, utc, side='right') - 1
+    tai = utc + table['tai_utc'][np.maximum(i, 0)]
+
+    # The periodic difference between terrestrial time and TDB
+    tt = tai + _DELTA_T_A
+    m = _M[0] + _M[1] * tt
+    e = m + _EB * np.sin(m)
+    return tt + _K * np.sin(e)
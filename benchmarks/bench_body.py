@@ -0,0 +1,24 @@
+"""
+Benchmarks for resolving bodies.
+"""
+import numpy as np
+
+
+class Body:
+    def setup(self):
+        from astrospice.body import _clear_body_cache
+        _clear_body_cache()
+        self.names = np.array(['SUN', 'EARTH', 'SOLAR PROBE PLUS', 'MARS'] *
+                              25000)
+
+    def time_body_from_id(self):
+        from astrospice import Body
+        Body(10)
+
+    def time_body_from_name(self):
+        from astrospice import Body
+        Body('SOLAR PROBE PLUS')
+
+    def time_body_ids(self):
+        from astrospice import body_ids
+        body_ids(self.names)
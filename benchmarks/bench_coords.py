@@ -0,0 +1,83 @@
+"""
+Benchmarks for generating coordinates.
+"""
+import astropy.units as u
+import numpy as np
+from astropy.time import Time
+
+from .common import PSP, T0, T1, use_synthetic_spk, write_synthetic_spk
+
+
+class CoordsSuite:
+    """
+    Base class that furnishes a synthetic SPK file.
+    """
+    def setup_cache(self):
+        fname = 'synthetic.bsp'
+        write_synthetic_spk(fname)
+        return fname
+
+    def setup(self, fname, *args):
+        use_synthetic_spk(fname)
+
+
+class GenerateCoords(CoordsSuite):
+    params = ([1, 10**3, 10**5, 10**6], ['spice', 'numpy'])
+    param_names = ['n', 'engine']
+    timeout = 600
+
+    def setup(self, fname, n, engine):
+        super().setup(fname)
+        self.times = Time(np.linspace(T0, T1, n), format='et')
+
+    def time_generate_coords(self, fname, n, engine):
+        from astrospice import generate_coords
+        generate_coords(PSP, self.times, engine=engine)
+
+    def peakmem_generate_coords(self, fname, n, engine):
+        from astrospice import generate_coords
+        generate_coords(PSP, self.times, engine=engine)
+
+
+class IterCoords(CoordsSuite):
+    """
+    Evaluating long time series in chunks, up to 10**7 epochs.
+    """
+    params = ([10**5, 10**7], ['spice', 'numpy'])
+    param_names = ['n', 'engine']
+    timeout = 1200
+    number = 1
+    repeat = 1
+
+    def _iterate(self, n, engine):
+        from astrospice import iter_coords
+        step = (T1 - T0) / n * u.s
+        n_times = 0
+        for times_et, _ in iter_coords(PSP, (Time(T0, format='et'),
+                                             Time(T1, format='et'), step),
+                                       output='array', engine=engine):
+            n_times += times_et.size
+        assert n_times == n
+
+    def time_iter_coords(self, fname, n, engine):
+        self._iterate(n, engine)
+
+    def peakmem_iter_coords(self, fname, n, engine):
+        self._iterate(n, engine)
+
+
+class CachedCoords(CoordsSuite):
+    params = [10**5]
+    param_names = ['n']
+
+    def setup(self, fname, n):
+        from astrospice import generate_coords
+        from astrospice.cache import coords_cache
+        super().setup(fname)
+        coords_cache.max_disk_bytes = 0
+        self.times = Time(np.linspace(T0, T1, n), format='et')
+        generate_coords(PSP, self.times, cache=True)
+
+    def time_generate_coords_cached(self, fname, n):
+        from astrospice import generate_coords
+        generate_coords(PSP, self.times, cache=True)
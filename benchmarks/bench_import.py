@@ -0,0 +1,11 @@
+"""
+Benchmarks for importing astrospice.
+"""
+
+
+def timeraw_import_astrospice():
+    return 'import astrospice'
+
+
+def timeraw_import_generate_coords():
+    return 'from astrospice import generate_coords'
@@ -0,0 +1,37 @@
+"""
+Benchmarks for reading kernel metadata.
+"""
+from pathlib import Path
+
+from .common import PSP, write_synthetic_spk
+
+
+class SPKKernel:
+    def setup_cache(self):
+        fname = 'synthetic.bsp'
+        write_synthetic_spk(fname)
+        return fname
+
+    def time_bodies(self, fname):
+        from astrospice import SPKKernel
+        SPKKernel(fname, furnish=False).bodies
+
+    def time_coverage(self, fname):
+        from astrospice import SPKKernel
+        SPKKernel(fname, furnish=False).coverage(PSP)
+
+
+class MetaKernel:
+    params = [10, 1000]
+    param_names = ['n_kernels']
+
+    def setup(self, n_kernels):
+        self.fname = Path(f'metakernel_{n_kernels}.tm')
+        lines = [f"    '$KERNELS/spk/kernel_{i}.bsp'" for i in range(n_kernels)]
+        self.fname.write_text(
+            "\\begindata\n\nPATH_VALUES = ( '.' )\nPATH_SYMBOLS = ( 'KERNELS' )\n"
+            "KERNELS_TO_LOAD = (\n" + '\n'.join(lines) + "\n)\n\n\\begintext\n")
+
+    def time_kernels(self, n_kernels):
+        from astrospice import MetaKernel
+        MetaKernel(self.fname, furnish=False).kernels
@@ -0,0 +1,45 @@
+"""
+Benchmarks for listing remote kernels, using a local HTTP server.
+"""
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from .common import start_server, write_listing
+
+
+class Listing:
+    params = [100, 10000]
+    param_names = ['n_links']
+
+    def setup(self, n_links):
+        from astrospice.net.listing import ListingIndex
+        from astrospice.net.sources.psp import PSPPredict
+        self.tmpdir = TemporaryDirectory()
+        directory = Path(self.tmpdir.name)
+        write_listing(directory, n_links)
+        self.server = start_server(directory)
+        self.source = PSPPredict()
+        self.index = ListingIndex(ttl=0, directory=directory / 'listings')
+        self.links = self.index.links(self.server.url)
+
+    def teardown(self, n_links):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def time_fetch_listing(self, n_links):
+        # Always downloads and parses the listing
+        self.index.clear()
+        self.index.links(self.server.url)
+
+    def time_refresh_listing(self, n_links):
+        # A conditional request for an unchanged listing
+        self.index.links(self.server.url, refresh=True)
+
+    def time_indexed_listing(self, n_links):
+        self.index.ttl = 3600
+        self.index.links(self.server.url)
+        self.index.ttl = 0
+
+    def time_parse_links(self, n_links):
+        self.source.parse_links(self.links)
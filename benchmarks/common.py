@@ -0,0 +1,58 @@
+"""
+Shared set up for the benchmarks.
+
+The benchmarks run offline: ephemerides are evaluated from a synthetic SPK
+file, and registry listings are served from a local HTTP server.
+"""
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from astrospice.tests.helpers import T0, T1, write_synthetic_spk  # noqa: F401
+
+# Bodies in the synthetic kernel
+SUN = 10
+PSP = -96
+
+
+def use_synthetic_spk(fname):
+    """
+    Furnish the synthetic SPK file, without the generic kernels.
+    """
+    from astrospice import Kernel, pool
+
+    # The generic kernels would have to be downloaded, and aren't needed
+    pool._GENERIC_FURNISHED = True
+    return Kernel(fname)
+
+
+def write_listing(directory, n):
+    """
+    Write a directory listing page with ``n`` PSP predict kernel links.
+    """
+    links = [f'<a href="spp_nom_20180812_20250831_v{i:03}_RO5.bsp">kernel</a>'
+             for i in range(n)]
+    (directory / 'index.html').write_text(
+        '<html><body>\n' + '\n'.join(links) + '\n</body></html>\n')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_server(directory):
+    """
+    Serve a directory over HTTP on localhost.
+
+    Returns
+    -------
+    http.server.ThreadingHTTPServer
+        The server. The URL of the directory is stored in its ``url``
+        attribute.
+    """
+    httpd = ThreadingHTTPServer(
+        ('127.0.0.1', 0), partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    return httpd
@@ -7,10 +7,8 @@ it's nominal mission phase.
 """
 import astropy.units as u
 import matplotlib.pyplot as plt
-import numpy as np
 from astropy.time import Time, TimeDelta
 from astropy.visualization import quantity_support
-from sunpy.coordinates import HeliocentricInertial
 
 import astrospice
 
@@ -31,23 +29,26 @@ print(coverage.iso)
 ###############################################################################
 # To generate some coordinates we do not need the kernel object as astrospice
 # automatically registers the kernel with SPICE when ``get_kernels`` was called
-# above.
+# above. Evenly spaced times can be given as a ``(start, stop, step)`` tuple,
+# which is much faster than creating a `~astropy.time.Time` array first.
 dt = TimeDelta(0.5 * u.day)
-times = Time(np.arange(coverage[0], Time('2022-01-01'), dt))
+times = (coverage[0], Time('2022-01-01'), dt)
 coords = astrospice.generate_coords('SOLAR PROBE PLUS', times)
 print(coords[0:4])
 
 ###############################################################################
 # Note that the coordinates are generated in the ICRS coordinate system. To
-# change this to a more useful heliocentric coordinate system we can use
-# sunpy's built in Heliocentric Intertial coordinate frame.
-new_frame = HeliocentricInertial()
-coords = coords.transform_to(new_frame)
+# get them in a more useful heliocentric coordinate system we can ask for
+# sunpy's built in Heliocentric Inertial coordinate frame directly. SPICE then
+# computes the position relative to the Sun, which is much faster than
+# transforming the ICRS coordinates with ``coords.transform_to``.
+coords = astrospice.generate_coords('SOLAR PROBE PLUS', times,
+                                    frame='heliocentricinertial')
 print(coords[0:4])
 
 ###############################################################################
 # Now we can plot the coordinates in this new coordinate system
 fig = plt.figure()
 ax = fig.add_subplot(projection='polar')
-ax.scatter(coords.lon.to(u.rad), coords.distance.to(u.au), c=times.jd, s=2)
+ax.scatter(coords.lon.to(u.rad), coords.distance.to(u.au), c=coords.obstime.jd, s=2)
 plt.show()